@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import List, Literal
 
 class Settings(BaseSettings):
     groq_api_key: str = ""
@@ -12,13 +12,75 @@ class Settings(BaseSettings):
     llm_model: str ="llama-3.3-70b-versatile"
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
     
-    vector_db_type: Literal["chromadb", "faiss"] = "chromadb"
+    vector_db_type: Literal["chromadb", "faiss", "numpy"] = "chromadb"
     vector_db_path: str = "./data/storage/vector_db"
+    faiss_index_type: Literal["flat", "ivf", "hnsw"] = "flat"
+    faiss_nlist: int = 1024
+    faiss_nprobe: int = 16
+    faiss_hnsw_m: int = 32
+    faiss_hnsw_ef_construction: int = 200
+    faiss_hnsw_ef_search: int = 64
+    faiss_mmap: bool = True
+    faiss_save_interval: float = 30.0
+    numpy_dtype: Literal["float32", "float16"] = "float32"
+    numpy_block_rows: int = 65536
+    quantization: Literal["none", "int8", "pq"] = "none"
+    pq_subvectors: int = 16
+    quantization_train_size: int = 10000
+    rescore_factor: int = 4
     metadata_db_path: str = "./data/storage/metadata/metadata.db"
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "./data/storage/embedding_cache"
+    embedding_cache_dtype: Literal["float32", "float16"] = "float16"
+    dedup_enabled: bool = False
+    dedup_threshold: float = 0.85
+    dedup_num_perm: int = 128
+    dedup_bands: int = 16
+    dedup_shingle_size: int = 5
+    blue_green_reindex: bool = True
+    generation_drain_timeout: float = 30.0
     
     chunk_size: int = 512
     chunk_overlap: int = 50
+    chunker_mode: Literal["chars", "tokens"] = "chars"
+    chunk_size_tokens: int = 256
+    chunk_overlap_tokens: int = 32
+    chunk_tokenizer: Literal["model", "tiktoken"] = "model"
+    tiktoken_encoding: str = "cl100k_base"
+    csv_batch_rows: int = 50
+    ingestion_workers: int = 1
+    ingestion_stream_file_mb: int = 64
+    ingestion_mode: Literal["sequential", "pipeline"] = "sequential"
+    pipeline_extract_workers: int = 2
+    pipeline_chunk_workers: int = 1
+    pipeline_queue_size: int = 32
+    pipeline_flush_interval: float = 0.5
+    embedding_batch_size: int = 256
+    embedding_flush_interval: float = 5.0
+    pdf_split_threshold_pages: int = 500
+    pdf_page_range_size: int = 100
+    pdf_extract_workers: int = 4
+    ocr_workers: int = 4
+    ocr_language: str = "eng"
+    ocr_cache_enabled: bool = True
+    # Index a failed image as placeholder text instead of failing it; a placeholder is
+    # committed like any other result, so the image is not retried until it changes
+    ocr_failure_placeholder: bool = False
+    pdf_ocr_enabled: bool = False
+    pdf_ocr_images: bool = True
+    pdf_ocr_dpi: int = 200
+    pdf_ocr_min_image_size: int = 64
+    
+    discovery_workers: int = 8
+    discovery_include: List[str] = []
+    discovery_exclude: List[str] = []
+    
+    enable_watch_mode: bool = False
+    watch_debounce_seconds: float = 0.3
+    watch_poll_interval: float = 1.0
+    
     top_k_retrieval: int = 5
+    search_batch_size: int = 256
     confidence_threshold: float = 0.6
     enable_reranking: bool = True
     
@@ -0,0 +1,205 @@
+import time
+from collections import deque
+from typing import List, Tuple, Dict, Callable, Deque
+from config import settings
+from ingestion.chunker import ChunkBatch
+from ingestion.pipeline import FileTask, FilePart
+from retriever.vector_store import VectorStore
+from utils.logger import get_logger
+from utils.metrics import metrics_collector
+
+logger = get_logger(__name__)
+
+class EmbeddingBatchWriter:
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        on_commit: Callable[[FileTask], None] = None,
+        on_failure: Callable[[FileTask], None] = None,
+        batch_size: int = None,
+        flush_interval: float = None
+    ):
+        self.vector_store = vector_store
+        self.on_commit = on_commit or (lambda task: None)
+        self.on_failure = on_failure or (lambda task: None)
+        self.batch_size = batch_size or settings.embedding_batch_size
+        self.flush_interval = flush_interval or settings.embedding_flush_interval
+        # File parts waiting to be written, each with the offset of its first unwritten chunk
+        self._pending: Deque[List] = deque()
+        self._pending_count = 0
+        self._remaining: Dict[int, int] = {}
+        self._final: set = set()
+        self._cleared: set = set()
+        self._written: set = set()
+        self._failed: set = set()
+        self._last_flush = time.monotonic()
+
+    def add(self, part: FilePart) -> bool:
+        # A file is committed once its final part is written. Returns False once the file
+        # has failed, so the caller can stop producing it
+        task = part.task
+        key = id(task)
+        if key in self._failed:
+            return False
+
+        if part.chunks:
+            self._remaining[key] = self._remaining.get(key, 0) + len(part.chunks)
+            self._pending.append([part, 0])
+            self._pending_count += len(part.chunks)
+        if part.final:
+            self._final.add(key)
+            if not self._remaining.get(key):
+                try:
+                    self._clear_previous(task)
+                except Exception as e:
+                    logger.error(f"Failed to remove old chunks of {task.file_meta.file_name}: {e}")
+                    self._fail([task])
+                    return False
+                self._commit(task)
+                return True
+
+        while self._pending_count >= self.batch_size:
+            self._flush(self.batch_size)
+        if self._pending_count and time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush(self._pending_count)
+        return key not in self._failed
+
+    def fail(self, task: FileTask):
+        # The producer could not finish the file
+        if id(task) not in self._failed:
+            self._fail([task])
+
+    def flush(self):
+        while self._pending:
+            self._flush(self.batch_size)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "EmbeddingBatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _take(self, size: int) -> List[Tuple[FilePart, int, int]]:
+        parts = []
+        while self._pending and size > 0:
+            entry = self._pending[0]
+            part, start = entry
+            end = min(len(part.chunks), start + size)
+            parts.append((part, start, end))
+            size -= end - start
+            self._pending_count -= end - start
+            if end == len(part.chunks):
+                self._pending.popleft()
+            else:
+                entry[1] = end
+        return parts
+
+    def _flush(self, size: int):
+        parts = self._take(size)
+        self._last_flush = time.monotonic()
+        tasks = list({id(part.task): part.task for part, _, _ in parts}.values())
+        try:
+            self._write(parts, tasks)
+        except Exception as e:
+            logger.error(
+                f"Batch write of {sum(end - start for _, start, end in parts)} chunks "
+                f"from {len(tasks)} files failed: {e}"
+            )
+            if len(tasks) == 1:
+                self._fail(tasks)
+                return
+            # Retry file by file, so one file that cannot be embedded or written does not
+            # fail the others that happened to share its batch
+            for task in tasks:
+                own = [entry for entry in parts if entry[0].task is task]
+                try:
+                    self._write(own, [task])
+                except Exception as e:
+                    logger.error(f"Writing {task.file_meta.file_name} failed: {e}")
+                    self._fail([task])
+                else:
+                    self._settle(own)
+            return
+        self._settle(parts)
+
+    def _write(self, parts: List[Tuple[FilePart, int, int]], tasks: List[FileTask]):
+        metric = metrics_collector.track("embedding_batch_write")
+        chunks = ChunkBatch()
+        for part, start, end in parts:
+            chunks.extend_batch(part.chunks, start, end)
+        # A failed write may leave part of the batch stored. A new file's leftovers are
+        # removed when it fails; a replaced file is only marked once its write succeeded,
+        # because until then removing the file would take its previous version with it
+        self._written.update(id(task) for task in tasks if not task.replaces_existing)
+        embeddings = self.vector_store.embed(chunks.contents)
+        self.vector_store.write(chunks, embeddings)
+        self._written.update(id(task) for task in tasks)
+
+        # Old chunks of a replaced file go once part of the new version is stored, sparing
+        # the ids just written; chunks of later parts overwrite or add rows as usual
+        for task in tasks:
+            if task.replaces_existing and id(task) not in self._cleared:
+                written = [
+                    chunk_id
+                    for part, start, end in parts if part.task is task
+                    for chunk_id in part.chunks.chunk_ids[start:end]
+                ]
+                self.vector_store.delete_by_file(task.file_meta.file_path, keep=written)
+                self._cleared.add(id(task))
+        metric.stop().add_metadata(chunks=len(chunks), files=len(tasks))
+
+    def _settle(self, parts: List[Tuple[FilePart, int, int]]):
+        for part, start, end in parts:
+            key = id(part.task)
+            part.task.chunk_count += end - start
+            self._remaining[key] -= end - start
+            if self._remaining[key] == 0 and key in self._final:
+                self._commit(part.task)
+
+    def _commit(self, task: FileTask):
+        key = id(task)
+        self._remaining.pop(key, None)
+        self._final.discard(key)
+        self._cleared.discard(key)
+        self._written.discard(key)
+        try:
+            self.on_commit(task)
+        except Exception as e:
+            logger.error(f"Recording {task.file_meta.file_name} as indexed failed: {e}")
+            self.on_failure(task)
+
+    def _clear_previous(self, task: FileTask):
+        # For a new version without any chunks; otherwise _write clears the old ones
+        if task.replaces_existing and id(task) not in self._cleared:
+            self.vector_store.delete_by_file(task.file_meta.file_path)
+            self._cleared.add(id(task))
+
+    def _fail(self, tasks: List[FileTask]):
+        failed = {id(task) for task in tasks}
+        self._failed.update(failed)
+        # Drop the rest of a failed file's chunks so it is never half-committed
+        kept = deque()
+        for entry in self._pending:
+            part, start = entry
+            if id(part.task) in failed:
+                self._pending_count -= len(part.chunks) - start
+            else:
+                kept.append(entry)
+        self._pending = kept
+        for task in tasks:
+            key = id(task)
+            self._remaining.pop(key, None)
+            self._final.discard(key)
+            self._cleared.discard(key)
+            if key in self._written:
+                self._written.discard(key)
+                # Earlier batches may already hold some of the file's chunks; take them out again
+                try:
+                    self.vector_store.delete_by_file(task.file_meta.file_path)
+                except Exception as e:
+                    logger.error(f"Failed to remove partially written chunks of {task.file_meta.file_name}: {e}")
+            self.on_failure(task)
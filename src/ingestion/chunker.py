@@ -1,18 +1,34 @@
+import hashlib
 import re
-from typing import List, Dict, Any
+from array import array
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from dataclasses import dataclass
 from config import settings
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-@dataclass
+# A piece of extracted text plus optional info about where it came from:
+#   {"page": n}         paged formats; chunks record the page range they span
+#   {"metadata": {...}} self-contained units (e.g. a CSV row group) chunked on their own
+Segment = Tuple[str, Optional[Dict[str, Any]]]
+
+def make_chunk_id(source_file: str, metadata: Dict[str, Any], chunk_index: int) -> str:
+    # File names repeat across directories, so the id also carries a digest of the full path
+    file_path = metadata.get("file_path") or source_file
+    digest = hashlib.sha1(file_path.encode("utf-8")).hexdigest()[:12]
+    return f"{source_file}_{digest}_{chunk_index}"
+
+@dataclass(slots=True)
 class Chunk:
     content: str
     chunk_id: str
     source_file: str
     chunk_index: int
+    # File-level metadata is one dict shared by every chunk of the file; chunk-level
+    # fields (page or row range, JSON pointer, offsets) live in the small location dict
     metadata: Dict[str, Any]
+    location: Optional[Dict[str, Any]] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -20,9 +36,103 @@ class Chunk:
             "chunk_id": self.chunk_id,
             "source_file": self.source_file,
             "chunk_index": self.chunk_index,
-            "metadata": self.metadata
+            "metadata": {**self.metadata, **self.location} if self.location else self.metadata
         }
 
+class ChunkBatch:
+    # Column-oriented chunks: parallel per-chunk arrays, with each file's metadata stored once
+    __slots__ = ("contents", "chunk_ids", "chunk_indexes", "source_indexes", "sources", "locations", "_interned")
+    
+    def __init__(self):
+        self.contents: List[str] = []
+        self.chunk_ids: List[str] = []
+        self.chunk_indexes = array("l")
+        self.source_indexes = array("l")
+        self.sources: List[Tuple[str, Dict[str, Any]]] = []
+        self.locations: List[Optional[Dict[str, Any]]] = []
+        self._interned: Dict[Tuple[str, int], int] = {}
+    
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Chunk]) -> "ChunkBatch":
+        batch = cls()
+        batch.extend(chunks)
+        return batch
+    
+    @classmethod
+    def concat(cls, batches: Iterable["ChunkBatch"]) -> "ChunkBatch":
+        result = cls()
+        for batch in batches:
+            result.extend_batch(batch)
+        return result
+    
+    def append(self, chunk: Chunk):
+        self.contents.append(chunk.content)
+        self.chunk_ids.append(chunk.chunk_id)
+        self.chunk_indexes.append(chunk.chunk_index)
+        self.source_indexes.append(self._intern(chunk.source_file, chunk.metadata))
+        self.locations.append(chunk.location or None)
+    
+    def extend(self, chunks: Iterable[Chunk]):
+        for chunk in chunks:
+            self.append(chunk)
+    
+    def extend_batch(self, other: "ChunkBatch", start: int = 0, end: int = None):
+        end = len(other) if end is None else end
+        remap = {}
+        for i in range(start, end):
+            source = other.source_indexes[i]
+            if source not in remap:
+                remap[source] = self._intern(*other.sources[source])
+            self.source_indexes.append(remap[source])
+        self.contents.extend(other.contents[start:end])
+        self.chunk_ids.extend(other.chunk_ids[start:end])
+        self.chunk_indexes.extend(other.chunk_indexes[start:end])
+        self.locations.extend(other.locations[start:end])
+    
+    def select(self, indices: Iterable[int]) -> "ChunkBatch":
+        batch = ChunkBatch()
+        for i in indices:
+            batch.extend_batch(self, i, i + 1)
+        return batch
+    
+    def slice(self, start: int, end: int) -> "ChunkBatch":
+        batch = ChunkBatch()
+        batch.extend_batch(self, start, end)
+        return batch
+    
+    def _intern(self, source_file: str, metadata: Dict[str, Any]) -> int:
+        key = (source_file, id(metadata))
+        index = self._interned.get(key)
+        if index is None:
+            index = self._interned[key] = len(self.sources)
+            self.sources.append((source_file, metadata))
+        return index
+    
+    def __getstate__(self):
+        return self.contents, self.chunk_ids, self.chunk_indexes, self.source_indexes, self.sources, self.locations
+    
+    def __setstate__(self, state):
+        self.contents, self.chunk_ids, self.chunk_indexes, self.source_indexes, self.sources, self.locations = state
+        # Interning is keyed by object identity, which does not survive pickling
+        self._interned = {(source_file, id(metadata)): i for i, (source_file, metadata) in enumerate(self.sources)}
+    
+    def __len__(self) -> int:
+        return len(self.contents)
+    
+    def __getitem__(self, i: int) -> Chunk:
+        source_file, metadata = self.sources[self.source_indexes[i]]
+        return Chunk(
+            content=self.contents[i],
+            chunk_id=self.chunk_ids[i],
+            source_file=source_file,
+            chunk_index=self.chunk_indexes[i],
+            metadata=metadata,
+            location=self.locations[i]
+        )
+    
+    def __iter__(self) -> Iterator[Chunk]:
+        return (self[i] for i in range(len(self)))
+
 class SmartChunker:
     
     def __init__(self, chunk_size: int = None, overlap: int = None):
@@ -33,55 +143,91 @@ class SmartChunker:
         if not text or not text.strip():
             return []
         
-        metadata = metadata or {}
-        
-        paragraphs = self._split_into_paragraphs(text)
-        chunks = []
-        current_chunk = ""
+        return self.chunk_segments([(text, None)], source_file, metadata)
+    
+    def chunk_segments(self, segments: Iterable[Segment], source_file: str, metadata: Dict[str, Any] = None) -> List[Chunk]:
+        chunks = list(self.iter_chunks(segments, source_file, metadata))
+        logger.debug(f"Created {len(chunks)} chunks from {source_file}")
+        return chunks
+    
+    def iter_chunks(self, segments: Iterable[Segment], source_file: str, metadata: Dict[str, Any] = None) -> Iterator[Chunk]:
+        return self._with_overlap(self._iter_raw_chunks(segments, source_file, metadata or {}))
+    
+    def _iter_raw_chunks(self, segments: Iterable[Segment], source_file: str, metadata: Dict[str, Any]) -> Iterator[Tuple[Chunk, bool]]:
+        current_parts = []
+        current_len = 0
+        current_pages = []
         chunk_index = 0
         
-        for para in paragraphs:
-            if len(current_chunk) + len(para) <= self.chunk_size:
-                current_chunk += para + "\n\n"
-            else:
-                if current_chunk.strip():
-                    chunk = self._create_chunk(
-                        current_chunk.strip(),
+        for text, info in segments:
+            info = info or {}
+            page = info.get("page")
+            
+            if "metadata" in info:
+                if current_parts:
+                    yield self._create_chunk(
+                        "\n\n".join(current_parts),
                         source_file,
                         chunk_index,
-                        metadata
-                    )
-                    chunks.append(chunk)
+                        metadata,
+                        current_pages
+                    ), True
+                    chunk_index += 1
+                    current_parts, current_len, current_pages = [], 0, []
+                
+                pieces = [text.strip()] if len(text) <= self.chunk_size else self._split_large_paragraph(text)
+                for piece in pieces:
+                    if piece:
+                        yield self._create_chunk(
+                            piece,
+                            source_file,
+                            chunk_index,
+                            metadata,
+                            [page],
+                            info["metadata"]
+                        ), False
+                        chunk_index += 1
+                continue
+            
+            for para in self._split_into_paragraphs(text):
+                if current_len + len(para) <= self.chunk_size:
+                    current_parts.append(para)
+                    current_len += len(para) + 2
+                    current_pages.append(page)
+                    continue
+                
+                if current_parts:
+                    yield self._create_chunk(
+                        "\n\n".join(current_parts),
+                        source_file,
+                        chunk_index,
+                        metadata,
+                        current_pages
+                    ), True
                     chunk_index += 1
                 
                 if len(para) > self.chunk_size:
-                    sub_chunks = self._split_large_paragraph(para)
-                    for sub in sub_chunks:
-                        chunk = self._create_chunk(
+                    for sub in self._split_large_paragraph(para):
+                        yield self._create_chunk(
                             sub,
                             source_file,
                             chunk_index,
-                            metadata
-                        )
-                        chunks.append(chunk)
+                            metadata,
+                            [page]
+                        ), True
                         chunk_index += 1
-                    current_chunk = ""
+                    current_parts, current_len, current_pages = [], 0, []
                 else:
-                    current_chunk = para + "\n\n"
+                    current_parts, current_len, current_pages = [para], len(para) + 2, [page]
         
-        if current_chunk.strip():
-            chunk = self._create_chunk(
-                current_chunk.strip(),
+        if current_parts:
+            yield self._create_chunk(
+                "\n\n".join(current_parts),
                 source_file,
                 chunk_index,
-                metadata
-            )
-            chunks.append(chunk)
-        
-        chunks = self._add_overlap(chunks)
-        
-        logger.debug(f"Created {len(chunks)} chunks from {source_file}")
-        return chunks
+                metadata,
+                current_pages
+            ), True
     
     def _split_into_paragraphs(self, text: str) -> List[str]:
         paragraphs = re.split(r'\n\s*\n', text)
@@ -105,23 +251,44 @@ class SmartChunker:
         
         return chunks
     
-    def _create_chunk(self, content: str, source_file: str, chunk_index: int, metadata: Dict[str, Any]) -> Chunk:
-        chunk_id = f"{source_file}_{chunk_index}"
+    def _create_chunk(
+        self,
+        content: str,
+        source_file: str,
+        chunk_index: int,
+        metadata: Dict[str, Any],
+        pages: List[Optional[int]] = None,
+        location: Dict[str, Any] = None
+    ) -> Chunk:
+        chunk_id = make_chunk_id(source_file, metadata, chunk_index)
+        pages = [page for page in pages or [] if page is not None]
+        if pages:
+            location = {**(location or {}), "page_start": min(pages), "page_end": max(pages)}
         return Chunk(
             content=content,
             chunk_id=chunk_id,
             source_file=source_file,
             chunk_index=chunk_index,
-            metadata=metadata
+            metadata=metadata,
+            location=location or None
         )
     
-    def _add_overlap(self, chunks: List[Chunk]) -> List[Chunk]:
-        if len(chunks) <= 1 or self.overlap == 0:
-            return chunks
-        
-        for i in range(1, len(chunks)):
-            prev_content = chunks[i-1].content
-            overlap_text = prev_content[-self.overlap:] if len(prev_content) > self.overlap else prev_content
-            chunks[i].content = overlap_text + "\n..." + chunks[i].content
-        
-        return chunks
\ No newline at end of file
+    def _with_overlap(self, chunks: Iterator[Tuple[Chunk, bool]]) -> Iterator[Chunk]:
+        # Self-contained chunks (e.g. CSV row groups) neither receive nor donate overlap
+        previous = None
+        for chunk, overlaps in chunks:
+            if not overlaps:
+                previous = None
+                yield chunk
+                continue
+            if previous is not None and self.overlap > 0:
+                overlap_text = previous[-self.overlap:] if len(previous) > self.overlap else previous
+                chunk.content = overlap_text + "\n..." + chunk.content
+            previous = chunk.content
+            yield chunk
+
+def create_chunker():
+    if settings.chunker_mode == "tokens":
+        from ingestion.token_chunker import TokenChunker
+        return TokenChunker()
+    return SmartChunker()
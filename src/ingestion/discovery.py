@@ -0,0 +1,187 @@
+import fnmatch
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Dict, Iterator, NamedTuple, Optional, Set, Tuple
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_DONE = object()
+
+class ScanEntry(NamedTuple):
+    path: str
+    size: int
+    mtime: float
+
+class FileScanner:
+
+    def __init__(
+        self,
+        root: str,
+        include: List[str] = None,
+        exclude: List[str] = None,
+        workers: int = None,
+        base: str = None,
+        extensions: Set[str] = None
+    ):
+        # Paths are reported under root as given, so they match what the manifest stored
+        self.root = str(root)
+        # Globs are matched against paths relative to base (the input directory)
+        self.base = os.path.abspath(base or root)
+        self.include = list(include if include is not None else settings.discovery_include)
+        self.exclude = list(exclude if exclude is not None else settings.discovery_exclude)
+        self.workers = workers or settings.discovery_workers
+        self.extensions = extensions
+
+    def matches(self, path: str) -> bool:
+        if self.extensions is not None and os.path.splitext(path)[1].lower() not in self.extensions:
+            return False
+        relative = self._relative(path)
+        name = os.path.basename(path)
+        if self._excluded(relative, name):
+            return False
+        return not self.include or any(
+            fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in self.include
+        )
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.base).replace(os.sep, "/")
+
+    def _excluded(self, relative: str, name: str) -> bool:
+        return any(
+            fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern)
+            for pattern in self.exclude
+        )
+
+    def scan(self) -> Iterator[ScanEntry]:
+        if not os.path.isdir(self.root):
+            return
+        if self.workers <= 1:
+            yield from self._scan_serial()
+            return
+        yield from self._scan_parallel()
+
+    def _scan_directory(self, directory: str) -> Tuple[List[ScanEntry], List[str]]:
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self._excluded(self._relative(entry.path), entry.name):
+                                subdirs.append(entry.path)
+                        elif entry.is_file():
+                            if not self.matches(entry.path):
+                                continue
+                            # The entry type comes from the dirent; only files that pass the
+                            # filters cost a stat call, and DirEntry caches it
+                            stat = entry.stat()
+                            files.append(ScanEntry(entry.path, stat.st_size, stat.st_mtime))
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"Cannot scan {directory}: {e}")
+        return files, subdirs
+
+    def _scan_serial(self) -> Iterator[ScanEntry]:
+        stack = [self.root]
+        while stack:
+            files, subdirs = self._scan_directory(stack.pop())
+            yield from files
+            stack.extend(subdirs)
+
+    def _scan_parallel(self) -> Iterator[ScanEntry]:
+        # Each directory is a task; workers hand back its files and queue its subdirectories,
+        # so wide trees on slow filesystems are listed by several threads at once
+        results: queue.Queue = queue.Queue(maxsize=self.workers * 4)
+        cancelled = threading.Event()
+        outstanding = [1]
+        lock = threading.Lock()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="discovery")
+
+        def put(item) -> bool:
+            while not cancelled.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def visit(directory: str):
+            try:
+                if cancelled.is_set():
+                    return
+                files, subdirs = self._scan_directory(directory)
+                with lock:
+                    outstanding[0] += len(subdirs)
+                for i, subdir in enumerate(subdirs):
+                    try:
+                        executor.submit(visit, subdir)
+                    except RuntimeError:
+                        # The consumer stopped early and the pool is shutting down
+                        with lock:
+                            outstanding[0] -= len(subdirs) - i
+                        break
+                if files:
+                    put(files)
+            finally:
+                with lock:
+                    outstanding[0] -= 1
+                    finished = outstanding[0] == 0
+                if finished:
+                    put(_DONE)
+
+        executor.submit(visit, self.root)
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    return
+                yield from item
+        finally:
+            cancelled.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+@dataclass
+class SnapshotDiff:
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> List[str]:
+        return self.added + self.modified + self.removed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+class Snapshot:
+
+    def __init__(self, entries: Dict[str, Tuple[int, float]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def from_scan(cls, entries: Iterator[ScanEntry]) -> "Snapshot":
+        return cls({entry.path: (entry.size, entry.mtime) for entry in entries})
+
+    def diff(self, previous: Optional["Snapshot"]) -> SnapshotDiff:
+        # One pass over each side: dict lookups keep the comparison linear in the file count
+        old = previous.entries if previous else {}
+        result = SnapshotDiff()
+        for path, signature in self.entries.items():
+            before = old.get(path)
+            if before is None:
+                result.added.append(path)
+            elif before != signature:
+                result.modified.append(path)
+        result.removed = [path for path in old if path not in self.entries]
+        return result
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -1,7 +1,8 @@
 import os
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional
 from dataclasses import dataclass
+from ingestion.discovery import FileScanner, ScanEntry, Snapshot
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -12,6 +13,7 @@ class FileMetadata:
     file_name: str
     file_type: str
     file_size: int
+    mtime: float = 0.0
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -47,23 +49,55 @@ class FileLoader:
             logger.info(f"Created input directory: {self.input_dir}")
     
     def discover_files(self) -> List[FileMetadata]:
-        files = []
-        for file_path in self.input_dir.rglob('*'):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                if ext in self.SUPPORTED_EXTENSIONS:
-                    metadata = FileMetadata(
-                        file_path=str(file_path),
-                        file_name=file_path.name,
-                        file_type=self.SUPPORTED_EXTENSIONS[ext],
-                        file_size=file_path.stat().st_size
-                    )
-                    files.append(metadata)
-                    logger.debug(f"Discovered: {file_path.name} ({metadata.file_type})")
-        
+        files = list(self.iter_files())
         logger.info(f"Discovered {len(files)} supported files")
         return files
     
+    def iter_files(self, root: str = None) -> Iterator[FileMetadata]:
+        for entry in self.scanner(root).scan():
+            metadata = self._metadata_from_entry(entry)
+            logger.debug(f"Discovered: {metadata.file_name} ({metadata.file_type})")
+            yield metadata
+    
+    def snapshot(self, root: str = None) -> Snapshot:
+        return Snapshot.from_scan(self.scanner(root).scan())
+    
+    def scanner(self, root: str = None) -> FileScanner:
+        return FileScanner(
+            str(root or self.input_dir),
+            base=str(self.input_dir),
+            extensions=set(self.SUPPORTED_EXTENSIONS)
+        )
+    
+    def get_file_metadata(self, file_path: str) -> Optional[FileMetadata]:
+        path = Path(file_path)
+        if not path.is_file() or not self.scanner().matches(file_path):
+            return None
+        return self._build_metadata(path)
+    
+    def _metadata_from_entry(self, entry: ScanEntry) -> FileMetadata:
+        name = os.path.basename(entry.path)
+        return FileMetadata(
+            file_path=entry.path,
+            file_name=name,
+            file_type=self.SUPPORTED_EXTENSIONS[os.path.splitext(name)[1].lower()],
+            file_size=entry.size,
+            mtime=entry.mtime
+        )
+    
+    def _build_metadata(self, file_path: Path) -> Optional[FileMetadata]:
+        ext = file_path.suffix.lower()
+        if ext not in self.SUPPORTED_EXTENSIONS:
+            return None
+        stat = file_path.stat()
+        return FileMetadata(
+            file_path=str(file_path),
+            file_name=file_path.name,
+            file_type=self.SUPPORTED_EXTENSIONS[ext],
+            file_size=stat.st_size,
+            mtime=stat.st_mtime
+        )
+    
     def load_file(self, file_path: str) -> bytes:
         with open(file_path, 'rb') as f:
             return f.read()
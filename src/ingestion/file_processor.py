@@ -0,0 +1,109 @@
+from concurrent.futures import Executor
+from itertools import islice
+from typing import List, Optional, Iterable, Iterator, Tuple
+from config import settings
+from ingestion.file_loader import FileMetadata
+from ingestion.text_processor import TextProcessor
+from ingestion.pdf_processor import PDFProcessor, hand_back_large_pdfs
+from ingestion.image_processor import ImageProcessor
+from ingestion.office_processor import OfficeProcessor
+from ingestion.structured_processor import StructuredProcessor
+from ingestion.chunker import SmartChunker, ChunkBatch, Segment, create_chunker
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class FileProcessor:
+
+    def __init__(self, chunker: SmartChunker = None):
+        self.text_processor = TextProcessor()
+        self.pdf_processor = PDFProcessor()
+        self.image_processor = ImageProcessor()
+        self.office_processor = OfficeProcessor()
+        self.structured_processor = StructuredProcessor()
+        self.chunker = chunker or create_chunker()
+
+    def iter_batches(self, file_meta: FileMetadata, executor: Executor = None, content_hash: str = None) -> Iterator[ChunkBatch]:
+        # Errors propagate; the caller keeps a failed file out of the manifest so it is retried
+        logger.info(f"Processing: {file_meta.file_name} ({file_meta.file_type})")
+        yield from self.chunk_batches(file_meta, self.iter_segments(file_meta, executor, content_hash))
+
+    def chunk_batches(self, file_meta: FileMetadata, segments: Iterable[Segment], batch_size: int = None) -> Iterator[ChunkBatch]:
+        # Chunks leave in bounded batches, so a large file is never held whole
+        batch_size = batch_size or settings.embedding_batch_size
+        chunks = self.chunker.iter_chunks(segments, file_meta.file_name, file_meta.to_dict())
+        total = 0
+        while True:
+            batch = ChunkBatch.from_chunks(islice(chunks, batch_size))
+            if not batch:
+                break
+            total += len(batch)
+            yield batch
+
+        if total:
+            logger.info(f"Created {total} chunks from {file_meta.file_name}")
+        else:
+            logger.warning(f"No content extracted from {file_meta.file_name}")
+
+    def iter_segments(self, file_meta: FileMetadata, executor: Executor = None, content_hash: str = None) -> Iterator[Segment]:
+        # Paged formats stream page by page so a large document is never held as one string
+        if file_meta.file_type == 'pdf':
+            return self.pdf_processor.iter_pages(file_meta.file_path, executor)
+        if file_meta.file_type == 'csv':
+            return self.text_processor.iter_csv_segments(file_meta.file_path, self.chunker.chunk_size)
+        if file_meta.file_type == 'docx':
+            return self.office_processor.iter_docx(file_meta.file_path)
+        if file_meta.file_type == 'excel' and file_meta.file_path.lower().endswith('.xlsx'):
+            return self.office_processor.iter_xlsx(file_meta.file_path, self.chunker.chunk_size)
+        if file_meta.file_type == 'json':
+            return self.structured_processor.iter_json(file_meta.file_path, self.chunker.chunk_size)
+        if file_meta.file_type == 'yaml':
+            return self.structured_processor.iter_yaml(file_meta.file_path, self.chunker.chunk_size)
+
+        content = self.extract_content(file_meta, content_hash)
+        return iter([(content, None)] if content else [])
+
+    def extract_content(self, file_meta: FileMetadata, content_hash: str = None) -> str:
+        file_type = file_meta.file_type
+        file_path = file_meta.file_path
+
+        processors = {
+            'text': lambda: self.text_processor.process_text(file_path),
+            'markdown': lambda: self.text_processor.process_markdown(file_path),
+            'yaml': lambda: self.text_processor.process_yaml(file_path),
+            'json': lambda: self.text_processor.process_json(file_path),
+            'csv': lambda: self.text_processor.process_csv(file_path),
+            'pdf': lambda: self.pdf_processor.process_pdf(file_path),
+            'image': lambda: self._process_image_content(file_path, content_hash),
+            'docx': lambda: "\n\n".join(text for text, _ in self.office_processor.iter_docx(file_path)),
+        }
+
+        processor = processors.get(file_type)
+        if processor:
+            return processor()
+        else:
+            logger.warning(f"No processor for type: {file_type}")
+            return ""
+
+    def _process_image_content(self, file_path: str, content_hash: str = None) -> str:
+        return self.image_processor.process_image(file_path, content_hash)
+
+    def prefetch(self, files: List[Tuple[FileMetadata, str]]):
+        self.image_processor.prefetch(
+            (file_meta.file_path, content_hash) for file_meta, content_hash in files if file_meta.file_type == 'image'
+        )
+
+    def clear_prefetched(self):
+        self.image_processor.clear_prefetched()
+
+# Each pool worker builds its own processor once instead of pickling one per task
+_worker_processor: Optional[FileProcessor] = None
+
+def init_worker():
+    global _worker_processor
+    _worker_processor = FileProcessor()
+    hand_back_large_pdfs()
+
+def process_file_in_worker(file_meta: FileMetadata) -> ChunkBatch:
+    # The result is pickled back to the parent, so a worker returns the file's chunks at once
+    return ChunkBatch.concat(_worker_processor.iter_batches(file_meta))
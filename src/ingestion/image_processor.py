@@ -1,36 +1,94 @@
 import base64
+import io
+import threading
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
 from PIL import Image
-from typing import Optional
+from typing import Optional, Iterable, Dict, Deque, Tuple
+from config import settings
+from ingestion.ocr import OCREngine, get_ocr_engine
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class ImageProcessor:
     
-    @staticmethod
-    def process_image_with_ocr(file_path: str) -> str:
+    def __init__(self, ocr_engine: OCREngine = None):
+        self.ocr_engine = ocr_engine or get_ocr_engine()
+        # Keyed by content hash as well as path, so a file that changed since it was queued
+        # is never answered with the old image's text
+        self._prefetched: Dict[Tuple[str, str], Future] = {}
+        self._queued: Deque[Tuple[str, str]] = deque()
+        self._prefetch_lock = threading.Lock()
+    
+    def process_image(self, file_path: str, content_hash: str = None) -> str:
+        with self._prefetch_lock:
+            future = self._prefetched.pop((file_path, content_hash), None) if content_hash else None
+            self._submit_queued()
+        if future is not None:
+            return future.result()
+        return self._process_image(file_path)
+    
+    def prefetch(self, files: Iterable[Tuple[str, str]]):
+        # Only a few images are read and recognised ahead of the consumer; the rest wait in
+        # the queue until earlier results are taken
+        with self._prefetch_lock:
+            self._queued.extend(files)
+            self._submit_queued()
+    
+    def clear_prefetched(self):
+        # Called when a job ends, so results are never carried into the next one
+        with self._prefetch_lock:
+            for future in self._prefetched.values():
+                future.cancel()
+            self._prefetched.clear()
+            self._queued.clear()
+    
+    def _submit_queued(self):
+        limit = max(1, settings.ocr_workers * 2)
+        while self._queued and len(self._prefetched) < limit:
+            key = self._queued.popleft()
+            if key not in self._prefetched:
+                self._prefetched[key] = self.ocr_engine.executor.submit(self._process_image, key[0])
+    
+    def _process_image(self, file_path: str) -> str:
+        # Errors propagate, so the image is left out of the manifest and retried next run
+        name = Path(file_path).name
+        try:
+            with open(file_path, "rb") as f:
+                data = f.read()
+            # One decode serves both the description and tesseract
+            img = Image.open(io.BytesIO(data))
+            width, height = img.size
+            description = f"Image File: {name}\n"
+            description += f"Format: {img.format or 'unknown'}\n"
+            description += f"Dimensions: {width}x{height} pixels\n"
+            description += "Note: For detailed image analysis, consider using a vision model.\n"
+        except Exception as e:
+            logger.error(f"Error getting image info {file_path}: {e}")
+            if not settings.ocr_failure_placeholder:
+                raise
+            return f"Image: {name}\n\nImage: {name} (processing failed)"
+        
         try:
-            import pytesseract
-            
-            img = Image.open(file_path)
-            text = pytesseract.image_to_string(img)
-            
-            if text.strip():
-                content = f"Image OCR: {Path(file_path).name}\n"
-                content += f"Extracted Text:\n{text}"
-                logger.debug(f"OCR processed image: {Path(file_path).name}")
-                return content
-            else:
-                logger.warning(f"No text extracted from image: {Path(file_path).name}")
-                return f"Image: {Path(file_path).name} (no text detected)"
-                
+            text = self.ocr_engine.ocr(data, img)
         except ImportError:
             logger.warning("pytesseract not installed, skipping OCR")
-            return f"Image: {Path(file_path).name} (OCR not available)"
+            if not settings.ocr_failure_placeholder:
+                raise
+            return f"{description}\n\nImage: {name} (OCR not available)"
         except Exception as e:
             logger.error(f"Error processing image {file_path}: {e}")
-            return f"Image: {Path(file_path).name} (processing failed)"
+            if not settings.ocr_failure_placeholder:
+                raise
+            return f"{description}\n\nImage: {name} (processing failed)"
+        
+        if text.strip():
+            logger.debug(f"OCR processed image: {name}")
+            return f"{description}\n\nImage OCR: {name}\nExtracted Text:\n{text}"
+        logger.warning(f"No text extracted from image: {name}")
+        return f"{description}\n\nImage: {name} (no text detected)"
     
     @staticmethod
     def encode_image_base64(file_path: str) -> Optional[str]:
@@ -40,20 +98,3 @@ class ImageProcessor:
         except Exception as e:
             logger.error(f"Error encoding image {file_path}: {e}")
             return None
-    
-    @staticmethod
-    def get_image_description_placeholder(file_path: str) -> str:
-        try:
-            img = Image.open(file_path)
-            width, height = img.size
-            format_name = img.format or "unknown"
-            
-            content = f"Image File: {Path(file_path).name}\n"
-            content += f"Format: {format_name}\n"
-            content += f"Dimensions: {width}x{height} pixels\n"
-            content += "Note: For detailed image analysis, consider using a vision model.\n"
-            
-            return content
-        except Exception as e:
-            logger.error(f"Error getting image info {file_path}: {e}")
-            return f"Image: {Path(file_path).name}"
\ No newline at end of file
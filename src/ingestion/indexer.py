@@ -1,19 +1,71 @@
-from typing import List
+from typing import List, Dict, Any, Iterator, Iterable, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from contextlib import closing
+import multiprocessing
 import os
+import threading
+from config import settings
 from ingestion.file_loader import FileLoader, FileMetadata
-from ingestion.text_processor import TextProcessor
-from ingestion.pdf_processor import PDFProcessor
-from ingestion.image_processor import ImageProcessor
-from ingestion.chunker import SmartChunker, Chunk
+from ingestion.file_processor import FileProcessor, init_worker, process_file_in_worker
+from ingestion.manifest import IndexManifest, ManifestEntry, hash_file
+from ingestion.pipeline import IngestionPipeline, FileTask, FilePart
+from ingestion.batch_writer import EmbeddingBatchWriter
+from ingestion.chunker import ChunkBatch
+from ingestion.pdf_processor import SplitRequired
 from retriever.vector_store import VectorStore
+from retriever.generations import generation_path
 from utils.logger import get_logger
 from utils.metrics import metrics_collector
 
 logger = get_logger(__name__)
 
+class IndexerBusy(RuntimeError):
+    """Raised when a non-blocking call finds another indexing run holding the indexer"""
+
+@dataclass
+class IndexStats:
+    files_discovered: int = 0
+    files_added: int = 0
+    files_updated: int = 0
+    files_skipped: int = 0
+    files_deleted: int = 0
+    files_failed: int = 0
+    files_written: int = 0
+    total_chunks: int = 0
+    duplicate_chunks: int = 0
+    # Pipeline stages report from several threads
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    
+    def add(self, **counts: int):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+    
+    @property
+    def files_processed(self) -> int:
+        return self.files_added + self.files_updated
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "files_discovered": self.files_discovered,
+            "files_added": self.files_added,
+            "files_updated": self.files_updated,
+            "files_skipped": self.files_skipped,
+            "files_deleted": self.files_deleted,
+            "files_failed": self.files_failed,
+            "files_processed": self.files_processed,
+            "files_written": self.files_written,
+            "total_chunks": self.total_chunks,
+            "duplicate_chunks": self.duplicate_chunks
+        }
+
 class DocumentIndexer:
     
-    def __init__(self, input_dir: str = None):
+    def __init__(self, input_dir: str = None, workers: int = None):
         if input_dir is None:
             # Get the project root (parent of src directory)
             current_file = os.path.abspath(__file__)
@@ -23,76 +75,385 @@ class DocumentIndexer:
             input_dir = os.path.join(project_root, "data", "input")
         logger.info(f"Using input directory: {input_dir}")
         self.file_loader = FileLoader(input_dir)
-        self.text_processor = TextProcessor()
-        self.pdf_processor = PDFProcessor()
-        self.image_processor = ImageProcessor()
-        self.chunker = SmartChunker()
+        self.file_processor = FileProcessor()
+        self.workers = workers or settings.ingestion_workers
         self.vector_store = VectorStore()
+        self.duplicates = self.vector_store.duplicates
+        self.manifest = IndexManifest()
+        # During a rebuild self.manifest is the generation being built; callers that do not
+        # hold the lock read the live one, which always describes what queries see
+        self.live_manifest = self.manifest
+        self.last_stats = IndexStats()
+        self._lock = threading.RLock()
+    
+    def index_all_documents(
+        self,
+        force: bool = False,
+        stats: IndexStats = None,
+        cancel: threading.Event = None
+    ) -> int:
+        # Callers that pass their own stats can watch the run progress; setting cancel stops
+        # planning new files and lets the files already in flight finish
+        with self._lock:
+            if force and settings.blue_green_reindex:
+                return self._rebuild(stats if stats is not None else IndexStats(), cancel)
+            
+            metric = metrics_collector.track("full_indexing")
+            stats = stats if stats is not None else IndexStats()
+            
+            known = self.manifest.all_entries()
+            tasks = self._plan_files(self.file_loader.iter_files(), known, force, stats, cancel)
+            self._run_tasks(tasks, stats, cancel)
+            
+            if cancel is not None and cancel.is_set():
+                # Discovery stopped early, so unseen manifest entries are not known to be gone
+                logger.info(f"Indexing cancelled after {stats.files_written} files")
+            elif stats.files_discovered == 0:
+                logger.warning("No files found to index")
+            
+            if cancel is None or not cancel.is_set():
+                # Whatever is left in the manifest was not rediscovered, so the file is gone
+                self._remove_files(list(known), stats)
+            
+            self.last_stats = stats
+            metric.stop().add_metadata(
+                mode=settings.ingestion_mode,
+                workers=self.workers,
+                **stats.to_dict()
+            )
+            logger.info(
+                f"Indexed {stats.files_processed} files into {stats.total_chunks} chunks "
+                f"({stats.files_skipped} unchanged, {stats.files_updated} updated, "
+                f"{stats.files_deleted} deleted)"
+            )
+            return stats.total_chunks
     
-    def index_all_documents(self) -> int:
+    def _rebuild(self, stats: IndexStats, cancel: threading.Event = None) -> int:
+        # Builds a fresh generation next to the live one, which keeps serving queries, and
+        # only switches readers over once every file has been written
         metric = metrics_collector.track("full_indexing")
+        live_store, live_manifest = self.vector_store, self.manifest
+        generation = live_store.generations.create()
+        logger.info(f"Rebuilding index into generation {generation}")
         
-        files = self.file_loader.discover_files()
-        if not files:
-            logger.warning("No files found to index")
-            return 0
-        
-        total_chunks = 0
-        for file_meta in files:
-            chunks = self._process_file(file_meta)
-            if chunks:
-                self.vector_store.add_documents(chunks)
-                total_chunks += len(chunks)
+        self.vector_store = live_store.for_generation(generation)
+        self.duplicates = self.vector_store.duplicates
+        self.manifest = IndexManifest(generation_path(live_manifest.db_path, generation))
+        previous = None
+        try:
+            tasks = self._plan_files(self.file_loader.iter_files(), {}, True, stats, cancel)
+            self._run_tasks(tasks, stats, cancel)
+            
+            if cancel is not None and cancel.is_set():
+                logger.info(f"Rebuild cancelled after {stats.files_written} files; keeping the live generation")
+            else:
+                stats.files_deleted = sum(1 for path in live_manifest.all_entries() if not os.path.exists(path))
+                previous = self.vector_store.activate()
+                os.replace(self.manifest.db_path, live_manifest.db_path)
+        finally:
+            if previous is None:
+                live_store.drop_generation(generation)
+                if os.path.exists(self.manifest.db_path):
+                    os.remove(self.manifest.db_path)
+                self.vector_store, self.manifest = live_store, live_manifest
+            else:
+                self.manifest = live_manifest
+                # Readers may still be on the generation just replaced; they drop it after
+                # switching, anything older is no longer in use
+                self.vector_store.collect_generations(keep={previous})
+            self.duplicates = self.vector_store.duplicates
         
-        metric.stop().add_metadata(files_processed=len(files), total_chunks=total_chunks)
-        logger.info(f"Indexed {len(files)} files into {total_chunks} chunks")
-        return total_chunks
+        self.last_stats = stats
+        metric.stop().add_metadata(mode=settings.ingestion_mode, workers=self.workers, generation=generation, **stats.to_dict())
+        logger.info(
+            f"Rebuilt generation {generation} from {stats.files_written} files into {stats.total_chunks} chunks "
+            f"({stats.files_failed} failed)"
+        )
+        return stats.total_chunks
     
-    def _process_file(self, file_meta: FileMetadata) -> List[Chunk]:
-        logger.info(f"Processing: {file_meta.file_name} ({file_meta.file_type})")
-        
+    def index_paths(self, paths: Iterable[str]) -> IndexStats:
+        with self._lock:
+            metric = metrics_collector.track("incremental_indexing")
+            stats = IndexStats()
+            
+            present = []
+            removed = []
+            for path in paths:
+                if os.path.isdir(path):
+                    present.extend(self.file_loader.iter_files(path))
+                    continue
+                file_meta = self.file_loader.get_file_metadata(path)
+                if file_meta:
+                    present.append(file_meta)
+                elif not os.path.exists(path):
+                    # Covers deleted files as well as deleted or moved-away directories
+                    removed.extend(self.manifest.paths_under(path))
+            
+            known = {}
+            for file_meta in present:
+                entry = self.manifest.get(file_meta.file_path)
+                if entry:
+                    known[file_meta.file_path] = entry
+            
+            self._run_tasks(self._plan_files(present, known, False, stats), stats)
+            self._remove_files(removed, stats)
+            
+            self.last_stats = stats
+            metric.stop().add_metadata(**stats.to_dict())
+            logger.info(
+                f"Incrementally indexed {stats.files_processed} files into {stats.total_chunks} chunks "
+                f"({stats.files_skipped} unchanged, {stats.files_deleted} deleted)"
+            )
+            return stats
+    
+    def index_files(self, files: Iterable[Tuple[str, Optional[str]]], blocking: bool = True) -> IndexStats:
+        # Indexes only the given files; a content hash computed by the caller (e.g. while
+        # receiving an upload) saves reading the file a second time. With blocking=False,
+        # raises IndexerBusy instead of waiting out a running job such as a full rebuild
+        if not self._lock.acquire(blocking=blocking):
+            raise IndexerBusy("Another indexing run is in progress")
         try:
-            content = self._extract_content(file_meta)
-            if not content:
-                logger.warning(f"No content extracted from {file_meta.file_name}")
-                return []
+            return self._index_files(files)
+        finally:
+            self._lock.release()
+    
+    def _index_files(self, files: Iterable[Tuple[str, Optional[str]]]) -> IndexStats:
+        metric = metrics_collector.track("file_indexing")
+        stats = IndexStats()
+        
+        tasks = []
+        for file_path, content_hash in files:
+            file_meta = self.file_loader.get_file_metadata(file_path)
+            if file_meta is None:
+                logger.warning(f"Not a supported input file: {file_path}")
+                stats.files_failed += 1
+                continue
+            stats.files_discovered += 1
+            
+            previous = self.manifest.get(file_path)
+            entry = ManifestEntry(
+                file_path=file_meta.file_path,
+                file_size=file_meta.file_size,
+                mtime=file_meta.mtime,
+                content_hash=content_hash or hash_file(file_path)
+            )
+            if previous and previous.content_hash == entry.content_hash:
+                stats.files_skipped += 1
+                continue
             
-            metadata = file_meta.to_dict()
-            chunks = self.chunker.chunk_text(content, file_meta.file_name, metadata)
+            if previous:
+                stats.files_updated += 1
+            else:
+                stats.files_added += 1
+            tasks.append(FileTask(file_meta=file_meta, entry=entry, replaces_existing=previous is not None))
+        
+        self._run_tasks(tasks, stats)
+        
+        self.last_stats = stats
+        metric.stop().add_metadata(**stats.to_dict())
+        logger.info(
+            f"Indexed {stats.files_written} of {len(tasks)} files into {stats.total_chunks} chunks "
+            f"({stats.files_skipped} unchanged)"
+        )
+        return stats
+    
+    
+    def _run_tasks(self, tasks: Iterable[FileTask], stats: IndexStats, cancel: threading.Event = None):
+        if settings.ingestion_mode == "pipeline":
+            pipeline = IngestionPipeline(
+                self.file_processor,
+                self.vector_store,
+                on_file_written=lambda task: self._commit_file(task, stats),
+                on_file_failed=lambda task: self._fail_file(task, stats),
+                on_part_chunked=lambda part: self._drop_duplicates(part, stats)
+            )
+            pipeline.run(tasks)
+            self.vector_store.flush()
+            return
+        
+        tasks = list(tasks)
+        processed = self._iter_processed(tasks)
+        writer = EmbeddingBatchWriter(
+            self.vector_store,
+            on_commit=lambda task: self._commit_file(task, stats),
+            on_failure=lambda task: self._fail_file(task, stats)
+        )
+        with writer, closing(processed):
+            for task, batches in zip(tasks, processed):
+                if cancel is not None and cancel.is_set():
+                    break
+                with closing(batches):
+                    index = 0
+                    try:
+                        for chunks in batches:
+                            part = FilePart(task, chunks, index)
+                            index += 1
+                            self._drop_duplicates(part, stats)
+                            if not writer.add(part):
+                                break
+                        else:
+                            final = FilePart(task, ChunkBatch(), index, final=True)
+                            self._drop_duplicates(final, stats)
+                            writer.add(final)
+                    except Exception as e:
+                        logger.error(f"Error processing {task.file_meta.file_name}: {e}")
+                        writer.fail(task)
+        self.vector_store.flush()
+    
+    def _remove_files(self, file_paths: List[str], stats: IndexStats):
+        for file_path in file_paths:
+            self._release_duplicates(file_path)
+            self.vector_store.delete_by_file(file_path)
+            logger.info(f"Removed deleted file from index: {file_path}")
+        if file_paths:
+            self.vector_store.flush()
+        self.manifest.remove(file_paths)
+        stats.files_deleted += len(file_paths)
+    
+    def _drop_duplicates(self, part: FilePart, stats: IndexStats):
+        if self.duplicates is None:
+            return
+        task = part.task
+        if part.index == 0 and task.replaces_existing:
+            # The old version must not act as the original for its own new chunks
+            self._release_duplicates(task.file_meta.file_path)
+        if not part.chunks:
+            return
+        
+        keep = self.duplicates.stage(
+            task.file_meta.file_path,
+            part.chunks.chunk_ids,
+            part.chunks.contents,
+            self.vector_store.flatten_metadata(part.chunks)
+        )
+        if len(keep) < len(part.chunks):
+            stats.add(duplicate_chunks=len(part.chunks) - len(keep))
+            part.chunks = part.chunks.select(keep)
+    
+    def _release_duplicates(self, file_path: str):
+        if self.duplicates is not None:
+            self.vector_store.promote(self.duplicates.remove_file(file_path))
+    
+    def _plan_files(
+        self,
+        files: Iterable[FileMetadata],
+        known: Dict[str, ManifestEntry],
+        force: bool,
+        stats: IndexStats,
+        cancel: threading.Event = None
+    ) -> Iterator[FileTask]:
+        for file_meta in files:
+            if cancel is not None and cancel.is_set():
+                return
+            stats.files_discovered += 1
+            previous = known.pop(file_meta.file_path, None)
+            if force:
+                entry = ManifestEntry(
+                    file_path=file_meta.file_path,
+                    file_size=file_meta.file_size,
+                    mtime=file_meta.mtime,
+                    content_hash=hash_file(file_meta.file_path)
+                )
+            else:
+                entry = self.manifest.check(
+                    file_meta.file_path,
+                    file_meta.file_size,
+                    file_meta.mtime,
+                    previous
+                )
             
-            logger.info(f"Created {len(chunks)} chunks from {file_meta.file_name}")
-            return chunks
+            if entry is None:
+                stats.files_skipped += 1
+                continue
             
-        except Exception as e:
-            logger.error(f"Error processing {file_meta.file_name}: {e}")
-            return []
+            if previous:
+                stats.files_updated += 1
+            else:
+                stats.files_added += 1
+            yield FileTask(file_meta=file_meta, entry=entry, replaces_existing=previous is not None)
     
-    def _extract_content(self, file_meta: FileMetadata) -> str:
-        file_type = file_meta.file_type
-        file_path = file_meta.file_path
+    def _commit_file(self, task: FileTask, stats: IndexStats):
+        if self.duplicates is not None:
+            # Only chunks that made it into the store may act as originals
+            self.duplicates.commit_file(task.file_meta.file_path)
+        task.entry.chunk_count = task.chunk_count
+        self.manifest.upsert(task.entry)
+        stats.add(total_chunks=task.chunk_count, files_written=1)
+    
+    def _fail_file(self, task: FileTask, stats: IndexStats):
+        # Leave the manifest untouched so the file is retried on the next run
+        if self.duplicates is not None:
+            self.duplicates.discard_file(task.file_meta.file_path)
+        stats.add(files_failed=1)
+    
+    def _iter_processed(self, tasks: List[FileTask]) -> Iterator[Iterator[ChunkBatch]]:
+        # One iterator of bounded chunk batches per task, in task order; extraction errors
+        # surface while it is consumed
+        files = [task.file_meta for task in tasks]
+        if self.workers <= 1 or len(files) <= 1:
+            # OCR is the slowest per-file step; run it ahead on the OCR pool while earlier files are chunked
+            self.file_processor.prefetch((task.file_meta, task.entry.content_hash) for task in tasks)
+            try:
+                for task in tasks:
+                    yield self.file_processor.iter_batches(task.file_meta, content_hash=task.entry.content_hash)
+            finally:
+                self.file_processor.clear_prefetched()
+            return
         
-        processors = {
-            'text': lambda: self.text_processor.process_text(file_path),
-            'markdown': lambda: self.text_processor.process_markdown(file_path),
-            'yaml': lambda: self.text_processor.process_yaml(file_path),
-            'json': lambda: self.text_processor.process_json(file_path),
-            'csv': lambda: self.text_processor.process_csv(file_path),
-            'pdf': lambda: self.pdf_processor.process_pdf(file_path),
-            'image': lambda: self._process_image_content(file_path),
-        }
+        logger.info(f"Processing {len(files)} files with {self.workers} worker processes")
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker
+        )
+        pool_broken = False
+        stream_bytes = settings.ingestion_stream_file_mb * 2 ** 20
         
-        processor = processors.get(file_type)
-        if processor:
-            return processor()
-        else:
-            logger.warning(f"No processor for type: {file_type}")
-            return ""
-    
-    def _process_image_content(self, file_path: str) -> str:
-        ocr_text = self.image_processor.process_image_with_ocr(file_path)
-        description = self.image_processor.get_image_description_placeholder(file_path)
-        return f"{description}\n\n{ocr_text}"
+        def submit(file_meta: FileMetadata):
+            nonlocal pool_broken
+            # A worker returns a whole file at once, so large files are streamed in-process instead
+            if pool_broken or file_meta.file_size >= stream_bytes:
+                return None
+            try:
+                return executor.submit(process_file_in_worker, file_meta)
+            except BrokenProcessPool:
+                logger.error("Worker pool broke, processing remaining files in-process")
+                pool_broken = True
+                return None
+        
+        try:
+            # Keep a bounded window of in-flight files and yield strictly in submission order
+            file_iter = iter(files)
+            in_flight = deque(
+                (file_meta, submit(file_meta))
+                for file_meta in islice(file_iter, self.workers * 2)
+            )
+            
+            while in_flight:
+                file_meta, future = in_flight.popleft()
+                if future is None:
+                    batches = self.file_processor.iter_batches(file_meta, None if pool_broken else executor)
+                else:
+                    batches = self._iter_worker_result(file_meta, future, None if pool_broken else executor)
+                
+                next_meta = next(file_iter, None)
+                if next_meta is not None:
+                    in_flight.append((next_meta, submit(next_meta)))
+                
+                yield batches
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _iter_worker_result(self, file_meta: FileMetadata, future: Future, executor: Optional[Executor]) -> Iterator[ChunkBatch]:
+        try:
+            chunks = future.result()
+        except SplitRequired:
+            # Fan the page ranges of a very large PDF out over the same pool
+            yield from self.file_processor.iter_batches(file_meta, executor)
+            return
+        yield chunks
     
     def clear_index(self):
         self.vector_store.clear()
+        self.manifest.clear()
         logger.info("Cleared all indexed documents")
\ No newline at end of file
@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable
+from ingestion.indexer import DocumentIndexer, IndexStats
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_FINISHED_JOBS = 50
+
+@dataclass
+class IndexJob:
+    job_id: str
+    force: bool = False
+    status: str = "queued"
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    stats: IndexStats = field(default_factory=IndexStats)
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        stats = self.stats
+        elapsed = self.elapsed
+        files_done = stats.files_written + stats.files_failed
+        files_per_second = files_done / elapsed if elapsed > 0 else 0.0
+        chunks_per_second = stats.total_chunks / elapsed if elapsed > 0 else 0.0
+
+        # Files are planned as they are discovered, so the ETA firms up once discovery ends
+        remaining = max(0, stats.files_processed - files_done)
+        eta = None
+        if self.status == "running" and files_per_second > 0:
+            eta = round(remaining / files_per_second, 1)
+
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "force": self.force,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_done": files_done,
+            "files_remaining": remaining,
+            "chunks_written": stats.total_chunks,
+            "files_per_second": round(files_per_second, 2),
+            "chunks_per_second": round(chunks_per_second, 2),
+            "eta_seconds": eta,
+            "error": self.error,
+            "stats": stats.to_dict()
+        }
+
+class JobManager:
+
+    def __init__(self, indexer: DocumentIndexer, on_finished: Callable[[IndexJob], None] = None):
+        self.indexer = indexer
+        self.on_finished = on_finished
+        # Index runs serialize on the indexer lock anyway; one worker keeps the queue visible
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-job")
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit_index(self, force: bool = False) -> IndexJob:
+        job = IndexJob(job_id=uuid.uuid4().hex, force=force)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        logger.info(f"Queued index job {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IndexJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IndexJob]:
+        # Status changes happen under the lock, so a job that is just starting is either
+        # cancelled before it runs or left for _run to finish as cancelled
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.cancel_event.set()
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        logger.info(f"Cancellation requested for index job {job_id}")
+        return job
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+                if job.status == "queued":
+                    job.status = "cancelled"
+                    job.finished_at = time.time()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, job: IndexJob):
+        with self._lock:
+            if job.status != "queued":
+                return
+            job.started_at = time.time()
+            job.status = "running"
+
+        try:
+            self.indexer.index_all_documents(force=job.force, stats=job.stats, cancel=job.cancel_event)
+            status = "cancelled" if job.cancel_event.is_set() else "completed"
+        except Exception as e:
+            logger.error(f"Index job {job.job_id} failed: {e}")
+            job.error = str(e)
+            status = "failed"
+        with self._lock:
+            job.finished_at = time.time()
+            job.status = status
+
+        logger.info(f"Index job {job.job_id} {job.status} in {job.elapsed:.1f}s")
+        if self.on_finished:
+            try:
+                self.on_finished(job)
+            except Exception as e:
+                logger.error(f"Index job callback failed: {e}")
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, Any, Optional, List
+from dataclasses import dataclass
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+@dataclass
+class ManifestEntry:
+    file_path: str
+    file_size: int
+    mtime: float
+    content_hash: str
+    chunk_count: int = 0
+    indexed_at: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file_path": self.file_path,
+            "file_size": self.file_size,
+            "mtime": self.mtime,
+            "content_hash": self.content_hash,
+            "chunk_count": self.chunk_count,
+            "indexed_at": self.indexed_at
+        }
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class IndexManifest:
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.metadata_db_path
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS file_manifest (
+                    file_path TEXT PRIMARY KEY,
+                    file_size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    indexed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_file_manifest_hash ON file_manifest (content_hash)"
+            )
+
+    def get(self, file_path: str) -> Optional[ManifestEntry]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT file_path, file_size, mtime, content_hash, chunk_count, indexed_at "
+                "FROM file_manifest WHERE file_path = ?",
+                (file_path,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def all_entries(self) -> Dict[str, ManifestEntry]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT file_path, file_size, mtime, content_hash, chunk_count, indexed_at "
+                "FROM file_manifest"
+            ).fetchall()
+        return {row[0]: ManifestEntry(*row) for row in rows}
+
+    def paths_under(self, path: str) -> List[str]:
+        prefix = path.rstrip(os.sep) + os.sep
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT file_path FROM file_manifest "
+                "WHERE file_path = ? OR substr(file_path, 1, length(?)) = ?",
+                (path, prefix, prefix)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_by_hash(self, content_hash: str) -> Optional[ManifestEntry]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT file_path, file_size, mtime, content_hash, chunk_count, indexed_at "
+                "FROM file_manifest WHERE content_hash = ? LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return ManifestEntry(*row) if row else None
+
+    def upsert(self, entry: ManifestEntry):
+        entry.indexed_at = entry.indexed_at or time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_manifest "
+                "(file_path, file_size, mtime, content_hash, chunk_count, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.file_path, entry.file_size, entry.mtime, entry.content_hash,
+                 entry.chunk_count, entry.indexed_at)
+            )
+
+    def remove(self, file_paths: List[str]):
+        if not file_paths:
+            return
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM file_manifest WHERE file_path = ?",
+                [(path,) for path in file_paths]
+            )
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM file_manifest")
+        logger.info("Cleared index manifest")
+
+    def check(
+        self,
+        file_path: str,
+        file_size: int,
+        mtime: float,
+        previous: Optional[ManifestEntry] = None
+    ) -> Optional[ManifestEntry]:
+        if previous and previous.file_size == file_size and previous.mtime == mtime:
+            return None
+
+        content_hash = hash_file(file_path)
+        if previous and previous.content_hash == content_hash:
+            # Touched but not modified; remember the new stat so the next run short-circuits
+            previous.file_size = file_size
+            previous.mtime = mtime
+            self.upsert(previous)
+            return None
+
+        return ManifestEntry(
+            file_path=file_path,
+            file_size=file_size,
+            mtime=mtime,
+            content_hash=content_hash
+        )
@@ -0,0 +1,114 @@
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import closing
+from typing import Optional, Dict
+from PIL import Image
+from config import settings
+from utils.logger import get_logger
+from utils.registry import registry
+
+logger = get_logger(__name__)
+
+class OCRCache:
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or settings.metadata_db_path
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ocr_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    text TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, key: str) -> Optional[str]:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT text FROM ocr_cache WHERE cache_key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, text: str):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (cache_key, text, created_at) VALUES (?, ?, ?)",
+                (key, text, time.time())
+            )
+
+class OCREngine:
+
+    def __init__(self, workers: int = None, cache: OCRCache = None, language: str = None):
+        self.workers = workers or settings.ocr_workers
+        self.language = language or settings.ocr_language
+        self.cache = cache if cache is not None else (OCRCache() if settings.ocr_cache_enabled else None)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        # tesseract runs as a subprocess, so threads are enough to keep several cores busy
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr")
+            return self._executor
+
+    def cache_key(self, data: bytes) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}:{self.language}"
+
+    def ocr(self, data: bytes, image: Image.Image = None) -> str:
+        key = self.cache_key(data)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.debug("OCR cache hit")
+                return cached
+
+        # Identical images requested concurrently are recognised once
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            return future.result()
+
+        try:
+            text = self._run_tesseract(image if image is not None else Image.open(io.BytesIO(data)))
+            if self.cache is not None:
+                self.cache.put(key, text)
+            future.set_result(text)
+            return text
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    def submit(self, data: bytes) -> Future:
+        return self.executor.submit(self.ocr, data)
+
+    def _run_tesseract(self, image: Image.Image) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.language)
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+def get_ocr_engine() -> OCREngine:
+    return registry.get("ocr_engine", OCREngine)
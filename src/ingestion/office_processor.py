@@ -0,0 +1,127 @@
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterator, List
+from config import settings
+from ingestion.chunker import Segment
+from ingestion.text_processor import TextProcessor
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+class OfficeProcessor:
+
+    @staticmethod
+    def iter_docx(file_path: str) -> Iterator[Segment]:
+        name = Path(file_path).name
+        try:
+            with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+                yield f"Word Document: {name}", None
+
+                # Walk body-level paragraphs and tables as they are parsed, then drop them
+                stack: List[str] = []
+                body = None
+                for event, elem in ET.iterparse(xml, events=("start", "end")):
+                    if event == "start":
+                        stack.append(elem.tag)
+                        if elem.tag == f"{W_NS}body":
+                            body = elem
+                        continue
+
+                    stack.pop()
+                    if body is None or not stack or stack[-1] != f"{W_NS}body":
+                        continue
+
+                    if elem.tag == f"{W_NS}p":
+                        text = OfficeProcessor._paragraph_text(elem)
+                        if text:
+                            yield text, None
+                    elif elem.tag == f"{W_NS}tbl":
+                        text = OfficeProcessor._table_text(elem)
+                        if text:
+                            yield text, None
+                    body.clear()
+
+            logger.debug(f"Processed Word document: {name}")
+        except Exception as e:
+            logger.error(f"Error processing Word document {file_path}: {e}")
+            raise
+
+    @staticmethod
+    def _paragraph_text(paragraph: ET.Element) -> str:
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{W_NS}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{W_NS}tab":
+                parts.append("\t")
+            elif node.tag in (f"{W_NS}br", f"{W_NS}cr"):
+                parts.append("\n")
+        return "".join(parts).strip()
+
+    @staticmethod
+    def _table_text(table: ET.Element) -> str:
+        rows = []
+        for row in table.iter(f"{W_NS}tr"):
+            cells = []
+            for cell in row.iter(f"{W_NS}tc"):
+                paragraphs = [OfficeProcessor._paragraph_text(p) for p in cell.iter(f"{W_NS}p")]
+                cells.append(" ".join(p for p in paragraphs if p))
+            if any(cells):
+                rows.append(" | ".join(cells))
+        return "\n".join(rows)
+
+    @staticmethod
+    def iter_xlsx(file_path: str, max_chars: int = None, max_rows: int = None) -> Iterator[Segment]:
+        max_chars = max_chars or settings.chunk_size
+        max_rows = max_rows or settings.csv_batch_rows
+        name = Path(file_path).name
+
+        try:
+            import openpyxl
+        except ImportError:
+            logger.warning("openpyxl not installed, skipping Excel file")
+            return
+
+        try:
+            # read_only streams rows from the sheet XML instead of building every cell object
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            logger.error(f"Error opening Excel file {file_path}: {e}")
+            raise
+
+        try:
+            yield f"Excel Workbook: {name}\nSheets: {', '.join(workbook.sheetnames)}", None
+
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header_row = next(rows, None)
+                if not header_row:
+                    continue
+                columns = [
+                    str(value) if value is not None else f"Column {i}"
+                    for i, value in enumerate(header_row, 1)
+                ]
+                values = (
+                    ["" if value is None else value for value in row]
+                    for row in rows
+                    if any(value is not None for value in row)
+                )
+                header = f"Excel Workbook: {name}\nSheet: {sheet.title}\nColumns: {', '.join(columns)}\n"
+                yield from TextProcessor.iter_row_segments(
+                    header,
+                    columns,
+                    values,
+                    max_chars,
+                    max_rows,
+                    metadata={"sheet": sheet.title}
+                )
+
+            logger.debug(f"Processed Excel file: {name}")
+        except Exception as e:
+            logger.error(f"Error processing Excel file {file_path}: {e}")
+            raise
+        finally:
+            workbook.close()
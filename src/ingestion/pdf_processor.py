@@ -1,35 +1,208 @@
 import fitz
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, Future
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Iterator
+from config import settings
+from ingestion.chunker import Segment
+from ingestion.ocr import get_ocr_engine
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Only set in indexer pool workers: any other process (an API worker, a range worker, a
+# child spawned for something else) extracts large PDFs itself
+_hand_back_large_pdfs = False
+
+def hand_back_large_pdfs():
+    # Called by the indexer pool initializer; the parent catches SplitRequired and fans the
+    # page ranges out over the pool
+    global _hand_back_large_pdfs
+    _hand_back_large_pdfs = True
+
+class SplitRequired(Exception):
+    """Raised in an indexer pool worker for a PDF large enough to be split into page ranges"""
+
+    def __init__(self, page_count: int):
+        super().__init__(page_count)
+        self.page_count = page_count
+
 class PDFProcessor:
     
     @staticmethod
     def process_pdf(file_path: str) -> str:
+        return "\n\n".join(text for text, _ in PDFProcessor.iter_pages(file_path))
+    
+    @staticmethod
+    def iter_pages(file_path: str, executor: Executor = None) -> Iterator[Segment]:
+        # Errors propagate: a file that fails part-way must not be recorded as indexed
+        doc = fitz.open(file_path)
         try:
-            doc = fitz.open(file_path)
-            content = f"PDF Document: {Path(file_path).name}\n"
-            content += f"Total Pages: {len(doc)}\n\n"
+            page_count = len(doc)
+            if page_count == 0:
+                return
             
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                text = page.get_text()
-                
-                if text.strip():
-                    content += f"--- Page {page_num + 1} ---\n"
-                    content += text
-                    content += "\n\n"
+            if page_count >= settings.pdf_split_threshold_pages and executor is None and _hand_back_large_pdfs:
+                # An indexer pool worker hands very large PDFs back so the parent can fan
+                # their page ranges out over the whole pool
+                raise SplitRequired(page_count)
             
-            doc.close()
-            logger.debug(f"Processed PDF: {Path(file_path).name} ({len(doc)} pages)")
-            return content
+            yield f"PDF Document: {Path(file_path).name}\nTotal Pages: {page_count}", {"page": 1}
             
+            if page_count >= settings.pdf_split_threshold_pages and (executor is not None or settings.pdf_extract_workers > 1):
+                ranges = PDFProcessor._page_ranges(page_count)
+                seen_before = PDFProcessor._images_seen_before(doc, ranges)
+                # Range workers open their own handles
+                doc.close()
+                doc = None
+                yield from PDFProcessor._iter_pages_parallel(file_path, ranges, seen_before, executor)
+            else:
+                yield from PDFProcessor.iter_page_range(doc, file_path, 0, page_count)
+            logger.debug(f"Processed PDF: {Path(file_path).name} ({page_count} pages)")
+        except SplitRequired:
+            raise
         except Exception as e:
             logger.error(f"Error processing PDF {file_path}: {e}")
-            return ""
+            raise
+        finally:
+            if doc is not None:
+                doc.close()
+    
+    @staticmethod
+    def extract_page_range(file_path: str, start: int, end: int, seen_xrefs: Set[int] = None) -> List[Segment]:
+        # Runs in a range worker; fitz documents are not shareable across processes, and the
+        # range's pages are returned together because they are pickled back to the parent
+        with fitz.open(file_path) as doc:
+            return list(PDFProcessor.iter_page_range(doc, file_path, start, end, set(seen_xrefs or ())))
+    
+    @staticmethod
+    def iter_page_range(doc, file_path: str, start: int, end: int, seen_xrefs: Set[int] = None) -> Iterator[Segment]:
+        ocr_pages = settings.pdf_ocr_enabled
+        ocr_images = settings.pdf_ocr_enabled and settings.pdf_ocr_images
+        engine = get_ocr_engine() if ocr_pages else None
+        
+        seen_xrefs = set() if seen_xrefs is None else seen_xrefs
+        # Pages wait here, in order, until their OCR jobs finish; the cap keeps rasterized
+        # pages and extracted images from piling up ahead of the OCR pool
+        pending = deque()
+        in_flight = 0
+        max_in_flight = max(1, settings.ocr_workers * 2)
+        for page_num in range(start, end):
+            page = doc[page_num]
+            text = page.get_text()
+            jobs = []
+            if text.strip():
+                if ocr_images:
+                    jobs = PDFProcessor._submit_image_ocr(doc, page, seen_xrefs, engine)
+            elif ocr_pages:
+                # Only pages without a text layer are rasterized
+                pixmap = page.get_pixmap(dpi=settings.pdf_ocr_dpi)
+                jobs = [("page", engine.submit(pixmap.tobytes("png")))]
+            
+            pending.append((page_num + 1, text, jobs))
+            in_flight += len(jobs)
+            while pending and (in_flight > max_in_flight or not pending[0][2]):
+                page_number, page_text, page_jobs = pending.popleft()
+                in_flight -= len(page_jobs)
+                segment = PDFProcessor._page_segment(file_path, page_number, page_text, page_jobs)
+                if segment is not None:
+                    yield segment
+        
+        for page_number, page_text, page_jobs in pending:
+            segment = PDFProcessor._page_segment(file_path, page_number, page_text, page_jobs)
+            if segment is not None:
+                yield segment
+    
+    @staticmethod
+    def _page_segment(file_path: str, page_number: int, text: str, jobs: List[Tuple[str, Future]]) -> Optional[Segment]:
+        parts = [text] if text.strip() else []
+        for kind, job in jobs:
+            try:
+                ocr_text = job.result()
+            except ImportError:
+                logger.warning("pytesseract not installed, skipping PDF OCR")
+                continue
+            except Exception as e:
+                logger.error(f"OCR failed on page {page_number} of {file_path}: {e}")
+                continue
+            if ocr_text.strip():
+                parts.append(ocr_text if kind == "page" else f"Image OCR:\n{ocr_text}")
+        return ("\n\n".join(parts), {"page": page_number}) if parts else None
+    
+    @staticmethod
+    def _submit_image_ocr(doc, page, seen_xrefs: set, engine) -> List[Tuple[str, Future]]:
+        jobs = []
+        min_size = settings.pdf_ocr_min_image_size
+        for img in page.get_images(full=True):
+            xref, width, height = img[0], img[2], img[3]
+            if xref in seen_xrefs or width < min_size or height < min_size:
+                continue
+            seen_xrefs.add(xref)
+            try:
+                data = doc.extract_image(xref)["image"]
+            except Exception as e:
+                logger.debug(f"Could not extract image xref {xref}: {e}")
+                continue
+            jobs.append(("image", engine.submit(data)))
+        return jobs
+    
+    @staticmethod
+    def _page_ranges(page_count: int) -> List[Tuple[int, int]]:
+        range_size = settings.pdf_page_range_size
+        return [(start, min(start + range_size, page_count)) for start in range(0, page_count, range_size)]
+    
+    @staticmethod
+    def _images_seen_before(doc, ranges: List[Tuple[int, int]]) -> List[Set[int]]:
+        # An image repeated on many pages (a logo, a letterhead) is OCR'd once, on its first
+        # page; each range is told which of its images an earlier range already covers
+        if not (settings.pdf_ocr_enabled and settings.pdf_ocr_images):
+            return [set() for _ in ranges]
+        first_page: Dict[int, int] = {}
+        seen_before = []
+        for start, end in ranges:
+            earlier = set()
+            for page_num in range(start, end):
+                for img in doc[page_num].get_images(full=True):
+                    if first_page.setdefault(img[0], page_num) < start:
+                        earlier.add(img[0])
+            seen_before.append(earlier)
+        return seen_before
+    
+    @staticmethod
+    def _iter_pages_parallel(
+        file_path: str,
+        ranges: List[Tuple[int, int]],
+        seen_before: List[Set[int]],
+        executor: Executor = None
+    ) -> Iterator[Segment]:
+        own_executor = None
+        if executor is None:
+            own_executor = ProcessPoolExecutor(
+                max_workers=settings.pdf_extract_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            executor = own_executor
+        
+        logger.info(f"Extracting {Path(file_path).name} in {len(ranges)} page ranges of {settings.pdf_page_range_size}")
+        try:
+            range_iter = iter(zip(ranges, seen_before))
+            lookahead = max(2, settings.pdf_extract_workers * 2)
+            in_flight = deque(
+                executor.submit(PDFProcessor.extract_page_range, file_path, start, end, seen)
+                for (start, end), seen in islice(range_iter, lookahead)
+            )
+            while in_flight:
+                pages = in_flight.popleft().result()
+                next_range = next(range_iter, None)
+                if next_range is not None:
+                    (start, end), seen = next_range
+                    in_flight.append(executor.submit(PDFProcessor.extract_page_range, file_path, start, end, seen))
+                yield from pages
+        finally:
+            if own_executor is not None:
+                own_executor.shutdown(wait=True, cancel_futures=True)
     
     @staticmethod
     def extract_images_from_pdf(file_path: str) -> List[Tuple[int, bytes]]:
@@ -0,0 +1,349 @@
+import queue
+import threading
+import time
+import numpy as np
+from typing import List, Iterable, Iterator, Callable, Optional
+from dataclasses import dataclass, field
+from config import settings
+from ingestion.file_loader import FileMetadata
+from ingestion.file_processor import FileProcessor
+from ingestion.manifest import ManifestEntry
+from ingestion.chunker import ChunkBatch, Segment
+from retriever.vector_store import VectorStore
+from utils.logger import get_logger
+from utils.metrics import metrics_collector, StageMetrics
+
+logger = get_logger(__name__)
+
+_STOP = object()
+
+class _ExtractFailed(Exception):
+    """Raised to the chunk worker of a file whose extraction failed; already logged"""
+
+@dataclass
+class FileTask:
+    file_meta: FileMetadata
+    entry: ManifestEntry
+    replaces_existing: bool = False
+    chunk_count: int = 0
+    failed: bool = False
+
+@dataclass
+class FilePart:
+    # A bounded slice of one file's chunks; the file is committed with its final part,
+    # which may be empty
+    task: FileTask
+    chunks: ChunkBatch = field(default_factory=ChunkBatch)
+    index: int = 0
+    final: bool = False
+    embeddings: Optional[np.ndarray] = None
+
+class SegmentStream:
+    """Segments handed from the extract worker of one file to the chunk worker that took it"""
+
+    def __init__(self, maxsize: int):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._cancelled = threading.Event()
+
+    def put(self, item) -> bool:
+        # False once the consumer gave up on the file, so the producer can stop
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self, error: Exception = None):
+        self.put(error if error is not None else _STOP)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def __iter__(self) -> Iterator[Segment]:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if isinstance(item, Exception):
+                raise _ExtractFailed() from item
+            yield item
+
+class IngestionPipeline:
+
+    def __init__(
+        self,
+        file_processor: FileProcessor,
+        vector_store: VectorStore,
+        on_file_written: Callable[[FileTask], None],
+        on_file_failed: Callable[[FileTask], None],
+        on_part_chunked: Callable[[FilePart], None] = None,
+        extract_workers: int = None,
+        chunk_workers: int = None,
+        embed_batch_size: int = None,
+        queue_size: int = None,
+        flush_interval: float = None
+    ):
+        self.file_processor = file_processor
+        self.vector_store = vector_store
+        self.on_file_written = on_file_written
+        self.on_file_failed = on_file_failed
+        self.on_part_chunked = on_part_chunked
+        self.extract_workers = extract_workers or settings.pipeline_extract_workers
+        self.chunk_workers = chunk_workers or settings.pipeline_chunk_workers
+        self.embed_batch_size = embed_batch_size or settings.embedding_batch_size
+        self.queue_size = queue_size or settings.pipeline_queue_size
+        self.flush_interval = flush_interval or settings.pipeline_flush_interval
+
+    def run(self, tasks: Iterable[FileTask]):
+        extract_q = queue.Queue(maxsize=self.queue_size)
+        chunk_q = queue.Queue(maxsize=self.queue_size)
+        embed_q = queue.Queue(maxsize=self.queue_size)
+        write_q = queue.Queue(maxsize=max(2, self.queue_size // 8))
+
+        discover_stage = metrics_collector.stage("ingest.discover")
+        extract_stage = metrics_collector.stage("ingest.extract", self.extract_workers)
+        chunk_stage = metrics_collector.stage("ingest.chunk", self.chunk_workers)
+        embed_stage = metrics_collector.stage("ingest.embed")
+        write_stage = metrics_collector.stage("ingest.write")
+
+        extract_threads = self._start("extract", self.extract_workers, self._extract_worker, extract_stage, extract_q, chunk_q)
+        chunk_threads = self._start("chunk", self.chunk_workers, self._chunk_worker, chunk_stage, chunk_q, embed_q)
+        embed_threads = self._start("embed", 1, self._embed_worker, embed_stage, embed_q, write_q)
+        write_threads = self._start("write", 1, self._write_worker, write_stage, write_q)
+
+        # The calling thread is the discover stage; a full extract queue blocks it (backpressure)
+        task_iter = iter(tasks)
+        while True:
+            started = time.perf_counter()
+            task = next(task_iter, None)
+            if task is None:
+                break
+            discover_stage.record_out((time.perf_counter() - started) * 1000)
+            extract_q.put(task)
+            discover_stage.record_in(extract_q.qsize())
+
+        self._drain(extract_q, extract_threads)
+        self._drain(chunk_q, chunk_threads)
+        self._drain(embed_q, embed_threads)
+        self._drain(write_q, write_threads)
+
+        logger.info(f"Pipeline stages: {metrics_collector.get_stage_summary()}")
+
+    def _start(self, name: str, workers: int, target: Callable, *args) -> List[threading.Thread]:
+        threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=target, args=args, name=f"ingest-{name}-{i}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def _drain(self, q: queue.Queue, threads: List[threading.Thread]):
+        for _ in threads:
+            q.put(_STOP)
+        for thread in threads:
+            thread.join()
+
+    def _extract_worker(self, stage: StageMetrics, in_q: queue.Queue, out_q: queue.Queue):
+        while True:
+            task = in_q.get()
+            if task is _STOP:
+                return
+            stage.record_in(in_q.qsize())
+            started = time.perf_counter()
+            logger.info(f"Processing: {task.file_meta.file_name} ({task.file_meta.file_type})")
+
+            # The file's segments go straight to a chunk worker; the bounded stream blocks
+            # extraction instead of buffering a whole document
+            stream = SegmentStream(self.queue_size)
+            out_q.put((task, stream))
+            try:
+                for segment in self.file_processor.iter_segments(task.file_meta):
+                    if not stream.put(segment):
+                        break
+            except Exception as e:
+                logger.error(f"{stage.stage} failed on {task.file_meta.file_name}: {e}")
+                stage.record_error()
+                stream.close(e)
+                continue
+            stream.close()
+            stage.record_out((time.perf_counter() - started) * 1000)
+
+    def _chunk_worker(self, stage: StageMetrics, in_q: queue.Queue, out_q: queue.Queue):
+        while True:
+            item = in_q.get()
+            if item is _STOP:
+                return
+            task, stream = item
+            stage.record_in(in_q.qsize())
+            started = time.perf_counter()
+
+            index = 0
+            try:
+                for chunks in self.file_processor.chunk_batches(task.file_meta, stream, self.embed_batch_size):
+                    part = FilePart(task, chunks, index)
+                    index += 1
+                    if self.on_part_chunked:
+                        self.on_part_chunked(part)
+                    out_q.put(part)
+                final = FilePart(task, ChunkBatch(), index, final=True)
+                if self.on_part_chunked:
+                    self.on_part_chunked(final)
+            except _ExtractFailed:
+                task.failed = True
+                final = FilePart(task, ChunkBatch(), index, final=True)
+            except Exception as e:
+                logger.error(f"{stage.stage} failed on {task.file_meta.file_name}: {e}")
+                stage.record_error()
+                stream.cancel()
+                task.failed = True
+                final = FilePart(task, ChunkBatch(), index, final=True)
+            else:
+                stage.record_out((time.perf_counter() - started) * 1000)
+            # Failed files still send their final part, so the writer reports each file once
+            # and after all of its earlier parts
+            out_q.put(final)
+
+    def _embed_worker(self, stage: StageMetrics, in_q: queue.Queue, out_q: queue.Queue):
+        batch: List[FilePart] = []
+        pending_chunks = 0
+        last_flush = time.monotonic()
+
+        def flush():
+            nonlocal batch, pending_chunks, last_flush
+            if not batch:
+                return
+            started = time.perf_counter()
+            live = [part for part in batch if part.chunks and not part.task.failed]
+            try:
+                self._embed(live)
+            except Exception as e:
+                logger.error(f"Embedding failed for {len(live)} file parts: {e}")
+                stage.record_error()
+                # Retry file by file, so one file that cannot be embedded does not fail the
+                # others that happened to share its batch
+                for parts in self._by_file(live):
+                    try:
+                        self._embed(parts)
+                    except Exception as e:
+                        logger.error(f"Embedding {parts[0].task.file_meta.file_name} failed: {e}")
+                        parts[0].task.failed = True
+            else:
+                stage.record_out((time.perf_counter() - started) * 1000, items=len(batch))
+            out_q.put(batch)
+            batch, pending_chunks, last_flush = [], 0, time.monotonic()
+
+        while True:
+            try:
+                part = in_q.get(timeout=self.flush_interval)
+            except queue.Empty:
+                flush()
+                continue
+            if part is _STOP:
+                flush()
+                return
+
+            stage.record_in(in_q.qsize())
+            batch.append(part)
+            pending_chunks += len(part.chunks)
+            if pending_chunks >= self.embed_batch_size or time.monotonic() - last_flush >= self.flush_interval:
+                flush()
+
+    def _embed(self, parts: List[FilePart]):
+        texts = [text for part in parts for text in part.chunks.contents]
+        if not texts:
+            return
+        embeddings = self.vector_store.embed(texts)
+        offset = 0
+        for part in parts:
+            part.embeddings = embeddings[offset:offset + len(part.chunks)]
+            offset += len(part.chunks)
+
+    @staticmethod
+    def _by_file(parts: List[FilePart]) -> List[List[FilePart]]:
+        files = {}
+        for part in parts:
+            files.setdefault(id(part.task), []).append(part)
+        return list(files.values())
+
+    def _write_worker(self, stage: StageMetrics, in_q: queue.Queue):
+        # Parts of one file arrive in order, so a file is settled when its final part arrives
+        cleared = set()
+        written = set()
+        while True:
+            batch = in_q.get()
+            if batch is _STOP:
+                return
+            stage.record_in(in_q.qsize())
+            started = time.perf_counter()
+            live = [part for part in batch if part.chunks and not part.task.failed]
+            try:
+                self._write(live, cleared, written)
+            except Exception as e:
+                logger.error(f"Vector store write failed for {len(live)} file parts: {e}")
+                stage.record_error()
+                # Retry file by file, so one bad file does not fail the rest of the batch
+                for parts in self._by_file(live):
+                    try:
+                        self._write(parts, cleared, written)
+                    except Exception as e:
+                        logger.error(f"Writing {parts[0].task.file_meta.file_name} failed: {e}")
+                        parts[0].task.failed = True
+                    else:
+                        for part in parts:
+                            part.task.chunk_count += len(part.chunks)
+            else:
+                for part in live:
+                    part.task.chunk_count += len(part.chunks)
+                stage.record_out((time.perf_counter() - started) * 1000, items=len(batch))
+
+            for part in batch:
+                part.embeddings = None
+                if part.final:
+                    key = id(part.task)
+                    cleared.discard(key)
+                    self._settle(stage, part.task, key in written)
+                    written.discard(key)
+
+    def _write(self, parts: List[FilePart], cleared: set, written: set):
+        if not parts:
+            return
+        # A failed write may leave part of the batch stored. A new file's leftovers are
+        # removed when it fails; a replaced file is only marked once its write succeeded,
+        # because until then removing the file would take its previous version with it
+        written.update(id(part.task) for part in parts if not part.task.replaces_existing)
+        self.vector_store.write(
+            ChunkBatch.concat(part.chunks for part in parts),
+            np.vstack([part.embeddings for part in parts])
+        )
+        written.update(id(part.task) for part in parts)
+
+        # Old chunks of a replaced file go once part of the new version is stored, sparing
+        # the ids just written; chunks of later parts overwrite or add rows as usual
+        for file_parts in self._by_file(parts):
+            task = file_parts[0].task
+            if task.replaces_existing and id(task) not in cleared:
+                keep = [chunk_id for part in file_parts for chunk_id in part.chunks.chunk_ids]
+                self.vector_store.delete_by_file(task.file_meta.file_path, keep=keep)
+                cleared.add(id(task))
+
+    def _settle(self, stage: StageMetrics, task: FileTask, touched_store: bool):
+        if task.failed:
+            if touched_store:
+                # Earlier parts may already be stored; take them out again so the file is
+                # never half-indexed
+                try:
+                    self.vector_store.delete_by_file(task.file_meta.file_path)
+                except Exception as e:
+                    logger.error(f"Failed to remove partially written chunks of {task.file_meta.file_name}: {e}")
+            self.on_file_failed(task)
+            return
+        # A failing commit must not kill the only writer thread, or the queues behind it
+        # fill up and the whole pipeline blocks
+        try:
+            self.on_file_written(task)
+        except Exception as e:
+            logger.error(f"Recording {task.file_meta.file_name} as indexed failed: {e}")
+            stage.record_error()
+            self.on_file_failed(task)
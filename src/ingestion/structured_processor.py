@@ -0,0 +1,270 @@
+import json
+import re
+import yaml
+from json.decoder import scanstring
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, TextIO, Tuple
+from config import settings
+from ingestion.chunker import Segment
+from ingestion.text_processor import TextProcessor
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Parse events shared by the JSON and YAML readers:
+#   ("start_map" | "start_seq" | "end_map" | "end_seq", None), ("key", str), ("scalar", value)
+Event = Tuple[str, Any]
+
+_JSON_LITERAL = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+_JSON_CONSTANTS = {"true": True, "false": False, "null": None}
+_WHITESPACE = " \t\n\r"
+_MAX_LITERAL = 64
+
+def iter_json_events(f: TextIO, block_size: int = 1 << 16) -> Iterator[Event]:
+    buf = ""
+    pos = 0
+    eof = False
+    # One entry per open container: [is_map, expecting_key]
+    stack: List[List[bool]] = []
+
+    def refill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        data = f.read(block_size)
+        if not data:
+            eof = True
+            return False
+        buf = buf[pos:] + data
+        pos = 0
+        return True
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            if refill():
+                continue
+            if stack:
+                raise ValueError(f"Unexpected end of JSON inside {len(stack)} open containers")
+            return
+
+        c = buf[pos]
+        if c in "{[":
+            pos += 1
+            stack.append([c == "{", c == "{"])
+            yield ("start_map" if c == "{" else "start_seq"), None
+        elif c in "}]":
+            pos += 1
+            stack.pop()
+            yield ("end_map" if c == "}" else "end_seq"), None
+        elif c == ",":
+            pos += 1
+            if stack and stack[-1][0]:
+                stack[-1][1] = True
+        elif c == ":":
+            pos += 1
+        elif c == '"':
+            try:
+                value, end = scanstring(buf, pos + 1)
+            except ValueError:
+                if refill():
+                    continue
+                raise
+            pos = end
+            if stack and stack[-1][0] and stack[-1][1]:
+                stack[-1][1] = False
+                yield "key", value
+            else:
+                yield "scalar", value
+        else:
+            # Literals are short; make sure one cannot straddle the end of the buffer
+            if len(buf) - pos < _MAX_LITERAL and refill():
+                continue
+            match = _JSON_LITERAL.match(buf, pos)
+            if match is None:
+                raise ValueError(f"Invalid JSON near offset {pos}: {buf[pos:pos + 20]!r}")
+            token = match.group()
+            pos = match.end()
+            if token in _JSON_CONSTANTS:
+                yield "scalar", _JSON_CONSTANTS[token]
+            else:
+                yield "scalar", float(token) if any(ch in token for ch in ".eE") else int(token)
+
+def iter_yaml_events(f: TextIO) -> Iterator[Event]:
+    # One entry per open container: [is_map, expecting_key]
+    stack: List[List[bool]] = []
+    for event in yaml.parse(f, Loader=yaml.SafeLoader):
+        if isinstance(event, yaml.MappingStartEvent):
+            kind, value = "start_map", None
+        elif isinstance(event, yaml.SequenceStartEvent):
+            kind, value = "start_seq", None
+        elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+            stack.pop()
+            kind = "end_map" if isinstance(event, yaml.MappingEndEvent) else "end_seq"
+            if stack and stack[-1][0]:
+                stack[-1][1] = True
+            yield kind, None
+            continue
+        elif isinstance(event, yaml.ScalarEvent):
+            kind, value = "scalar", _yaml_scalar(event)
+        elif isinstance(event, yaml.AliasEvent):
+            kind, value = "scalar", f"*{event.anchor}"
+        else:
+            continue
+
+        if stack and stack[-1][0]:
+            if stack[-1][1]:
+                if kind != "scalar":
+                    raise ValueError("complex mapping keys are not supported")
+                stack[-1][1] = False
+                yield "key", str(value)
+                continue
+            if kind == "scalar":
+                stack[-1][1] = True
+
+        if kind in ("start_map", "start_seq"):
+            stack.append([kind == "start_map", kind == "start_map"])
+        yield kind, value
+
+def _yaml_scalar(event: yaml.ScalarEvent) -> Any:
+    if event.style or not event.implicit[0]:
+        return event.value
+    if not event.value:
+        return None
+    try:
+        return yaml.safe_load(event.value)
+    except yaml.YAMLError:
+        return event.value
+
+def escape_pointer(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+class _Frame:
+    __slots__ = ("pointer", "is_map", "name", "key", "next_index", "pending", "pending_size", "split")
+
+    def __init__(self, pointer: str, is_map: bool, name: Any):
+        self.pointer = pointer
+        self.is_map = is_map
+        self.name = name
+        self.key = None
+        self.next_index = 0
+        self.pending: List[Tuple[Any, Any]] = []
+        self.pending_size = 0
+        self.split = False
+
+class StructuredProcessor:
+
+    @staticmethod
+    def iter_json(file_path: str, max_chars: int = None) -> Iterator[Segment]:
+        name = Path(file_path).name
+        render = lambda value: json.dumps(value, indent=2, ensure_ascii=False)
+        return StructuredProcessor._iter_file(
+            file_path, f"JSON File: {name}", iter_json_events, render, max_chars
+        )
+
+    @staticmethod
+    def iter_yaml(file_path: str, max_chars: int = None) -> Iterator[Segment]:
+        name = Path(file_path).name
+        render = lambda value: yaml.dump(value, default_flow_style=False, sort_keys=False, allow_unicode=True)
+        return StructuredProcessor._iter_file(
+            file_path, f"YAML File: {name}", iter_yaml_events, render, max_chars
+        )
+
+    @staticmethod
+    def _iter_file(
+        file_path: str,
+        header: str,
+        reader: Callable[[TextIO], Iterator[Event]],
+        render: Callable[[Any], str],
+        max_chars: int = None
+    ) -> Iterator[Segment]:
+        emitted = False
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for segment in StructuredProcessor.iter_subtrees(reader(f), header, render, max_chars):
+                    emitted = True
+                    yield segment
+            logger.debug(f"Streamed structured file: {Path(file_path).name}")
+        except Exception as e:
+            logger.error(f"Error streaming structured file {file_path}: {e}")
+            # Segments already handed on cannot be taken back, so only a file that failed
+            # before its first segment falls back to plain text
+            if emitted:
+                raise
+            content = TextProcessor.process_text(file_path)
+            if content:
+                yield content, None
+
+    @staticmethod
+    def iter_subtrees(
+        events: Iterator[Event],
+        header: str,
+        render: Callable[[Any], str],
+        max_chars: int = None
+    ) -> Iterator[Segment]:
+        # Children are materialised into their parent only while the parent stays within
+        # the chunk budget. Once it overflows, the pending siblings are flushed as a chunk
+        # and the parent is marked split, so memory stays bounded by depth x budget.
+        budget = max_chars or settings.chunk_size
+        stack: List[_Frame] = []
+
+        def child_name(frame: Optional[_Frame]) -> Any:
+            if frame is None:
+                return None
+            if frame.is_map:
+                return frame.key
+            frame.next_index += 1
+            return frame.next_index - 1
+
+        def flush(frame: _Frame) -> Optional[Segment]:
+            if not frame.pending:
+                return None
+            if len(frame.pending) == 1:
+                key, value = frame.pending[0]
+                pointer = f"{frame.pointer}/{escape_pointer(key)}"
+            else:
+                pointer = frame.pointer
+            value = dict(frame.pending) if frame.is_map else [v for _, v in frame.pending]
+            frame.pending = []
+            frame.pending_size = 0
+            text = f"{header}\nPath: {pointer or '/'}\n{render(value)}"
+            return text, {"metadata": {"json_pointer": pointer or "/"}}
+
+        def add(frame: _Frame, key: Any, value: Any, size: int) -> Optional[Segment]:
+            segment = None
+            if frame.pending and frame.pending_size + size > budget:
+                segment = flush(frame)
+                frame.split = True
+            frame.pending.append((key, value))
+            frame.pending_size += size
+            return segment
+
+        for kind, value in events:
+            parent = stack[-1] if stack else None
+            if kind == "key":
+                parent.key = value
+            elif kind in ("start_map", "start_seq"):
+                key = child_name(parent)
+                pointer = "" if parent is None else f"{parent.pointer}/{escape_pointer(key)}"
+                stack.append(_Frame(pointer, kind == "start_map", key))
+            elif kind in ("end_map", "end_seq"):
+                frame = stack.pop()
+                parent = stack[-1] if stack else None
+                if frame.split or parent is None:
+                    segment = flush(frame)
+                    if segment:
+                        yield segment
+                    continue
+                materialised = dict(frame.pending) if frame.is_map else [v for _, v in frame.pending]
+                segment = add(parent, frame.name, materialised, frame.pending_size + len(str(frame.name)) + 4)
+                if segment:
+                    yield segment
+            else:
+                key = child_name(parent)
+                if parent is None:
+                    yield f"{header}\n{render(value)}", {"metadata": {"json_pointer": "/"}}
+                    continue
+                segment = add(parent, key, value, len(str(key)) + len(str(value)) + 6)
+                if segment:
+                    yield segment
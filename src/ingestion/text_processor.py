@@ -1,8 +1,11 @@
 import yaml
 import json
 import csv
-from typing import Dict, Any
+from itertools import islice
+from typing import Dict, Any, Generator, Iterator, Iterable, List, Sequence
 from pathlib import Path
+from config import settings
+from ingestion.chunker import Segment
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -57,16 +60,17 @@ class TextProcessor:
     @staticmethod
     def process_csv(file_path: str) -> str:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
                 reader = csv.DictReader(f)
-                rows = list(reader)
+                sample = list(islice(reader, 5))
+                total_rows = len(sample) + sum(1 for _ in reader)
             
             content = f"CSV File: {Path(file_path).name}\n\n"
-            if rows:
-                content += f"Columns: {', '.join(rows[0].keys())}\n"
-                content += f"Total Rows: {len(rows)}\n\n"
+            if sample:
+                content += f"Columns: {', '.join(sample[0].keys())}\n"
+                content += f"Total Rows: {total_rows}\n\n"
                 content += "Sample Data (first 5 rows):\n"
-                for i, row in enumerate(rows[:5], 1):
+                for i, row in enumerate(sample, 1):
                     content += f"\nRow {i}:\n"
                     for key, value in row.items():
                         content += f"  {key}: {value}\n"
@@ -75,4 +79,62 @@ class TextProcessor:
             return content
         except Exception as e:
             logger.error(f"Error processing CSV file {file_path}: {e}")
-            return TextProcessor.process_text(file_path)
\ No newline at end of file
+            return TextProcessor.process_text(file_path)
+    
+    @staticmethod
+    def iter_csv_segments(file_path: str, max_chars: int = None, max_rows: int = None) -> Iterator[Segment]:
+        max_chars = max_chars or settings.chunk_size
+        max_rows = max_rows or settings.csv_batch_rows
+        name = Path(file_path).name
+        
+        try:
+            with open(file_path, 'r', encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                columns = next(reader, None)
+                if not columns:
+                    return
+                schema = ", ".join(columns)
+                header = f"CSV File: {name}\nColumns: {schema}\n"
+                total_rows = yield from TextProcessor.iter_row_segments(header, columns, reader, max_chars, max_rows)
+                # The summary comes last, so the row count needs no second pass over the file
+                yield f"CSV File: {name}\nColumns: {schema}\nTotal Rows: {total_rows}", None
+            
+            logger.debug(f"Streamed CSV file: {name} ({total_rows} rows)")
+        except Exception as e:
+            # A partly read CSV must fail the file, not be indexed as if complete
+            logger.error(f"Error streaming CSV file {file_path}: {e}")
+            raise
+    
+    @staticmethod
+    def iter_row_segments(
+        header: str,
+        columns: List[str],
+        rows: Iterable[Sequence[Any]],
+        max_chars: int,
+        max_rows: int,
+        metadata: Dict[str, Any] = None
+    ) -> Generator[Segment, None, int]:
+        # Rows are grouped up to the chunk budget so only one group is ever held in memory;
+        # returns the number of rows
+        schema = ", ".join(columns)
+        batch = []
+        batch_chars = len(header)
+        row_start = 1
+        row_number = 0
+        
+        def segment(row_end: int) -> Segment:
+            info = {**(metadata or {}), "columns": schema, "row_start": row_start, "row_end": row_end}
+            return header + "\n".join(batch), {"metadata": info}
+        
+        for row_number, row in enumerate(rows, 1):
+            line = "; ".join(f"{key}: {value}" for key, value in zip(columns, row))
+            line = f"Row {row_number}: {line}"
+            if batch and (batch_chars + len(line) > max_chars or len(batch) >= max_rows):
+                yield segment(row_number - 1)
+                batch, batch_chars, row_start = [], len(header), row_number
+            batch.append(line)
+            batch_chars += len(line) + 1
+        
+        if batch:
+            yield segment(row_start + len(batch) - 1)
+        return row_number
\ No newline at end of file
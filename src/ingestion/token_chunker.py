@@ -0,0 +1,245 @@
+import bisect
+import itertools
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from config import settings
+from ingestion.chunker import Chunk, Segment, make_chunk_id
+from utils.logger import get_logger
+from utils.registry import registry
+
+logger = get_logger(__name__)
+
+# Rough ratio used where a character budget is still needed (CSV row groups, JSON subtrees)
+CHARS_PER_TOKEN = 4
+
+Span = Tuple[int, int]
+
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]?\s*$')
+
+class ModelTokenizer:
+
+    def __init__(self, model_name: str = None):
+        from transformers import AutoTokenizer
+        self.name = model_name or settings.embedding_model
+        self._tokenizer = AutoTokenizer.from_pretrained(self.name)
+        max_length = self._tokenizer.model_max_length
+        if self.name == settings.embedding_model:
+            # The encoder truncates at its own max_seq_length, which is often shorter than
+            # what the tokenizer accepts (256 vs 512 for MiniLM)
+            from retriever.vector_store import get_embedding_model
+            max_length = min(max_length, get_embedding_model(self.name).max_seq_length)
+        # Leave room for the special tokens the encoder adds around each input
+        self.max_tokens = max_length - 2 if max_length < 100_000 else None
+
+    def spans(self, text: str) -> List[Span]:
+        encoded = self._tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            verbose=False
+        )
+        return [tuple(span) for span in encoded["offset_mapping"]]
+
+class TiktokenTokenizer:
+
+    def __init__(self, encoding: str = None):
+        import tiktoken
+        self.name = encoding or settings.tiktoken_encoding
+        self._encoding = tiktoken.get_encoding(self.name)
+        self.max_tokens = None
+
+    def spans(self, text: str) -> List[Span]:
+        tokens = self._encoding.encode(text, disallowed_special=())
+        _, starts = self._encoding.decode_with_offsets(tokens)
+        return list(zip(starts, starts[1:] + [len(text)]))
+
+def _load_tokenizer():
+    if settings.chunk_tokenizer == "tiktoken":
+        tokenizer = TiktokenTokenizer()
+    else:
+        try:
+            tokenizer = ModelTokenizer()
+        except Exception as e:
+            logger.warning(f"Embedding model tokenizer unavailable ({e}), using tiktoken")
+            tokenizer = TiktokenTokenizer()
+    logger.info(f"Token chunker using tokenizer: {tokenizer.name}")
+    return tokenizer
+
+def get_tokenizer():
+    return registry.get(f"tokenizer:{settings.chunk_tokenizer}", _load_tokenizer)
+
+class TokenChunker:
+
+    def __init__(self, chunk_size: int = None, overlap: int = None, tokenizer=None):
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.chunk_size_tokens = chunk_size or settings.chunk_size_tokens
+        limit = getattr(self.tokenizer, "max_tokens", None)
+        if limit and self.chunk_size_tokens > limit:
+            logger.warning(f"chunk_size_tokens {self.chunk_size_tokens} exceeds model window, using {limit}")
+            self.chunk_size_tokens = limit
+        overlap = settings.chunk_overlap_tokens if overlap is None else overlap
+        self.overlap = max(0, min(overlap, self.chunk_size_tokens // 2))
+        # Processors that pre-group their content still budget in characters
+        self.chunk_size = self.chunk_size_tokens * CHARS_PER_TOKEN
+
+    def chunk_text(self, text: str, source_file: str, metadata: Dict[str, Any] = None) -> List[Chunk]:
+        if not text or not text.strip():
+            return []
+
+        return self.chunk_segments([(text, None)], source_file, metadata)
+
+    def chunk_segments(self, segments: Iterable[Segment], source_file: str, metadata: Dict[str, Any] = None) -> List[Chunk]:
+        chunks = list(self.iter_chunks(segments, source_file, metadata))
+        logger.debug(f"Created {len(chunks)} token chunks from {source_file}")
+        return chunks
+
+    def iter_chunks(self, segments: Iterable[Segment], source_file: str, metadata: Dict[str, Any] = None) -> Iterator[Chunk]:
+        # Offsets refer to the document as the segments joined by blank lines. Only the
+        # tail that has not been closed into a chunk yet is carried to the next segment,
+        # so every character is tokenized about once.
+        metadata = metadata or {}
+        counter = itertools.count()
+        buffer = ""
+        base = 0
+        covered = 0
+        pages: List[Tuple[int, Optional[int]]] = []
+        offset = 0
+
+        for text, info in segments:
+            info = info or {}
+            start, offset = offset, offset + len(text) + 2
+
+            if "metadata" in info:
+                if buffer:
+                    yield from self._emit(buffer, base, pages, covered, True, counter, source_file, metadata)
+                    buffer, pages, covered = "", [], 0
+                yield from self._emit(
+                    text,
+                    start,
+                    [(0, info.get("page"))],
+                    0,
+                    True,
+                    counter,
+                    source_file,
+                    metadata,
+                    info["metadata"]
+                )
+                continue
+
+            if buffer:
+                pages.append((len(buffer) + 2, info.get("page")))
+                buffer = f"{buffer}\n\n{text}"
+            else:
+                buffer, base, pages = text, start, [(0, info.get("page"))]
+
+            keep_from, covered = yield from self._emit(
+                buffer, base, pages, covered, False, counter, source_file, metadata
+            )
+            if keep_from:
+                buffer = buffer[keep_from:]
+                base += keep_from
+                covered -= keep_from
+                pages = self._shift_pages(pages, keep_from)
+
+        if buffer:
+            yield from self._emit(buffer, base, pages, covered, True, counter, source_file, metadata)
+
+    def _emit(
+        self,
+        text: str,
+        base: int,
+        pages: List[Tuple[int, Optional[int]]],
+        covered: int,
+        final: bool,
+        counter: Iterator[int],
+        source_file: str,
+        metadata: Dict[str, Any],
+        location: Dict[str, Any] = None
+    ):
+        # Yields the chunks that are complete and returns where the unfinished tail starts,
+        # plus how much of the text is already inside an emitted chunk
+        spans = self.tokenizer.spans(text)
+        n = len(spans)
+        size = self.chunk_size_tokens
+        start = 0
+
+        while n - start > size:
+            end = self._break_point(text, spans, start, start + size)
+            yield self._create_chunk(
+                text, base, pages, spans, start, end, next(counter), source_file, metadata, location
+            )
+            covered = spans[end - 1][1]
+            start = max(end - self.overlap, start + 1)
+
+        if start >= n or final:
+            if start < n and text[covered:].strip():
+                yield self._create_chunk(
+                    text, base, pages, spans, start, n, next(counter), source_file, metadata, location
+                )
+            return len(text), len(text)
+        keep_from = spans[start][0]
+        return keep_from, max(covered, keep_from)
+
+    def _break_point(self, text: str, spans: List[Span], start: int, limit: int) -> int:
+        # Prefer a paragraph, then a sentence boundary in the last quarter of the window
+        lowest = start + max(1, (limit - start) * 3 // 4)
+        sentence = None
+        for end in range(limit, lowest - 1, -1):
+            boundary = text[spans[end - 1][0]:spans[end][0]]
+            if "\n\n" in boundary:
+                return end
+            if sentence is None and _SENTENCE_END.search(boundary.rstrip()) and (
+                boundary[-1:].isspace() or text[spans[end][0]:spans[end][0] + 1].isspace()
+            ):
+                sentence = end
+        return sentence or limit
+
+    def _create_chunk(
+        self,
+        text: str,
+        base: int,
+        pages: List[Tuple[int, Optional[int]]],
+        spans: List[Span],
+        start: int,
+        end: int,
+        chunk_index: int,
+        source_file: str,
+        metadata: Dict[str, Any],
+        location: Dict[str, Any] = None
+    ) -> Chunk:
+        char_start, char_end = spans[start][0], spans[end - 1][1]
+        raw = text[char_start:char_end]
+        content = raw.strip()
+        char_start += len(raw) - len(raw.lstrip())
+
+        location = {
+            **(location or {}),
+            "char_start": base + char_start,
+            "char_end": base + char_start + len(content),
+            "token_count": end - start
+        }
+        chunk_pages = self._pages_between(pages, char_start, char_start + len(content))
+        if chunk_pages:
+            location["page_start"], location["page_end"] = min(chunk_pages), max(chunk_pages)
+
+        return Chunk(
+            content=content,
+            chunk_id=make_chunk_id(source_file, metadata, chunk_index),
+            source_file=source_file,
+            chunk_index=chunk_index,
+            metadata=metadata,
+            location=location
+        )
+
+    @staticmethod
+    def _pages_between(pages: List[Tuple[int, Optional[int]]], start: int, end: int) -> List[int]:
+        offsets = [offset for offset, _ in pages]
+        first = max(0, bisect.bisect_right(offsets, start) - 1)
+        last = bisect.bisect_left(offsets, end)
+        return [page for _, page in pages[first:max(last, first + 1)] if page is not None]
+
+    @staticmethod
+    def _shift_pages(pages: List[Tuple[int, Optional[int]]], shift: int) -> List[Tuple[int, Optional[int]]]:
+        offsets = [offset for offset, _ in pages]
+        first = max(0, bisect.bisect_right(offsets, shift) - 1)
+        return [(max(0, offset - shift), page) for offset, page in pages[first:]]
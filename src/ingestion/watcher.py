@@ -0,0 +1,130 @@
+import threading
+import time
+from typing import Dict, Callable, Set
+from config import settings
+from ingestion.indexer import DocumentIndexer, IndexStats
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class DirectoryWatcher:
+
+    def __init__(
+        self,
+        indexer: DocumentIndexer,
+        debounce_seconds: float = None,
+        poll_interval: float = None,
+        on_indexed: Callable[[IndexStats], None] = None
+    ):
+        self.indexer = indexer
+        self.input_dir = str(indexer.file_loader.input_dir)
+        self.debounce_seconds = debounce_seconds or settings.watch_debounce_seconds
+        self.poll_interval = poll_interval or settings.watch_poll_interval
+        self.on_indexed = on_indexed
+
+        self._pending: Dict[str, float] = {}
+        self._pending_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def start(self):
+        self._stop.clear()
+        if not self._start_observer():
+            self._spawn(self._poll_loop, "watch-poll")
+        self._spawn(self._debounce_loop, "watch-debounce")
+        logger.info(f"Watching {self.input_dir} for changes")
+
+    def stop(self):
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        logger.info("Stopped watching input directory")
+
+    def run_forever(self):
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def notify(self, path: str):
+        with self._pending_lock:
+            self._pending[path] = time.monotonic()
+
+    def _spawn(self, target: Callable, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _start_observer(self) -> bool:
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.warning("watchdog not installed, falling back to polling")
+            return False
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Directory mtime bumps just echo the file events we already get
+                if event.event_type in ("opened", "closed_no_write"):
+                    return
+                if event.is_directory and event.event_type == "modified":
+                    return
+                watcher.notify(event.src_path)
+                dest_path = getattr(event, "dest_path", "")
+                if dest_path:
+                    watcher.notify(dest_path)
+
+        try:
+            self._observer = Observer()
+            self._observer.schedule(_Handler(), self.input_dir, recursive=True)
+            self._observer.start()
+        except Exception as e:
+            logger.warning(f"Native file watching unavailable ({e}), falling back to polling")
+            self._observer = None
+            return False
+
+        logger.info(f"Using {type(self._observer).__name__} for file events")
+        return True
+
+    def _poll_loop(self):
+        previous = self.indexer.file_loader.snapshot()
+        while not self._stop.wait(self.poll_interval):
+            current = self.indexer.file_loader.snapshot()
+            for path in current.diff(previous).changed:
+                self.notify(path)
+            previous = current
+
+    def _debounce_loop(self):
+        tick = min(0.1, self.debounce_seconds)
+        while not self._stop.wait(tick):
+            ready = self._take_settled()
+            if not ready:
+                continue
+            try:
+                stats = self.indexer.index_paths(sorted(ready))
+            except Exception as e:
+                logger.error(f"Watch-mode indexing failed for {len(ready)} paths: {e}")
+                continue
+            if self.on_indexed and (stats.files_processed or stats.files_deleted):
+                self.on_indexed(stats)
+
+    def _take_settled(self) -> Set[str]:
+        now = time.monotonic()
+        with self._pending_lock:
+            ready = {path for path, seen in self._pending.items() if now - seen >= self.debounce_seconds}
+            for path in ready:
+                del self._pending[path]
+        return ready
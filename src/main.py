@@ -1,5 +1,10 @@
+import asyncio
+import hashlib
+import time
+import uuid
 import uvicorn
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
@@ -7,9 +12,14 @@ import os
 import shutil
 from pathlib import Path
 
-from ingestion.indexer import DocumentIndexer
+from ingestion.indexer import DocumentIndexer, IndexerBusy
+from ingestion.watcher import DirectoryWatcher
+from ingestion.jobs import JobManager, IndexJob
+from ingestion.manifest import HASH_BLOCK_SIZE
+from config import settings
 from generation.usecase_generator import UseCaseGenerator
 from utils.logger import get_logger
+from utils.registry import registry
 
 logger = get_logger(__name__)
 
@@ -23,10 +33,10 @@ class QueryRequest(BaseModel):
     query: str
     debug_mode: Optional[bool] = False
 
-class IndexResponse(BaseModel):
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
     message: str
-    files_processed: int
-    total_chunks: int
 
 class GenerateResponse(BaseModel):
     use_cases: List[dict]
@@ -39,24 +49,56 @@ class GenerateResponse(BaseModel):
 # Global instances
 indexer = DocumentIndexer()
 generator = UseCaseGenerator()
+watcher = DirectoryWatcher(indexer, on_indexed=lambda stats: generator.retriever.refresh_index())
+
+def _on_job_finished(job: IndexJob):
+    # A forced run switches to a new index generation even when it wrote nothing
+    if job.stats.files_written or job.stats.files_deleted or (job.force and job.status == "completed"):
+        generator.retriever.refresh_index()
+
+jobs = JobManager(indexer, on_finished=_on_job_finished)
+
+@app.on_event("startup")
+async def start_watcher():
+    if settings.enable_watch_mode:
+        watcher.start()
+
+@app.on_event("shutdown")
+async def stop_watcher():
+    if settings.enable_watch_mode:
+        watcher.stop()
+    jobs.shutdown()
 
 @app.get("/")
 async def root():
     return {"message": "Multimodal RAG Use Case Generator API", "status": "running"}
 
-@app.post("/index", response_model=IndexResponse)
-async def index_documents():
-    """Index all documents in the input directory"""
-    try:
-        total_chunks = indexer.index_all_documents()
-        return IndexResponse(
-            message="Documents indexed successfully",
-            files_processed=len(indexer.file_loader.discover_files()),
-            total_chunks=total_chunks
-        )
-    except Exception as e:
-        logger.error(f"Indexing failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Indexing failed: {str(e)}")
+@app.post("/index", response_model=JobResponse)
+async def index_documents(force: bool = False):
+    """Start a background job indexing new and changed documents in the input directory"""
+    job = jobs.submit_index(force=force)
+    return JobResponse(job_id=job.job_id, status=job.status, message="Indexing job started")
+
+@app.get("/jobs")
+async def list_jobs():
+    """List recent indexing jobs"""
+    return {"jobs": [job.to_dict() for job in jobs.jobs()]}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get progress of an indexing job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running indexing job"""
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
 
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
@@ -77,6 +119,132 @@ async def upload_file(file: UploadFile = File(...)):
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+def _receive_upload(file: UploadFile, input_dir: Path) -> dict:
+    # Streams the upload into the input directory block by block, hashing as it goes,
+    # so the content hash is known without reading the file back
+    started = time.perf_counter()
+    name = Path(file.filename or "").name
+    if not name:
+        raise ValueError("Upload has no file name")
+    tmp_path = input_dir / f".{name}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as buffer:
+            for block in iter(lambda: file.file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+                buffer.write(block)
+                size += len(block)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return {
+        "file_name": name,
+        "file_path": str(input_dir / name),
+        "tmp_path": tmp_path,
+        "content_hash": digest.hexdigest(),
+        "file_size": size,
+        "upload_seconds": round(time.perf_counter() - started, 3)
+    }
+
+def _index_uploads_later(files: List[tuple]):
+    stats = indexer.index_files(files)
+    if stats.files_written:
+        generator.retriever.refresh_index()
+
+@app.post("/upload/index")
+async def upload_and_index(background_tasks: BackgroundTasks, files: List[UploadFile] = File(...)):
+    """Upload files and index just those files, skipping content that is already indexed.
+
+    Never waits for a running indexing job: while one holds the indexer, the saved files
+    are reported as "queued" and indexed in the background once it finishes.
+    """
+    started = time.perf_counter()
+    input_dir = indexer.file_loader.input_dir
+    input_dir.mkdir(parents=True, exist_ok=True)
+
+    received = await asyncio.gather(
+        *(run_in_threadpool(_receive_upload, file, input_dir) for file in files),
+        return_exceptions=True
+    )
+
+    # A rebuild swaps in a new manifest only once it is complete; until then the live one
+    # is what uploads are compared against
+    manifest = indexer.live_manifest
+    results, to_index = [], []
+    queued = {}
+    for file, upload in zip(files, received):
+        if isinstance(upload, Exception):
+            logger.error(f"Upload of {file.filename} failed: {upload}")
+            results.append({"file_name": file.filename, "status": "failed", "error": str(upload)})
+            continue
+
+        tmp_path = upload.pop("tmp_path")
+        current = manifest.get(upload["file_path"])
+        if current is None:
+            # Same bytes are already searchable under another name; indexing them again
+            # would only duplicate their chunks. The upload is not kept, so neither a
+            # same-named file nor the next run sees it
+            duplicate_of = queued.get(upload["content_hash"])
+            existing = None if duplicate_of else manifest.get_by_hash(upload["content_hash"])
+            if duplicate_of or existing is not None:
+                tmp_path.unlink(missing_ok=True)
+                results.append({
+                    **upload,
+                    "status": "duplicate",
+                    "indexed_as": duplicate_of or existing.file_path,
+                    "chunks": 0 if duplicate_of else existing.chunk_count
+                })
+                continue
+
+        # Anything else is kept under the name it was uploaded with
+        os.replace(tmp_path, upload["file_path"])
+        if current is not None and current.content_hash == upload["content_hash"]:
+            results.append({**upload, "status": "unchanged", "indexed_as": current.file_path, "chunks": current.chunk_count})
+            continue
+
+        queued[upload["content_hash"]] = upload["file_path"]
+        results.append(upload)
+        to_index.append(upload)
+
+    stats = None
+    deferred = False
+    index_started = time.perf_counter()
+    if to_index:
+        pending = [(upload["file_path"], upload["content_hash"]) for upload in to_index]
+        try:
+            stats = await run_in_threadpool(indexer.index_files, pending, False)
+        except IndexerBusy:
+            background_tasks.add_task(_index_uploads_later, pending)
+            deferred = True
+        except Exception as e:
+            logger.error(f"Indexing uploaded files failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Indexing failed: {str(e)}")
+    index_seconds = round(time.perf_counter() - index_started, 3)
+
+    for upload in to_index:
+        if deferred:
+            upload.update(status="queued", chunks=0)
+            continue
+        entry = manifest.get(upload["file_path"])
+        if entry is not None and entry.content_hash == upload["content_hash"]:
+            upload.update(status="indexed", chunks=entry.chunk_count)
+        else:
+            upload.update(status="failed", chunks=0)
+
+    if stats is not None and stats.files_written:
+        # The keyword index rebuild covers the whole corpus; do it after responding
+        background_tasks.add_task(generator.retriever.refresh_index)
+
+    return {
+        "files": results,
+        "files_indexed": sum(1 for result in results if result["status"] == "indexed"),
+        "total_chunks": stats.total_chunks if stats else 0,
+        "index_seconds": index_seconds,
+        "total_seconds": round(time.perf_counter() - started, 3),
+        "stats": stats.to_dict() if stats else None
+    }
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_use_cases(request: QueryRequest):
     """Generate use cases based on the query"""
@@ -99,11 +267,15 @@ async def generate_use_cases(request: QueryRequest):
 async def get_status():
     """Get system status"""
     try:
-        vector_count = indexer.vector_store.count()
+        # The indexer's store may be a generation that is still being built
+        active_store = indexer.vector_store.current()
         return {
             "status": "healthy",
-            "indexed_chunks": vector_count,
-            "input_directory": str(indexer.file_loader.input_dir)
+            "indexed_chunks": active_store.count(),
+            "generation": active_store.generation or "legacy",
+            "input_directory": str(indexer.file_loader.input_dir),
+            # Shared models and clients with their load time and resident memory
+            "resources": registry.stats()
         }
     except Exception as e:
         logger.error(f"Status check failed: {e}")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Recall-vs-memory report for the embedding quantization options.
+Samples stored embeddings from the active index, holds some out as queries and compares
+each option's top-k against exact float32 search.
+"""
+
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+from config import settings
+from retriever.generations import IndexGenerations
+from retriever.quantization import ScalarQuantizer, ProductQuantizer
+from retriever.vector_backend import create_backend, normalize
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def load_embeddings(sample: int, seed: int) -> np.ndarray:
+    backend = create_backend(IndexGenerations().active())
+    ids, _ = backend.documents()
+    if not ids:
+        return np.empty((0, 0), dtype=np.float32)
+    generator = np.random.default_rng(seed)
+    chosen = [ids[i] for i in generator.choice(len(ids), min(sample, len(ids)), replace=False)]
+    stored = backend.get(chosen)
+    return normalize(np.vstack([embedding for _, embedding in stored.values()]))
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+def rescored(queries: np.ndarray, base: np.ndarray, approximate: np.ndarray, k: int, factor: int) -> np.ndarray:
+    candidates = top_k(approximate, k * factor)
+    exact = np.einsum("qd,qcd->qc", queries, base[candidates])
+    return np.take_along_axis(candidates, top_k(exact, k), axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sample", type=int, default=20000, help="stored embeddings to sample")
+    parser.add_argument("--queries", type=int, default=200, help="sampled embeddings held out as queries")
+    parser.add_argument("--k", type=int, default=settings.top_k_retrieval * 2, help="neighbours compared per query")
+    parser.add_argument("--rescore-factor", type=int, default=settings.rescore_factor)
+    parser.add_argument("--corpus-size", type=int, default=0, help="project memory for this many chunks (default: sample size)")
+    args = parser.parse_args()
+
+    vectors = load_embeddings(args.sample + args.queries, seed=1)
+    if len(vectors) <= args.queries:
+        print("Not enough stored embeddings; index some documents first.")
+        sys.exit(1)
+
+    queries, base = vectors[:args.queries], vectors[args.queries:]
+    dim = base.shape[1]
+    corpus = args.corpus_size or len(base)
+    k = min(args.k, len(base))
+    truth = top_k(queries @ base.T, k)
+
+    rows = [("float32", dim * 4, 1.0, None)]
+    half = base.astype(np.float16).astype(np.float32)
+    rows.append(("float16", dim * 2, recall(top_k(queries @ half.T, k), truth), None))
+
+    options = [("int8", ScalarQuantizer())]
+    for subvectors in (8, 16, 32, 48, 64):
+        if dim % subvectors == 0:
+            options.append((f"pq{subvectors}", ProductQuantizer(subvectors)))
+
+    for name, quantizer in options:
+        logger.info(f"Training {name} on {len(base)} embeddings")
+        quantizer.train(base)
+        approximate = quantizer.scores(queries, quantizer.encode(base))
+        rows.append((
+            name,
+            quantizer.code_size(dim) * np.dtype(quantizer.code_dtype).itemsize,
+            recall(top_k(approximate, k), truth),
+            recall(rescored(queries, base, approximate, k, args.rescore_factor), truth)
+        ))
+
+    print(f"\nRecall@{k} against exact float32 search: {len(base)} vectors, {len(queries)} queries, dim {dim}")
+    print(f"Memory projected for {corpus:,} chunks; re-scoring reads {k * args.rescore_factor} full-precision rows per query from disk\n")
+    print(f"{'storage':<10}{'bytes/vec':>10}{'memory':>12}{'recall':>10}{'rescored':>10}")
+    for name, size, plain, rescore in rows:
+        memory = f"{size * corpus / 2 ** 20:,.1f} MB"
+        rescore = f"{rescore:.3f}" if rescore is not None else "-"
+        print(f"{name:<10}{size:>10}{memory:>12}{plain:>10.3f}{rescore:>10}")
+
+if __name__ == "__main__":
+    main()
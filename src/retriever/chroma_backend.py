@@ -0,0 +1,118 @@
+import chromadb
+import numpy as np
+from typing import List, Dict, Any, Iterable, Tuple
+from config import settings
+from utils.registry import registry
+from retriever.generations import collection_name
+from retriever.vector_backend import VectorBackend, SearchHit
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 5000
+
+def get_chroma_client(path: str = None):
+    # One client per storage path for the whole process
+    path = path or settings.vector_db_path
+    return registry.get(f"chroma_client:{path}", lambda: chromadb.PersistentClient(path=path))
+
+class ChromaBackend(VectorBackend):
+
+    def __init__(self, generation: str, client=None):
+        super().__init__(generation)
+        self.client = client or get_chroma_client()
+        self.max_batch_size = getattr(self.client, "max_batch_size", None) or DEFAULT_MAX_BATCH_SIZE
+        self.name = collection_name(generation)
+        try:
+            self.collection = self.client.get_collection(self.name)
+            logger.info(f"Loaded existing ChromaDB collection {self.name}")
+        except:
+            self.collection = self._create()
+            logger.info(f"Created new ChromaDB collection {self.name}")
+
+    def _create(self):
+        return self.client.create_collection(
+            name=self.name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        # Chroma rejects a single upsert larger than the client's max batch size
+        for start in range(0, len(ids), self.max_batch_size):
+            end = start + self.max_batch_size
+            self.collection.upsert(
+                documents=documents[start:end],
+                embeddings=np.asarray(embeddings[start:end]).tolist(),
+                ids=ids[start:end],
+                metadatas=metadatas[start:end]
+            )
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        found = {}
+        for start in range(0, len(ids), self.max_batch_size):
+            stored = self.collection.get(
+                ids=ids[start:start + self.max_batch_size],
+                include=["documents", "embeddings"]
+            )
+            for chunk_id, document, embedding in zip(stored['ids'], stored['documents'], stored['embeddings']):
+                found[chunk_id] = (document, np.asarray(embedding, dtype=np.float32))
+        return found
+
+    def texts(self, ids: List[str]) -> Dict[str, str]:
+        found = {}
+        for start in range(0, len(ids), self.max_batch_size):
+            stored = self.collection.get(ids=ids[start:start + self.max_batch_size], include=["documents"])
+            found.update(zip(stored['ids'], stored['documents']))
+        return found
+
+    def delete_by_file(self, file_path: str, keep: Iterable[str] = ()):
+        keep = set(keep)
+        if not keep:
+            self.collection.delete(where={"file_path": file_path})
+            return
+        stale = [
+            chunk_id for chunk_id in self.collection.get(where={"file_path": file_path}, include=[])["ids"]
+            if chunk_id not in keep
+        ]
+        for start in range(0, len(stale), self.max_batch_size):
+            self.collection.delete(ids=stale[start:start + self.max_batch_size])
+
+    def query(self, embeddings: np.ndarray, top_k: int) -> List[List[SearchHit]]:
+        hits = []
+        for start in range(0, len(embeddings), self.max_batch_size):
+            batch = np.asarray(embeddings[start:start + self.max_batch_size])
+            results = self.collection.query(
+                query_embeddings=batch.tolist(),
+                n_results=top_k,
+                include=["documents", "metadatas", "distances"]
+            )
+            for row in range(len(batch)):
+                ids = results['ids'][row] if results['ids'] else []
+                hits.append([
+                    {
+                        'content': results['documents'][row][i],
+                        'metadata': results['metadatas'][row][i],
+                        'score': 1 - results['distances'][row][i],
+                        'chunk_id': ids[i]
+                    }
+                    for i in range(len(ids))
+                ])
+        return hits
+
+    def documents(self) -> Tuple[List[str], List[str]]:
+        stored = self.collection.get(include=["documents"])
+        return stored['ids'], stored['documents']
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def clear(self):
+        self.client.delete_collection(self.name)
+        self.collection = self._create()
+
+    def drop(self):
+        self.client.delete_collection(self.name)
+
+    @staticmethod
+    def drop_storage(generation: str):
+        get_chroma_client().delete_collection(collection_name(generation))
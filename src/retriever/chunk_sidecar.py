@@ -0,0 +1,134 @@
+import json
+import sqlite3
+import numpy as np
+from contextlib import closing
+from typing import List, Dict, Any, Callable, Iterable, Tuple
+from retriever.vector_backend import SearchHit
+
+# SQLite caps the number of bound parameters per statement
+SQL_BATCH_SIZE = 500
+
+class ChunkSidecar:
+    """Ids, texts and metadata of the vectors an index stores, keyed by the index's int64 labels"""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            # AUTOINCREMENT keeps labels of deleted rows from being handed out again while
+            # an older copy of the index may still contain them
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    label INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chunk_id TEXT NOT NULL UNIQUE,
+                    file_path TEXT NOT NULL,
+                    document TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_file ON chunks (file_path)")
+
+    def _rows(self, conn: sqlite3.Connection, column: str, values: Iterable) -> List[tuple]:
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), SQL_BATCH_SIZE):
+            part = values[start:start + SQL_BATCH_SIZE]
+            rows.extend(conn.execute(
+                f"SELECT label, chunk_id, document, metadata FROM chunks WHERE {column} IN ({','.join('?' * len(part))})",
+                part
+            ).fetchall())
+        return rows
+
+    def by_ids(self, chunk_ids: List[str]) -> List[tuple]:
+        with closing(self._connect()) as conn:
+            return self._rows(conn, "chunk_id", chunk_ids)
+
+    def by_labels(self, labels: Iterable[int]) -> Dict[int, tuple]:
+        with closing(self._connect()) as conn:
+            return {row[0]: row for row in self._rows(conn, "label", labels)}
+
+    def replace(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+        # Returns the labels the ids had before, which the index must drop, and their new labels
+        with closing(self._connect()) as conn, conn:
+            stale = [row[0] for row in self._rows(conn, "chunk_id", ids)]
+            labels = [
+                conn.execute(
+                    "INSERT OR REPLACE INTO chunks (chunk_id, file_path, document, metadata) VALUES (?, ?, ?, ?)",
+                    (chunk_id, metadata.get("file_path", ""), document, json.dumps(metadata))
+                ).lastrowid
+                for chunk_id, document, metadata in zip(ids, documents, metadatas)
+            ]
+        return stale, labels
+
+    def delete_file(self, file_path: str, keep: Iterable[str] = ()) -> List[int]:
+        # Returns the deleted labels; ids in keep stay
+        keep = set(keep)
+        with closing(self._connect()) as conn, conn:
+            if not keep:
+                labels = [row[0] for row in conn.execute("SELECT label FROM chunks WHERE file_path = ?", (file_path,))]
+                conn.execute("DELETE FROM chunks WHERE file_path = ?", (file_path,))
+                return labels
+            labels = [
+                label for label, chunk_id in conn.execute(
+                    "SELECT label, chunk_id FROM chunks WHERE file_path = ?",
+                    (file_path,)
+                ).fetchall()
+                if chunk_id not in keep
+            ]
+            for start in range(0, len(labels), SQL_BATCH_SIZE):
+                part = labels[start:start + SQL_BATCH_SIZE]
+                conn.execute(f"DELETE FROM chunks WHERE label IN ({','.join('?' * len(part))})", part)
+        return labels
+
+    def labels(self) -> np.ndarray:
+        with closing(self._connect()) as conn:
+            return np.fromiter((row[0] for row in conn.execute("SELECT label FROM chunks")), dtype=np.int64)
+
+    def documents(self) -> Tuple[List[str], List[str]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT chunk_id, document FROM chunks ORDER BY label").fetchall()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    def count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM chunks")
+
+def resolve_hits(
+    sidecar: ChunkSidecar,
+    search: Callable[[int], Tuple[np.ndarray, np.ndarray]],
+    total: int,
+    top_k: int
+) -> List[List[SearchHit]]:
+    # The index may still hold deleted or replaced labels; over-fetch and widen until every
+    # query has top_k live hits or the index is exhausted
+    fetch = min(total, top_k * 2)
+    while True:
+        scores, labels = search(fetch)
+        rows = sidecar.by_labels(np.unique(labels[labels >= 0]).tolist())
+        hits = [
+            [
+                {
+                    'content': rows[label][2],
+                    'metadata': json.loads(rows[label][3]),
+                    'score': float(score),
+                    'chunk_id': rows[label][1]
+                }
+                for score, label in zip(query_scores, query_labels)
+                if label in rows
+            ][:top_k]
+            for query_scores, query_labels in zip(scores, labels.tolist())
+        ]
+        if fetch >= total or all(len(query_hits) >= top_k for query_hits in hits):
+            return hits
+        fetch = min(total, fetch * 4)
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+from contextlib import closing
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# (old canonical chunk id, promoted chunk id, promoted chunk's flattened metadata)
+Promotion = Tuple[str, str, Dict[str, Any]]
+
+@dataclass
+class _StagedFile:
+    # Registrations of a file that is not written yet
+    signatures: Dict[str, Tuple[np.ndarray, List[int]]] = field(default_factory=dict)
+    buckets: Dict[Tuple[int, int], List[str]] = field(default_factory=dict)
+    sources: List[Tuple[str, str, str, str]] = field(default_factory=list)
+
+class DuplicateIndex:
+
+    def __init__(
+        self,
+        db_path: str = None,
+        threshold: float = None,
+        num_perm: int = None,
+        bands: int = None,
+        shingle_size: int = None
+    ):
+        self.db_path = db_path or str(Path(settings.vector_db_path) / "minhash_lsh.sqlite3")
+        self.threshold = threshold or settings.dedup_threshold
+        self.num_perm = num_perm or settings.dedup_num_perm
+        self.bands = bands or settings.dedup_bands
+        self.rows = self.num_perm // self.bands
+        self.shingle_size = shingle_size or settings.dedup_shingle_size
+
+        # Fixed seed so signatures stay comparable across runs
+        generator = np.random.RandomState(1)
+        self._a = generator.randint(1, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._b = generator.randint(0, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._staged: Dict[str, _StagedFile] = {}
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_schema(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS minhash_signatures (
+                    chunk_id TEXT PRIMARY KEY,
+                    file_path TEXT NOT NULL,
+                    signature BLOB NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    chunk_id TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS duplicate_sources (
+                    chunk_id TEXT NOT NULL,
+                    duplicate_id TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_file ON minhash_signatures (file_path)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_band ON lsh_buckets (band, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_buckets_chunk ON lsh_buckets (chunk_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_chunk ON duplicate_sources (chunk_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_duplicates_file ON duplicate_sources (file_path)")
+
+    def signature(self, text: str) -> np.ndarray:
+        words = re.findall(r"\w+", text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _buckets(self, signature: np.ndarray) -> List[int]:
+        return [
+            int.from_bytes(
+                hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest(),
+                "big",
+                signed=True
+            )
+            for band in range(self.bands)
+        ]
+
+    def _find(
+        self,
+        conn: sqlite3.Connection,
+        chunk_id: str,
+        signature: np.ndarray,
+        buckets: List[int],
+        staged: _StagedFile
+    ) -> Optional[str]:
+        # Candidates are written chunks plus the earlier chunks of the same file; another
+        # file's staged chunks may still fail, so nothing is dropped in their favour
+        candidates: Dict[str, Optional[np.ndarray]] = {}
+        for band, bucket in enumerate(buckets):
+            rows = conn.execute(
+                "SELECT chunk_id FROM lsh_buckets WHERE band = ? AND bucket = ?",
+                (band, bucket)
+            ).fetchall()
+            candidates.update((row[0], None) for row in rows)
+            for candidate in staged.buckets.get((band, bucket), ()):
+                candidates[candidate] = staged.signatures[candidate][0]
+        candidates.pop(chunk_id, None)
+
+        # LSH only proposes candidates; confirm with the estimated Jaccard similarity
+        best, best_score = None, self.threshold
+        for candidate, stored in candidates.items():
+            if stored is None:
+                row = conn.execute(
+                    "SELECT signature FROM minhash_signatures WHERE chunk_id = ?",
+                    (candidate,)
+                ).fetchone()
+                if row is None:
+                    continue
+                stored = np.frombuffer(row[0], dtype=np.uint32)
+            score = float(np.mean(stored == signature))
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def _insert(self, conn: sqlite3.Connection, chunk_id: str, file_path: str, signature: np.ndarray, buckets: List[int]):
+        conn.execute("DELETE FROM lsh_buckets WHERE chunk_id = ?", (chunk_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO minhash_signatures (chunk_id, file_path, signature) VALUES (?, ?, ?)",
+            (chunk_id, file_path, signature.tobytes())
+        )
+        conn.executemany(
+            "INSERT INTO lsh_buckets (band, bucket, chunk_id) VALUES (?, ?, ?)",
+            [(band, bucket, chunk_id) for band, bucket in enumerate(buckets)]
+        )
+
+    def stage(self, file_path: str, chunk_ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> List[int]:
+        # Returns the positions that should be stored; the rest become extra source
+        # locations of the chunk they duplicate. Nothing is registered until commit_file,
+        # which the caller runs once the file's chunks are written
+        keep = []
+        with self._lock, closing(self._connect()) as conn:
+            staged = self._staged.setdefault(file_path, _StagedFile())
+            for i, (chunk_id, text) in enumerate(zip(chunk_ids, texts)):
+                signature = self.signature(text)
+                buckets = self._buckets(signature)
+                canonical = self._find(conn, chunk_id, signature, buckets, staged)
+                if canonical is None:
+                    staged.signatures[chunk_id] = (signature, buckets)
+                    for band, bucket in enumerate(buckets):
+                        staged.buckets.setdefault((band, bucket), []).append(chunk_id)
+                    keep.append(i)
+                    continue
+                staged.sources.append((canonical, chunk_id, file_path, json.dumps(metadatas[i])))
+
+        if len(keep) < len(chunk_ids):
+            logger.debug(f"Skipped {len(chunk_ids) - len(keep)} near-duplicate chunks from {file_path}")
+        return keep
+
+    def commit_file(self, file_path: str):
+        with self._lock:
+            staged = self._staged.pop(file_path, None)
+            if staged is None:
+                return
+            with closing(self._connect()) as conn, conn:
+                for chunk_id, (signature, buckets) in staged.signatures.items():
+                    self._insert(conn, chunk_id, file_path, signature, buckets)
+                conn.executemany(
+                    "INSERT INTO duplicate_sources (chunk_id, duplicate_id, file_path, metadata) VALUES (?, ?, ?, ?)",
+                    staged.sources
+                )
+
+    def discard_file(self, file_path: str):
+        with self._lock:
+            self._staged.pop(file_path, None)
+
+    def remove_file(self, file_path: str) -> List[Promotion]:
+        # Stored chunks of the file that other files still duplicate hand their slot to the
+        # first remaining duplicate; the caller copies the stored vector over to that id
+        promotions = []
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM duplicate_sources WHERE file_path = ?", (file_path,))
+            canonical_ids = [
+                row[0] for row in conn.execute(
+                    "SELECT chunk_id FROM minhash_signatures WHERE file_path = ?",
+                    (file_path,)
+                ).fetchall()
+            ]
+            for chunk_id in canonical_ids:
+                successor = conn.execute(
+                    "SELECT rowid, duplicate_id, file_path, metadata FROM duplicate_sources "
+                    "WHERE chunk_id = ? ORDER BY rowid LIMIT 1",
+                    (chunk_id,)
+                ).fetchone()
+                signature = conn.execute(
+                    "SELECT signature FROM minhash_signatures WHERE chunk_id = ?",
+                    (chunk_id,)
+                ).fetchone()[0]
+                conn.execute("DELETE FROM lsh_buckets WHERE chunk_id = ?", (chunk_id,))
+                conn.execute("DELETE FROM minhash_signatures WHERE chunk_id = ?", (chunk_id,))
+                if successor is None:
+                    continue
+
+                rowid, duplicate_id, duplicate_path, metadata = successor
+                conn.execute("DELETE FROM duplicate_sources WHERE rowid = ?", (rowid,))
+                conn.execute("UPDATE duplicate_sources SET chunk_id = ? WHERE chunk_id = ?", (duplicate_id, chunk_id))
+                vector = np.frombuffer(signature, dtype=np.uint32)
+                self._insert(conn, duplicate_id, duplicate_path, vector, self._buckets(vector))
+                promotions.append((chunk_id, duplicate_id, json.loads(metadata)))
+
+        if promotions:
+            logger.info(f"Promoted {len(promotions)} duplicate chunks after removing {file_path}")
+        return promotions
+
+    def sources(self, chunk_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        if not chunk_ids:
+            return {}
+        placeholders = ",".join("?" * len(chunk_ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT chunk_id, metadata FROM duplicate_sources WHERE chunk_id IN ({placeholders}) ORDER BY rowid",
+                list(chunk_ids)
+            ).fetchall()
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        for chunk_id, metadata in rows:
+            found.setdefault(chunk_id, []).append(json.loads(metadata))
+        return found
+
+    def clear(self):
+        with self._lock, closing(self._connect()) as conn, conn:
+            self._staged.clear()
+            conn.execute("DELETE FROM lsh_buckets")
+            conn.execute("DELETE FROM minhash_signatures")
+            conn.execute("DELETE FROM duplicate_sources")
+        logger.info("Cleared near-duplicate index")
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+from config import settings
+from utils.logger import get_logger
+from utils.registry import registry
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): only writers inside this process are serialized
+    fcntl = None
+
+logger = get_logger(__name__)
+
+KEY_SIZE = 16
+KEY_DTYPE = np.dtype(f"S{KEY_SIZE}")
+# Keys seen since the last merge stay in a small dict; past this many (or an eighth of the
+# sorted keys) they are merged into the sorted array
+MERGE_MIN_KEYS = 4096
+
+def get_embedding_cache(model_name: str = None) -> "EmbeddingCache":
+    # One cache object per process, so every store sees the same row numbering
+    model_name = model_name or settings.embedding_model
+    return registry.get(
+        f"embedding_cache:{settings.embedding_cache_path}:{model_name}",
+        lambda: EmbeddingCache(model_name)
+    )
+
+class EmbeddingCache:
+
+    def __init__(self, model_name: str, cache_dir: str = None, dtype: str = None):
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype or settings.embedding_cache_dtype)
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.cache_dir = Path(cache_dir or settings.embedding_cache_path) / slug
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.keys_path = self.cache_dir / "keys.bin"
+        self.vectors_path = self.cache_dir / "vectors.bin"
+        self.meta_path = self.cache_dir / "meta.json"
+        self.lock_path = self.cache_dir / "lock"
+
+        self._lock = threading.Lock()
+        # Row lookup is a sorted key array plus a dict of recent keys: a Python dict of every
+        # key costs several times the 16 bytes a key takes in the array
+        self._keys = np.empty(0, dtype=KEY_DTYPE)
+        self._key_rows = np.empty(0, dtype=np.int64)
+        self._recent: Dict[bytes, int] = {}
+        self._dim: Optional[int] = None
+        self._rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._mmap_rows = 0
+        self._load()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        normalized = " ".join(text.split())
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=KEY_SIZE).digest()
+
+    def _load(self):
+        if not self.meta_path.exists():
+            return
+
+        meta = json.loads(self.meta_path.read_text())
+        if meta.get("model") != self.model_name or meta.get("dtype") != self.dtype.name:
+            logger.warning(f"Embedding cache at {self.cache_dir} does not match model/dtype, resetting")
+            with self._file_lock():
+                self._reset()
+            return
+
+        self._dim = meta["dim"]
+        self._sync()
+        logger.info(f"Loaded embedding cache with {self._rows} vectors ({self.model_name})")
+
+    @contextmanager
+    def _file_lock(self):
+        # Serializes appends across processes (e.g. the API and the watch CLI on one cache)
+        with open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _complete_rows(self) -> int:
+        # Vectors are appended before keys, so a torn write leaves at most extra vector rows
+        key_rows = self.keys_path.stat().st_size // KEY_SIZE if self.keys_path.exists() else 0
+        row_bytes = self._dim * self.dtype.itemsize
+        vector_rows = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        return min(key_rows, vector_rows)
+
+    def _sync(self):
+        # Picks up rows other processes appended since this object last looked
+        if self._dim is None:
+            if not self.meta_path.exists():
+                return
+            self._dim = json.loads(self.meta_path.read_text())["dim"]
+        rows = self._complete_rows()
+        if rows <= self._rows:
+            return
+        with open(self.keys_path, "rb") as f:
+            f.seek(self._rows * KEY_SIZE)
+            keys = f.read((rows - self._rows) * KEY_SIZE)
+        for i in range(rows - self._rows):
+            self._recent[keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]] = self._rows + i
+        self._rows = rows
+        self._maybe_merge()
+
+    def _maybe_merge(self):
+        if len(self._recent) > max(MERGE_MIN_KEYS, len(self._keys) // 8):
+            recent_keys = np.array(list(self._recent), dtype=KEY_DTYPE)
+            recent_rows = np.fromiter(self._recent.values(), dtype=np.int64, count=len(self._recent))
+            keys = np.concatenate([self._keys, recent_keys])
+            rows = np.concatenate([self._key_rows, recent_rows])
+            order = np.argsort(keys, kind="stable")
+            self._keys = keys[order]
+            self._key_rows = rows[order]
+            self._recent.clear()
+
+    def _find(self, keys: List[bytes]) -> List[Optional[int]]:
+        rows = [self._recent.get(k) for k in keys]
+        if len(self._keys) and keys:
+            probe = np.array(keys, dtype=KEY_DTYPE)
+            positions = np.minimum(np.searchsorted(self._keys, probe), len(self._keys) - 1)
+            for i in np.flatnonzero(self._keys[positions] == probe):
+                rows[i] = int(self._key_rows[positions[i]])
+        return rows
+
+    def _reset(self):
+        for path in (self.keys_path, self.vectors_path, self.meta_path):
+            path.unlink(missing_ok=True)
+        self._keys = np.empty(0, dtype=KEY_DTYPE)
+        self._key_rows = np.empty(0, dtype=np.int64)
+        self._recent.clear()
+        self._dim = None
+        self._rows = 0
+        self._mmap = None
+        self._mmap_rows = 0
+
+    def _vectors(self) -> np.memmap:
+        if self._mmap is None or self._mmap_rows != self._rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode='r', shape=(self._rows, self._dim))
+            self._mmap_rows = self._rows
+        return self._mmap
+
+    def lookup(self, keys: List[bytes]) -> Tuple[Dict[int, np.ndarray], List[int]]:
+        hits = {}
+        missing = []
+        with self._lock:
+            rows = self._find(keys)
+            if any(row is None for row in rows):
+                self._sync()
+                rows = self._find(keys)
+            found = [(i, row) for i, row in enumerate(rows) if row is not None]
+            if found:
+                vectors = self._vectors()
+                for i, row in found:
+                    hits[i] = np.asarray(vectors[row], dtype=np.float32)
+            missing = [i for i, row in enumerate(rows) if row is None]
+        return hits, missing
+
+    def store(self, keys: List[bytes], vectors: np.ndarray):
+        if not keys:
+            return
+        with self._lock, self._file_lock():
+            self._sync()
+            if self._dim is None:
+                self._dim = int(vectors.shape[1])
+                self.meta_path.write_text(json.dumps({
+                    "model": self.model_name,
+                    "dim": self._dim,
+                    "dtype": self.dtype.name
+                }))
+            # Row numbers are positions in both files; cut off what a crashed writer left
+            # behind so the rows appended below land where the index expects them
+            self._truncate(self._rows)
+
+            new_keys = []
+            new_rows = []
+            for key, vector, row in zip(keys, vectors, self._find(keys)):
+                if row is not None or key in self._recent:
+                    continue
+                self._recent[key] = self._rows + len(new_keys)
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+
+            with open(self.vectors_path, 'ab') as f:
+                f.write(np.asarray(new_rows, dtype=self.dtype).tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b"".join(new_keys))
+            self._rows += len(new_keys)
+            self._maybe_merge()
+
+    def _truncate(self, rows: int):
+        for path, size in ((self.keys_path, rows * KEY_SIZE), (self.vectors_path, rows * self._dim * self.dtype.itemsize)):
+            if path.exists() and path.stat().st_size > size:
+                os.truncate(path, size)
+
+    def __len__(self) -> int:
+        return self._rows
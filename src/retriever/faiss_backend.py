@@ -0,0 +1,252 @@
+import json
+import os
+import shutil
+import threading
+import time
+import faiss
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from config import settings
+from retriever.chunk_sidecar import ChunkSidecar, resolve_hits
+from retriever.generations import generation_path
+from retriever.vector_backend import VectorBackend, SearchHit, normalize
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.faiss"
+META_FILE = "index.json"
+SIDECAR_FILE = "chunks.sqlite3"
+
+# Points each IVF centroid should see during training
+IVF_TRAINING_POINTS = 39
+
+# HNSW graphs cannot drop vectors; rebuild once this share of them is deleted
+HNSW_COMPACT_RATIO = 0.25
+
+class FaissBackend(VectorBackend):
+    """FAISS index of normalized vectors keyed by int64 labels; ids, texts and metadata live in a SQLite sidecar"""
+
+    @staticmethod
+    def storage_path(generation: str) -> Path:
+        return Path(settings.vector_db_path) / generation_path("faiss", generation)
+
+    def __init__(self, generation: str, index_type: str = None):
+        super().__init__(generation)
+        self.index_type = index_type or settings.faiss_index_type
+        self.root = self.storage_path(generation)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / INDEX_FILE
+        self.meta_path = self.root / META_FILE
+        self.sidecar = ChunkSidecar(self.root / SIDECAR_FILE)
+
+        self._lock = threading.RLock()
+        self.index = None
+        self.dim: Optional[int] = None
+        self._mapped = False
+        self._dirty = False
+        self._loaded_version = None
+        self._last_save = time.monotonic()
+        self._load()
+
+    def _version(self) -> Optional[int]:
+        try:
+            return self.meta_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, writable: bool = False):
+        version = self._version()
+        if version is None or not self.index_path.exists():
+            return
+
+        meta = json.loads(self.meta_path.read_text())
+        if meta["index_type"] != self.index_type:
+            logger.warning(
+                f"FAISS index at {self.root} is {meta['index_type']}, not {self.index_type}; "
+                f"keeping it until the next full reindex"
+            )
+            self.index_type = meta["index_type"]
+        self.dim = meta["dim"]
+
+        # Mapping keeps cold start independent of index size; it is read-only, so the
+        # writer reloads the index into memory before its first change. IO_FLAG_MMAP_IFC
+        # maps the stored codes of flat, HNSW and IVF indexes alike, where IO_FLAG_MMAP
+        # only covers IVF inverted lists
+        index, mapped = None, False
+        if settings.faiss_mmap and not writable:
+            try:
+                index = faiss.read_index(str(self.index_path), faiss.IO_FLAG_MMAP_IFC)
+                mapped = True
+            except RuntimeError as e:
+                logger.debug(f"Memory-mapped load not supported for this index, reading it instead: {e}")
+        if index is None:
+            index = faiss.read_index(str(self.index_path))
+
+        self.index = self._configure(index)
+        self._mapped = mapped
+        self._loaded_version = version
+        logger.info(f"Loaded FAISS {self.index_type} index with {index.ntotal} vectors{' (mmap)' if mapped else ''}")
+
+    def _configure(self, index):
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = settings.faiss_nprobe
+        elif self.index_type == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efSearch = settings.faiss_hnsw_ef_search
+        return index
+
+    def _new_index(self, dim: int):
+        # IVF starts out flat and is trained once there are enough vectors to place its centroids
+        if self.index_type == "hnsw":
+            inner = faiss.IndexHNSWFlat(dim, settings.faiss_hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            inner.hnsw.efConstruction = settings.faiss_hnsw_ef_construction
+        else:
+            inner = faiss.IndexFlatIP(dim)
+        return self._configure(faiss.IndexIDMap2(inner))
+
+    def _writable(self, dim: int = None):
+        if self.index is None and dim is not None:
+            self.dim = dim
+            self.index = self._new_index(dim)
+        elif self._mapped:
+            self._load(writable=True)
+        if dim is not None and dim != self.dim:
+            raise ValueError(f"Embedding dimension {dim} does not match the FAISS index ({self.dim})")
+        return self.index
+
+    def _refresh(self):
+        # Another store object may have saved a newer index; local unsaved writes win
+        if self._dirty:
+            return
+        version = self._version()
+        if version is not None and version != self._loaded_version:
+            self._load()
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        if not ids:
+            return
+        vectors = normalize(embeddings)
+        with self._lock:
+            index = self._writable(vectors.shape[1])
+            stale, labels = self.sidecar.replace(ids, documents, metadatas)
+            self._remove(stale)
+            index.add_with_ids(vectors, np.asarray(labels, dtype=np.int64))
+            self._dirty = True
+            self._train_ivf()
+            if time.monotonic() - self._last_save >= settings.faiss_save_interval:
+                self.flush()
+
+    def _train_ivf(self):
+        if self.index_type != "ivf" or isinstance(self.index, faiss.IndexIVF):
+            return
+        nlist = settings.faiss_nlist
+        if self.index.ntotal < nlist * IVF_TRAINING_POINTS:
+            return
+
+        logger.info(f"Training FAISS IVF index with {nlist} lists on {self.index.ntotal} vectors")
+        labels = faiss.vector_to_array(self.index.id_map)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        ivf = faiss.IndexIVFFlat(faiss.IndexFlatIP(self.dim), self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        ivf.train(vectors)
+        # A hash-based direct map lets vectors be removed and reconstructed by label
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        ivf.add_with_ids(vectors, labels)
+        self.index = self._configure(ivf)
+
+    def _remove(self, labels: List[int]):
+        if not labels or self.index is None:
+            return
+        if self.index_type == "hnsw":
+            # Rows are gone from the sidecar, so search skips these labels until compaction
+            self._dirty = True
+            return
+        self._writable().remove_ids(np.asarray(labels, dtype=np.int64))
+        self._dirty = True
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        found = {}
+        with self._lock:
+            self._refresh()
+            if self.index is None:
+                return found
+            for label, chunk_id, document, _ in self.sidecar.by_ids(ids):
+                try:
+                    found[chunk_id] = (document, self.index.reconstruct(int(label)))
+                except RuntimeError:
+                    continue
+        return found
+
+    def texts(self, ids: List[str]) -> Dict[str, str]:
+        return {chunk_id: document for _, chunk_id, document, _ in self.sidecar.by_ids(ids)}
+
+    def delete_by_file(self, file_path: str, keep: Iterable[str] = ()):
+        with self._lock:
+            self._remove(self.sidecar.delete_file(file_path, keep))
+
+    def query(self, embeddings: np.ndarray, top_k: int) -> List[List[SearchHit]]:
+        vectors = normalize(embeddings)
+        with self._lock:
+            self._refresh()
+            index = self.index
+            if index is None or index.ntotal == 0:
+                return [[] for _ in range(len(vectors))]
+            return resolve_hits(self.sidecar, lambda fetch: index.search(vectors, fetch), index.ntotal, top_k)
+    
+    def documents(self) -> Tuple[List[str], List[str]]:
+        return self.sidecar.documents()
+
+    def count(self) -> int:
+        return self.sidecar.count()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty or self.index is None:
+                return
+            if self.index_type == "hnsw":
+                self._compact()
+
+            tmp_path = self.root / f"{INDEX_FILE}.tmp"
+            faiss.write_index(self.index, str(tmp_path))
+            os.replace(tmp_path, self.index_path)
+            tmp_meta = self.root / f"{META_FILE}.tmp"
+            tmp_meta.write_text(json.dumps({"dim": self.dim, "index_type": self.index_type, "ntotal": self.index.ntotal}))
+            os.replace(tmp_meta, self.meta_path)
+
+            self._dirty = False
+            self._last_save = time.monotonic()
+            self._loaded_version = self._version()
+            logger.debug(f"Saved FAISS index with {self.index.ntotal} vectors")
+
+    def _compact(self):
+        live = self.count()
+        total = self.index.ntotal
+        if total == 0 or (total - live) / total < HNSW_COMPACT_RATIO:
+            return
+
+        labels = faiss.vector_to_array(self.index.id_map)
+        keep = np.isin(labels, self.sidecar.labels())
+        vectors = self.index.index.reconstruct_n(0, total)[keep]
+        index = self._new_index(self.dim)
+        index.add_with_ids(vectors, labels[keep])
+        self.index = index
+        logger.info(f"Compacted FAISS HNSW index from {total} to {index.ntotal} vectors")
+
+    def clear(self):
+        with self._lock:
+            self.index = None
+            self._dirty = False
+            self._mapped = False
+            for path in (self.index_path, self.meta_path):
+                path.unlink(missing_ok=True)
+            self.sidecar.clear()
+
+    def drop(self):
+        with self._lock:
+            self.index = None
+            self._dirty = False
+            self.drop_storage(self.generation)
+
+    @staticmethod
+    def drop_storage(generation: str):
+        shutil.rmtree(FaissBackend.storage_path(generation), ignore_errors=True)
@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any
+from config import settings
+from utils.logger import get_logger
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows): only updates inside this process are serialized
+    fcntl = None
+
+logger = get_logger(__name__)
+
+GENERATION_FILE = "generation.json"
+
+# The unversioned "documents" collection that predates generations
+LEGACY_GENERATION = ""
+
+# Every store in the process has its own IndexGenerations, so updates serialize here
+_update_lock = threading.Lock()
+
+def collection_name(generation: str) -> str:
+    return f"documents_{generation}" if generation else "documents"
+
+def generation_path(path: str, generation: str) -> str:
+    # Per-generation sidecar files sit next to the shared one with the generation as suffix
+    if not generation:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{generation}{ext}"
+
+class IndexGenerations:
+    """Pointer to the generation readers should use, plus generations waiting to be dropped"""
+
+    def __init__(self, root: str = None):
+        self.path = Path(root or settings.vector_db_path) / GENERATION_FILE
+        self.lock_path = self.path.with_name(f"{GENERATION_FILE}.lock")
+
+    def _read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        return {
+            "active": state.get("active", LEGACY_GENERATION),
+            "retired": list(state.get("retired", []))
+        }
+
+    @contextmanager
+    def _locked(self):
+        # Updates read, change and replace the whole file; holding both locks keeps another
+        # store or process from writing in between and losing the first change
+        with _update_lock, open(self.lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _write(self, state: Dict[str, Any]):
+        # Replacing the file is atomic, so a reader sees either the old or the new pointer
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def active(self) -> str:
+        return self._read()["active"]
+
+    def retired(self) -> List[str]:
+        return self._read()["retired"]
+
+    def create(self) -> str:
+        return f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+    def activate(self, generation: str) -> str:
+        with self._locked():
+            state = self._read()
+            previous = state["active"]
+            if previous != generation:
+                state["active"] = generation
+                state["retired"] = [g for g in state["retired"] if g != generation] + [previous]
+                self._write(state)
+                logger.info(f"Switched index generation {previous or 'legacy'} -> {generation}")
+            return previous
+
+    def forget(self, generation: str):
+        with self._locked():
+            state = self._read()
+            if generation in state["retired"]:
+                state["retired"].remove(generation)
+                self._write(state)
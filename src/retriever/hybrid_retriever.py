@@ -1,4 +1,6 @@
-from typing import List, Dict, Any
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional
 from rank_bm25 import BM25Okapi
 from retriever.vector_store import VectorStore
 from config import settings
@@ -6,75 +8,167 @@ from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+class _IndexSnapshot:
+    """One generation's vector store with the BM25 index built from it; swapped as a unit"""
+    
+    # Chunk texts stay in the vector store; keyword hits fetch theirs when they make the results
+    __slots__ = ("vector_store", "bm25_index", "doc_ids", "readers")
+    
+    def __init__(self, vector_store: VectorStore, bm25_index: Optional[BM25Okapi] = None, doc_ids: List[str] = None):
+        self.vector_store = vector_store
+        self.bm25_index = bm25_index
+        self.doc_ids = doc_ids or []
+        self.readers = 0
+
 class HybridRetriever:
     
     def __init__(self):
-        self.vector_store = VectorStore()
-        self.bm25_index = None
-        self.documents = []
-        self.doc_ids = []
-        self._build_bm25_index()
+        self._readers = threading.Condition()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = self._build_snapshot(VectorStore())
+        # Generations retired before this process started are no longer read by anyone
+        self._snapshot.vector_store.collect_generations(keep={self._snapshot.vector_store.generation})
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        return self._snapshot.vector_store
+    
+    @property
+    def bm25_index(self) -> Optional[BM25Okapi]:
+        return self._snapshot.bm25_index
     
-    def _build_bm25_index(self):
+    @property
+    def doc_ids(self) -> List[str]:
+        return self._snapshot.doc_ids
+    
+    def _build_snapshot(self, vector_store: VectorStore) -> _IndexSnapshot:
+        snapshot = _IndexSnapshot(vector_store)
         try:
-            count = self.vector_store.count()
+            count = vector_store.count()
             if count == 0:
                 logger.warning("No documents in vector store for BM25 indexing")
-                return
+                return snapshot
             
-            all_docs = self.vector_store.collection.get(
-                include=["documents", "metadatas"]
-            )
+            doc_ids, documents = vector_store.all_documents()
             
-            if all_docs['documents']:
-                self.documents = all_docs['documents']
-                self.doc_ids = all_docs['ids']
+            if documents:
+                snapshot.doc_ids = doc_ids
                 
-                tokenized_docs = [doc.lower().split() for doc in self.documents]
-                self.bm25_index = BM25Okapi(tokenized_docs)
+                tokenized_docs = [doc.lower().split() for doc in documents]
+                snapshot.bm25_index = BM25Okapi(tokenized_docs)
                 
-                logger.info(f"Built BM25 index with {len(self.documents)} documents")
+                logger.info(f"Built BM25 index with {len(snapshot.doc_ids)} documents")
         except Exception as e:
             logger.error(f"Error building BM25 index: {e}")
+        return snapshot
+    
+    def _acquire(self) -> _IndexSnapshot:
+        with self._readers:
+            snapshot = self._snapshot
+            snapshot.readers += 1
+            return snapshot
+    
+    def _release(self, snapshot: _IndexSnapshot):
+        with self._readers:
+            snapshot.readers -= 1
+            if snapshot.readers == 0:
+                self._readers.notify_all()
     
     def retrieve(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+        return self.retrieve_batch([query], top_k)[0]
+    
+    def retrieve_batch(self, queries: List[str], top_k: int = None) -> List[List[Dict[str, Any]]]:
         top_k = top_k or settings.top_k_retrieval
+        if not queries:
+            return []
         
-        vector_results = self.vector_store.search(query, top_k=top_k * 2)
+        # Both halves of every query read the same generation even if a swap lands mid-batch
+        snapshot = self._acquire()
+        try:
+            vector_results = snapshot.vector_store.search_batch(queries, top_k=top_k * 2)
+            
+            keyword_results = [[] for _ in queries]
+            if snapshot.bm25_index and snapshot.doc_ids:
+                keyword_results = self._bm25_search_batch(snapshot, queries, top_k=top_k * 2)
+            
+            results = []
+            for vector_hits, keyword_hits in zip(vector_results, keyword_results):
+                if not keyword_hits:
+                    logger.debug("Using vector-only retrieval (BM25 unavailable)")
+                    results.append(vector_hits[:top_k])
+                else:
+                    results.append(self._reciprocal_rank_fusion(vector_hits, keyword_hits, top_k=top_k))
+            results = self._fill_keyword_content(snapshot, results)
+        finally:
+            self._release(snapshot)
         
-        keyword_results = []
-        if self.bm25_index and self.documents:
-            keyword_results = self._bm25_search(query, top_k=top_k * 2)
+        if len(queries) == 1:
+            logger.info(f"Hybrid retrieval returned {len(results[0])} results")
+        else:
+            logger.info(f"Hybrid retrieval returned {sum(map(len, results))} results for {len(queries)} queries")
+        return results
+    
+    def _bm25_search_batch(self, snapshot: _IndexSnapshot, queries: List[str], top_k: int) -> List[List[Dict[str, Any]]]:
+        # BM25Okapi.get_scores walks every document once per query term; here the corpus is
+        # walked once per batch to collect postings of the terms any query uses, and each
+        # query's scores are summed from those
+        bm25 = snapshot.bm25_index
+        tokenized_queries = [query.lower().split() for query in queries]
+        vocabulary = {term for tokens in tokenized_queries for term in tokens if bm25.idf.get(term)}
         
-        if not keyword_results:
-            logger.debug("Using vector-only retrieval (BM25 unavailable)")
-            return vector_results[:top_k]
+        postings: Dict[str, tuple] = {term: ([], []) for term in vocabulary}
+        for i, frequencies in enumerate(bm25.doc_freqs):
+            for term in vocabulary.intersection(frequencies):
+                rows, counts = postings[term]
+                rows.append(i)
+                counts.append(frequencies[term])
         
-        fused_results = self._reciprocal_rank_fusion(
-            vector_results,
-            keyword_results,
-            top_k=top_k
-        )
+        doc_len = np.asarray(bm25.doc_len, dtype=np.float64)
+        norm = bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl)
+        weights = {}
+        for term, (rows, counts) in postings.items():
+            rows = np.asarray(rows, dtype=np.int64)
+            counts = np.asarray(counts, dtype=np.float64)
+            weights[term] = (rows, bm25.idf[term] * counts * (bm25.k1 + 1) / (counts + norm[rows]))
         
-        logger.info(f"Hybrid retrieval returned {len(fused_results)} results")
-        return fused_results
+        results = []
+        for tokens in tokenized_queries:
+            scores = np.zeros(len(doc_len))
+            for term in tokens:
+                if term in weights:
+                    rows, term_scores = weights[term]
+                    scores[rows] += term_scores
+            results.append(self._top_keyword_hits(snapshot, scores, top_k))
+        return results
     
-    def _bm25_search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
-        tokenized_query = query.lower().split()
-        scores = self.bm25_index.get_scores(tokenized_query)
+    def _fill_keyword_content(self, snapshot: _IndexSnapshot, results: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        # Only hits found by keyword alone lack text; one lookup covers the whole batch
+        missing = list(dict.fromkeys(doc['chunk_id'] for hits in results for doc in hits if doc['content'] is None))
+        if not missing:
+            return results
+        texts = snapshot.vector_store.texts(missing)
+        for hits in results:
+            for doc in hits:
+                if doc['content'] is None:
+                    doc['content'] = texts.get(doc['chunk_id'])
+        # Chunks deleted since the BM25 index was built are dropped
+        return [[doc for doc in hits if doc['content'] is not None] for hits in results]
+    
+    def _top_keyword_hits(self, snapshot: _IndexSnapshot, scores: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        # Rank on the score array and only build result dicts for the winners
+        top_k = min(top_k, len(scores))
+        top = np.argpartition(-scores, top_k - 1)[:top_k] if top_k else []
+        top = sorted(top, key=lambda i: scores[i], reverse=True)
         
-        scored_docs = [
+        return [
             {
-                'content': self.documents[i],
+                'content': None,
                 'score': float(scores[i]),
-                'chunk_id': self.doc_ids[i],
+                'chunk_id': snapshot.doc_ids[i],
                 'metadata': {}
             }
-            for i in range(len(scores))
+            for i in top
         ]
-        
-        scored_docs.sort(key=lambda x: x['score'], reverse=True)
-        return scored_docs[:top_k]
     
     def _reciprocal_rank_fusion(
         self,
@@ -109,4 +203,27 @@ class HybridRetriever:
         return fused_results
     
     def refresh_index(self):
-        self._build_bm25_index()
\ No newline at end of file
+        # The new snapshot is built while queries keep running on the current one, then
+        # swapped in with a single assignment
+        with self._refresh_lock:
+            current = self._snapshot
+            snapshot = self._build_snapshot(current.vector_store.current())
+            with self._readers:
+                self._snapshot = snapshot
+            
+            if snapshot.vector_store.generation == current.vector_store.generation:
+                return
+            logger.info(f"Switched retrieval to index generation {snapshot.vector_store.generation}")
+            
+            # Let queries that started on the old generation finish before dropping it
+            with self._readers:
+                drained = self._readers.wait_for(
+                    lambda: current.readers == 0,
+                    timeout=settings.generation_drain_timeout
+                )
+            if not drained:
+                logger.warning(f"Queries still running on generation {current.vector_store.generation}; dropping it anyway")
+            try:
+                snapshot.vector_store.collect_generations(keep={snapshot.vector_store.generation})
+            except Exception as e:
+                logger.error(f"Failed to drop retired index generations: {e}")
@@ -0,0 +1,349 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+from config import settings
+from retriever.chunk_sidecar import ChunkSidecar, resolve_hits
+from retriever.generations import generation_path
+from retriever.quantization import MAX_TRAINING_POINTS, create_quantizer, load_quantizer
+from retriever.vector_backend import VectorBackend, SearchHit, normalize
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+META_FILE = "matrix.json"
+QUANTIZER_FILE = "quantizer.npz"
+SIDECAR_FILE = "chunks.sqlite3"
+
+# Rewrite the matrix without deleted rows once this share of it is dead
+COMPACT_RATIO = 0.25
+
+class NumpyBackend(VectorBackend):
+    """Exact search over a memory-mapped matrix of normalized embeddings
+
+    With quantization on, queries scan compact codes instead and only a small candidate
+    set per query is re-scored against the full-precision rows, which stay on disk.
+    """
+
+    @staticmethod
+    def storage_path(generation: str) -> Path:
+        return Path(settings.vector_db_path) / generation_path("numpy", generation)
+
+    def __init__(self, generation: str, dtype: str = None):
+        super().__init__(generation)
+        self.dtype = np.dtype(dtype or settings.numpy_dtype)
+        self.root = self.storage_path(generation)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta_path = self.root / META_FILE
+        self.quantizer_path = self.root / QUANTIZER_FILE
+        self.sidecar = ChunkSidecar(self.root / SIDECAR_FILE)
+
+        self._lock = threading.RLock()
+        self.dim: Optional[int] = None
+        self.epoch = 0
+        self.rows = 0
+        self._matrix: Optional[np.memmap] = None
+        self.quantizer = None
+        self._codes: Optional[np.memmap] = None
+        # Label of each matrix row, ascending because labels are handed out in append order
+        self._labels = np.empty(0, dtype=np.int64)
+        self._live = np.empty(0, dtype=bool)
+        self._loaded_version = None
+        self._load()
+
+    def _paths(self, epoch: int) -> Tuple[Path, Path, Path]:
+        # Compaction writes a new epoch, so a reader never maps a file that is being rewritten
+        return self.root / f"vectors.{epoch}.bin", self.root / f"labels.{epoch}.bin", self.root / f"codes.{epoch}.bin"
+
+    def _version(self) -> Optional[int]:
+        try:
+            return self.meta_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _read_meta(self) -> Dict[str, Any]:
+        return json.loads(self.meta_path.read_text())
+
+    def _write_meta(self):
+        tmp_path = self.root / f"{META_FILE}.tmp"
+        tmp_path.write_text(json.dumps({
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "epoch": self.epoch,
+            "rows": self.rows,
+            "quantization": self.quantizer.kind if self.quantizer else None
+        }))
+        os.replace(tmp_path, self.meta_path)
+        self._loaded_version = self._version()
+
+    def _load(self):
+        version = self._version()
+        if version is None:
+            return
+
+        meta = self._read_meta()
+        if meta["dtype"] != self.dtype.name:
+            logger.warning(
+                f"Embedding matrix at {self.root} is {meta['dtype']}, not {self.dtype.name}; "
+                f"keeping it until the next full reindex"
+            )
+            self.dtype = np.dtype(meta["dtype"])
+        self.dim, self.epoch, self.rows = meta["dim"], meta["epoch"], meta["rows"]
+        self.quantizer = load_quantizer(str(self.quantizer_path)) if meta.get("quantization") else None
+        if self.quantizer is not None and self.quantizer.kind != settings.quantization:
+            logger.warning(
+                f"Embedding matrix at {self.root} is quantized as {self.quantizer.kind}, not {settings.quantization}; "
+                f"keeping it until the next full reindex"
+            )
+        self._labels = np.fromfile(self._paths(self.epoch)[1], dtype=np.int64, count=self.rows)
+        self._live = np.isin(self._labels, self.sidecar.labels())
+        self._map()
+        self._loaded_version = version
+        logger.info(
+            f"Loaded embedding matrix with {int(self._live.sum())} live rows "
+            f"({self.dtype.name}{', ' + self.quantizer.kind if self.quantizer else ''})"
+        )
+
+    def _map(self):
+        vectors_path, _, codes_path = self._paths(self.epoch)
+        self._matrix = np.memmap(
+            vectors_path,
+            dtype=self.dtype,
+            mode="r",
+            shape=(self.rows, self.dim)
+        ) if self.rows else None
+        self._codes = np.memmap(
+            codes_path,
+            dtype=self.quantizer.code_dtype,
+            mode="r",
+            shape=(self.rows, self.quantizer.code_size(self.dim))
+        ) if self.rows and self.quantizer else None
+
+    def _refresh(self):
+        # Pick up rows another store object appended; a new epoch, a matrix that did not
+        # exist when this one was opened or a quantizer trained elsewhere means a full
+        # reload, so later appends here write codes too
+        version = self._version()
+        if version is None or version == self._loaded_version:
+            return
+        meta = self._read_meta()
+        quantization = self.quantizer.kind if self.quantizer else None
+        if (
+            self.dim is None
+            or meta["epoch"] != self.epoch
+            or meta["rows"] < self.rows
+            or meta.get("quantization") != quantization
+        ):
+            self._load()
+            return
+
+        added = meta["rows"] - self.rows
+        new_labels = np.fromfile(self._paths(self.epoch)[1], dtype=np.int64, count=added, offset=self.rows * 8)
+        self._labels = np.concatenate([self._labels, new_labels])
+        self._live = np.concatenate([self._live, np.ones(added, dtype=bool)])
+        self.rows = meta["rows"]
+        self._map()
+        self._loaded_version = version
+
+    def _positions(self, labels: List[int]) -> np.ndarray:
+        labels = np.asarray(labels, dtype=np.int64)
+        positions = np.searchsorted(self._labels, labels)
+        found = positions < self.rows
+        found[found] = self._labels[positions[found]] == labels[found]
+        return positions[found]
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        if not ids:
+            return
+        vectors = normalize(embeddings).astype(self.dtype)
+        with self._lock:
+            self._refresh()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the matrix ({self.dim})")
+
+            stale, labels = self.sidecar.replace(ids, documents, metadatas)
+            self._live[self._positions(stale)] = False
+
+            # The metadata row count is authoritative; truncating first drops the tail of an
+            # append that was interrupted before the metadata was written
+            vectors_path, labels_path, codes_path = self._paths(self.epoch)
+            appends = [(vectors_path, vectors), (labels_path, np.asarray(labels, dtype=np.int64))]
+            if self.quantizer is not None:
+                appends.append((codes_path, self.quantizer.encode(vectors)))
+            for path, data in appends:
+                with open(path, "ab") as f:
+                    f.truncate(self.rows * data[0].nbytes)
+                    f.write(data.tobytes())
+
+            self._labels = np.concatenate([self._labels, np.asarray(labels, dtype=np.int64)])
+            self._live = np.concatenate([self._live, np.ones(len(labels), dtype=bool)])
+            self.rows += len(labels)
+            self._map()
+            self._train_quantizer()
+            self._write_meta()
+
+    def _train_quantizer(self):
+        if self.quantizer is not None or self.rows < settings.quantization_train_size:
+            return
+        quantizer = create_quantizer(settings.quantization)
+        if quantizer is None:
+            return
+
+        live = np.flatnonzero(self._live)
+        sample = np.random.default_rng(1).choice(live, min(len(live), MAX_TRAINING_POINTS), replace=False)
+        logger.info(f"Training {quantizer.kind} quantizer on {len(sample)} of {self.rows} embeddings")
+        quantizer.train(np.asarray(self._matrix[np.sort(sample)], dtype=np.float32))
+
+        with open(self._paths(self.epoch)[2], "wb") as f:
+            for start in range(0, self.rows, settings.numpy_block_rows):
+                f.write(quantizer.encode(np.asarray(self._matrix[start:start + settings.numpy_block_rows], dtype=np.float32)).tobytes())
+        quantizer.save(str(self.quantizer_path))
+        self.quantizer = quantizer
+        self._map()
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        found = {}
+        with self._lock:
+            self._refresh()
+            for label, chunk_id, document, _ in self.sidecar.by_ids(ids):
+                positions = self._positions([label])
+                if len(positions):
+                    found[chunk_id] = (document, np.asarray(self._matrix[positions[0]], dtype=np.float32))
+        return found
+
+    def texts(self, ids: List[str]) -> Dict[str, str]:
+        return {chunk_id: document for _, chunk_id, document, _ in self.sidecar.by_ids(ids)}
+
+    def delete_by_file(self, file_path: str, keep: Iterable[str] = ()):
+        with self._lock:
+            self._refresh()
+            self._live[self._positions(self.sidecar.delete_file(file_path, keep))] = False
+
+    def query(self, embeddings: np.ndarray, top_k: int) -> List[List[SearchHit]]:
+        vectors = normalize(embeddings)
+        with self._lock:
+            self._refresh()
+            matrix, codes, quantizer, labels, live = self._matrix, self._codes, self.quantizer, self._labels, self._live
+        if matrix is None or not live.any():
+            return [[] for _ in range(len(vectors))]
+
+        if quantizer is None:
+            def search(fetch: int) -> Tuple[np.ndarray, np.ndarray]:
+                return self._top_k(
+                    lambda start, end: vectors @ np.asarray(matrix[start:end], dtype=np.float32).T,
+                    len(vectors), fetch, labels, live
+                )
+        else:
+            def search(fetch: int) -> Tuple[np.ndarray, np.ndarray]:
+                # Approximate scores over the codes pick the candidates, full-precision rows rank them
+                candidates = max(fetch, fetch * settings.rescore_factor)
+                _, rows = self._top_k(
+                    lambda start, end: quantizer.scores(vectors, codes[start:end]),
+                    len(vectors), candidates, np.arange(len(labels)), live
+                )
+                return self._rescore(vectors, rows, fetch, matrix, labels)
+
+        return resolve_hits(self.sidecar, search, int(live.sum()), top_k)
+
+    def _top_k(self, score_block, queries: int, k: int, labels: np.ndarray, live: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # One matrix product per block of rows scores every query at once; blocks bound the
+        # float32 copy a float16 or quantized matrix needs and keep only k candidates per block
+        block_rows = settings.numpy_block_rows
+        candidate_scores, candidate_rows = [], []
+        for start in range(0, len(live), block_rows):
+            end = min(start + block_rows, len(live))
+            scores = score_block(start, end)
+            scores[:, ~live[start:end]] = -np.inf
+            if scores.shape[1] > k:
+                rows = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, rows, axis=1)
+            else:
+                rows = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+            candidate_scores.append(scores)
+            candidate_rows.append(rows + start)
+
+        scores = np.hstack(candidate_scores) if candidate_scores else np.empty((queries, 0), dtype=np.float32)
+        rows = np.hstack(candidate_rows) if candidate_rows else np.empty((queries, 0), dtype=np.int64)
+        if scores.shape[1] > k:
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            scores = np.take_along_axis(scores, best, axis=1)
+            rows = np.take_along_axis(rows, best, axis=1)
+        order = np.argsort(-scores, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+        found = labels[np.take_along_axis(rows, order, axis=1)]
+        found[np.isneginf(scores)] = -1
+        return scores, found
+
+    def _rescore(self, queries: np.ndarray, rows: np.ndarray, k: int, matrix: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        valid = rows >= 0
+        rows = np.where(valid, rows, 0)
+        vectors = np.asarray(matrix[rows.ravel()], dtype=np.float32).reshape(*rows.shape, -1)
+        scores = np.where(valid, np.einsum("qd,qcd->qc", queries, vectors), -np.inf)
+
+        order = np.argsort(-scores, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, order, axis=1)
+        found = labels[np.take_along_axis(rows, order, axis=1)]
+        found[np.isneginf(scores)] = -1
+        return scores, found
+
+    def documents(self) -> Tuple[List[str], List[str]]:
+        return self.sidecar.documents()
+
+    def count(self) -> int:
+        return self.sidecar.count()
+
+    def flush(self):
+        with self._lock:
+            if not self.rows or self._live.mean() > 1 - COMPACT_RATIO:
+                return
+
+            epoch = self.epoch + 1
+            vectors_path, labels_path, codes_path = self._paths(epoch)
+            keep = np.flatnonzero(self._live)
+            for path, source in ((vectors_path, self._matrix), (codes_path, self._codes)):
+                if source is None:
+                    continue
+                with open(path, "wb") as f:
+                    for start in range(0, len(keep), settings.numpy_block_rows):
+                        f.write(np.ascontiguousarray(source[keep[start:start + settings.numpy_block_rows]]).tobytes())
+            self._labels[keep].tofile(labels_path)
+
+            old_paths = self._paths(self.epoch)
+            total = self.rows
+            self.epoch, self.rows = epoch, len(keep)
+            self._labels = self._labels[keep]
+            self._live = np.ones(len(keep), dtype=bool)
+            self._write_meta()
+            self._map()
+            # Readers still mapping the old epoch keep its data until they reload
+            for path in old_paths:
+                path.unlink(missing_ok=True)
+            logger.info(f"Compacted embedding matrix from {total} to {self.rows} rows")
+
+    def clear(self):
+        with self._lock:
+            for path in self._paths(self.epoch) + (self.meta_path, self.quantizer_path):
+                path.unlink(missing_ok=True)
+            self.sidecar.clear()
+            self.dim, self.epoch, self.rows = None, 0, 0
+            self._matrix = None
+            self.quantizer = None
+            self._codes = None
+            self._labels = np.empty(0, dtype=np.int64)
+            self._live = np.empty(0, dtype=bool)
+            self._loaded_version = None
+
+    def drop(self):
+        with self._lock:
+            self._matrix = None
+            self._codes = None
+            self.drop_storage(self.generation)
+
+    @staticmethod
+    def drop_storage(generation: str):
+        shutil.rmtree(NumpyBackend.storage_path(generation), ignore_errors=True)
@@ -0,0 +1,139 @@
+import numpy as np
+from typing import Optional
+from config import settings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# PQ codes are one byte per sub-vector
+PQ_CENTROIDS = 256
+
+# k-means sees at most this many points per training run
+MAX_TRAINING_POINTS = PQ_CENTROIDS * 256
+
+class ScalarQuantizer:
+    """int8 codes with a per-dimension scale, a quarter of float32"""
+
+    kind = "int8"
+    code_dtype = np.int8
+
+    def __init__(self, scale: np.ndarray = None):
+        self.scale = scale
+
+    @property
+    def trained(self) -> bool:
+        return self.scale is not None
+
+    def train(self, vectors: np.ndarray):
+        # A high percentile rather than the max keeps one outlier from flattening a dimension
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.scale = (np.maximum(np.percentile(np.abs(vectors), 99.9, axis=0), 1e-6) / 127).astype(np.float32)
+
+    def code_size(self, dim: int) -> int:
+        return dim
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(np.asarray(vectors, dtype=np.float32) / self.scale), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Folding the scale into the queries leaves one matmul against the raw codes
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, scale=self.scale)
+
+class ProductQuantizer:
+    """Splits vectors into sub-vectors and stores the nearest of 256 centroids for each"""
+
+    kind = "pq"
+    code_dtype = np.uint8
+
+    def __init__(self, subvectors: int = None, centroids: np.ndarray = None):
+        self.subvectors = subvectors or settings.pq_subvectors
+        # (subvectors, 256, sub-vector dim)
+        self.centroids = centroids
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, vectors: np.ndarray, iterations: int = 20, seed: int = 1):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        # The dimension has to split evenly; fall back to the nearest smaller divisor
+        self.subvectors = max(m for m in range(1, min(self.subvectors, dim) + 1) if dim % m == 0)
+        generator = np.random.default_rng(seed)
+        if len(vectors) > MAX_TRAINING_POINTS:
+            vectors = vectors[generator.choice(len(vectors), MAX_TRAINING_POINTS, replace=False)]
+
+        parts = vectors.reshape(len(vectors), self.subvectors, -1)
+        self.centroids = np.stack([
+            _kmeans(parts[:, m], PQ_CENTROIDS, iterations, generator)
+            for m in range(self.subvectors)
+        ])
+
+    def code_size(self, dim: int) -> int:
+        return self.subvectors
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        parts = vectors.reshape(len(vectors), self.subvectors, -1)
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for m in range(self.subvectors):
+            codes[:, m] = _nearest(parts[:, m], self.centroids[m])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return self.centroids[np.arange(self.subvectors), codes].reshape(len(codes), -1)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Asymmetric scoring: each query's dot product with every centroid is tabulated once,
+        # then a vector's score is the sum of its codes' table entries
+        tables = np.einsum("qmd,mkd->qmk", queries.reshape(len(queries), self.subvectors, -1), self.centroids)
+        subvectors = np.arange(self.subvectors)
+        return np.stack([table[subvectors, codes].sum(axis=1) for table in tables])
+
+    def save(self, path: str):
+        np.savez(path, kind=self.kind, centroids=self.centroids)
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    distances = (centroids ** 2).sum(axis=1) - 2 * points @ centroids.T
+    return distances.argmin(axis=1)
+
+def _kmeans(points: np.ndarray, k: int, iterations: int, generator: np.random.Generator) -> np.ndarray:
+    k = min(k, len(points))
+    centroids = points[generator.choice(len(points), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(points, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, points)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # Re-seed clusters that lost every point
+        if empty.any():
+            centroids[empty] = points[generator.choice(len(points), int(empty.sum()))]
+    if k < PQ_CENTROIDS:
+        # Tiny training sets still need a full code book for uint8 codes
+        centroids = np.vstack([centroids, np.repeat(centroids[-1:], PQ_CENTROIDS - k, axis=0)])
+    return centroids
+
+def create_quantizer(kind: str):
+    if kind == "int8":
+        return ScalarQuantizer()
+    if kind == "pq":
+        return ProductQuantizer()
+    return None
+
+def load_quantizer(path: str) -> Optional[object]:
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind == "int8":
+            return ScalarQuantizer(data["scale"])
+        if kind == "pq":
+            centroids = data["centroids"]
+            return ProductQuantizer(len(centroids), centroids)
+    raise ValueError(f"Unknown quantizer kind {kind} in {path}")
@@ -0,0 +1,103 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Iterable, Tuple, Type
+from config import settings
+from utils.registry import registry
+
+# {'chunk_id', 'content', 'metadata', 'score'}, score being cosine similarity
+SearchHit = Dict[str, Any]
+
+class VectorBackend(ABC):
+    """Storage of chunk vectors, texts and metadata for one index generation"""
+
+    def __init__(self, generation: str):
+        self.generation = generation
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        # chunk id -> (document, embedding) for the ids that are stored
+        raise NotImplementedError
+
+    @abstractmethod
+    def texts(self, ids: List[str]) -> Dict[str, str]:
+        # chunk id -> document for the ids that are stored
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_by_file(self, file_path: str, keep: Iterable[str] = ()):
+        # Chunk ids in keep are not deleted
+        raise NotImplementedError
+
+    @abstractmethod
+    def query(self, embeddings: np.ndarray, top_k: int) -> List[List[SearchHit]]:
+        # One result list per query row, best first
+        raise NotImplementedError
+
+    @abstractmethod
+    def documents(self) -> Tuple[List[str], List[str]]:
+        # (chunk ids, texts) of everything stored, for the keyword index
+        raise NotImplementedError
+
+    @abstractmethod
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def flush(self):
+        # Backends that buffer writes persist them here
+        pass
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def drop(self):
+        raise NotImplementedError
+
+    @staticmethod
+    @abstractmethod
+    def drop_storage(generation: str):
+        # Deletes a generation's stored data without loading it
+        raise NotImplementedError
+
+def _backend_name(generation: str) -> str:
+    return f"vector_backend:{settings.vector_db_type}:{settings.vector_db_path}:{generation}"
+
+def create_backend(generation: str) -> VectorBackend:
+    # Every store in the process shares one backend per generation, so an index is held in memory once
+    return registry.get(_backend_name(generation), lambda: _load_backend(generation))
+
+def release_backend(generation: str):
+    registry.discard(_backend_name(generation))
+
+def drop_backend(generation: str):
+    # An index loaded in this process is dropped through its instance so pending saves
+    # are abandoned; one that is not loaded is never read just to be deleted
+    backend = registry.discard(_backend_name(generation))
+    if backend is not None:
+        backend.drop()
+    else:
+        _backend_class().drop_storage(generation)
+
+def _load_backend(generation: str) -> VectorBackend:
+    return _backend_class()(generation)
+
+def _backend_class() -> Type[VectorBackend]:
+    # Backends are imported on demand so only the configured one's library must be installed
+    if settings.vector_db_type == "faiss":
+        from retriever.faiss_backend import FaissBackend
+        return FaissBackend
+    if settings.vector_db_type == "numpy":
+        from retriever.numpy_backend import NumpyBackend
+        return NumpyBackend
+    from retriever.chroma_backend import ChromaBackend
+    return ChromaBackend
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
@@ -1,103 +1,223 @@
-import chromadb
-from typing import List, Dict, Any
+import copy
+import os
+import numpy as np
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Tuple, Union
 from sentence_transformers import SentenceTransformer
 from config import settings
-from ingestion.chunker import Chunk
+from ingestion.chunker import Chunk, ChunkBatch
+from retriever.embedding_cache import EmbeddingCache, get_embedding_cache
+from retriever.duplicate_index import DuplicateIndex, Promotion
+from retriever.generations import IndexGenerations, generation_path
+from retriever.vector_backend import VectorBackend, create_backend, drop_backend
 from utils.logger import get_logger
+from utils.registry import registry
 
 logger = get_logger(__name__)
 
+def get_embedding_model(name: str = None) -> SentenceTransformer:
+    # Loaded once per process; encode is safe to call from several threads
+    name = name or settings.embedding_model
+    return registry.get(f"embedding_model:{name}", lambda: SentenceTransformer(name))
+
 class VectorStore:
     
-    def __init__(self):
-        self.embedding_model = SentenceTransformer(settings.embedding_model)
-        
-        self.client = chromadb.PersistentClient(path=settings.vector_db_path)
+    def __init__(self, generation: str = None):
+        self.embedding_model = get_embedding_model()
+        self.embedding_cache = get_embedding_cache() if settings.embedding_cache_enabled else None
         
+        self.generations = IndexGenerations()
+        self.generation = self.generations.active() if generation is None else generation
+        self.backend: VectorBackend = create_backend(self.generation)
+        self.duplicates = self._open_duplicates(self.generation)
+    
+    def _duplicates_path(self, generation: str) -> str:
+        return generation_path(str(Path(settings.vector_db_path) / "minhash_lsh.sqlite3"), generation)
+    
+    def _open_duplicates(self, generation: str):
+        return DuplicateIndex(self._duplicates_path(generation)) if settings.dedup_enabled else None
+    
+    def for_generation(self, generation: str) -> "VectorStore":
+        # Same model and cache, pointed at another generation's storage
+        store = copy.copy(self)
+        store.generation = generation
+        store.backend = create_backend(generation)
+        store.duplicates = store._open_duplicates(generation)
+        return store
+    
+    def current(self) -> "VectorStore":
+        # The store for the active generation; self while that has not changed
+        active = self.generations.active()
+        return self if active == self.generation else self.for_generation(active)
+    
+    def activate(self) -> str:
+        # Point readers at this store's generation; returns the generation it replaces
+        return self.generations.activate(self.generation)
+    
+    def drop_generation(self, generation: str):
+        if generation == self.generations.active():
+            raise ValueError(f"Refusing to drop the active index generation {generation or 'legacy'}")
         try:
-            self.collection = self.client.get_collection("documents")
-            logger.info("Loaded existing ChromaDB collection")
-        except:
-            self.collection = self.client.create_collection(
-                name="documents",
-                metadata={"hnsw:space": "cosine"}
-            )
-            logger.info("Created new ChromaDB collection")
+            drop_backend(generation)
+        except Exception as e:
+            logger.warning(f"Could not delete storage of generation {generation or 'legacy'}: {e}")
+        duplicates_path = self._duplicates_path(generation)
+        if os.path.exists(duplicates_path):
+            os.remove(duplicates_path)
+        self.generations.forget(generation)
+        logger.info(f"Dropped index generation {generation or 'legacy'}")
+    
+    def collect_generations(self, keep: Iterable[str] = ()):
+        keep = set(keep)
+        for generation in self.generations.retired():
+            if generation not in keep:
+                self.drop_generation(generation)
     
-    def add_documents(self, chunks: List[Chunk]):
+    def add_documents(self, chunks: Union[ChunkBatch, Iterable[Chunk]]):
+        if not isinstance(chunks, ChunkBatch):
+            chunks = ChunkBatch.from_chunks(chunks)
         if not chunks:
             return
         
-        documents = [chunk.content for chunk in chunks]
-        ids = [chunk.chunk_id for chunk in chunks]
+        embeddings = self.embed(chunks.contents)
+        self.write(chunks, embeddings)
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self.embedding_cache is None or not texts:
+            return self._encode(texts)
         
-        # Flatten metadata for ChromaDB
-        metadatas = []
-        for chunk in chunks:
-            metadata = {
-                'chunk_id': chunk.chunk_id,
-                'source_file': chunk.source_file,
-                'chunk_index': chunk.chunk_index,
-                'file_path': chunk.metadata.get('file_path', ''),
-                'file_name': chunk.metadata.get('file_name', ''),
-                'file_type': chunk.metadata.get('file_type', ''),
-                'file_size': str(chunk.metadata.get('file_size', 0))
-            }
-            metadatas.append(metadata)
+        keys = [EmbeddingCache.key(text) for text in texts]
+        hits, missing = self.embedding_cache.lookup(keys)
         
-        embeddings = self.embedding_model.encode(
-            documents,
+        # Identical chunks inside one batch are encoded once as well
+        unique_missing = {}
+        for i in missing:
+            unique_missing.setdefault(keys[i], i)
+        
+        if unique_missing:
+            encoded = self._encode([texts[i] for i in unique_missing.values()])
+            self.embedding_cache.store(list(unique_missing), encoded)
+            # Round through the cache dtype, so a text embeds the same on a hit as on a miss
+            encoded = encoded.astype(self.embedding_cache.dtype).astype(np.float32)
+            by_key = dict(zip(unique_missing, encoded))
+            for i in missing:
+                hits[i] = by_key[keys[i]]
+        
+        logger.debug(f"Embedding cache: {len(texts) - len(missing)} hits, {len(unique_missing)} encoded")
+        return np.vstack([hits[i] for i in range(len(texts))]).astype(np.float32)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self.embedding_model.encode(
+            texts,
+            batch_size=settings.embedding_batch_size,
             show_progress_bar=False,
             convert_to_numpy=True
-        ).tolist()
-        
-        self.collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            ids=ids,
-            metadatas=metadatas
         )
+    
+    def write(self, chunks: ChunkBatch, embeddings: np.ndarray):
+        if not chunks:
+            return
+        
+        self.backend.upsert(chunks.chunk_ids, embeddings, chunks.contents, self.flatten_metadata(chunks))
         
         logger.debug(f"Added {len(chunks)} chunks to vector store")
     
+    def flatten_metadata(self, chunks: ChunkBatch) -> List[Dict[str, Any]]:
+        # Flatten metadata for ChromaDB, once per source file rather than once per chunk
+        file_fields = [
+            {
+                'source_file': source_file,
+                'file_path': metadata.get('file_path', ''),
+                'file_name': metadata.get('file_name', ''),
+                'file_type': metadata.get('file_type', ''),
+                'file_size': str(metadata.get('file_size', 0))
+            }
+            for source_file, metadata in chunks.sources
+        ]
+        
+        metadatas = []
+        for i in range(len(chunks)):
+            metadata = {
+                'chunk_id': chunks.chunk_ids[i],
+                'chunk_index': chunks.chunk_indexes[i],
+                **file_fields[chunks.source_indexes[i]]
+            }
+            # Chunk-level locations (page or row ranges, schema) ride along as scalar fields
+            for key, value in (chunks.locations[i] or {}).items():
+                if key not in metadata and isinstance(value, (str, int, float, bool)):
+                    metadata[key] = value
+            metadatas.append(metadata)
+        return metadatas
+    
+    def promote(self, promotions: List[Promotion]):
+        # Re-home stored chunks under the id and metadata of a duplicate that outlives them
+        if not promotions:
+            return
+        stored = self.backend.get([old_id for old_id, _, _ in promotions])
+        rows = [(stored[old_id], new_id, metadata) for old_id, new_id, metadata in promotions if old_id in stored]
+        if rows:
+            self.backend.upsert(
+                [new_id for _, new_id, _ in rows],
+                np.vstack([embedding for (_, embedding), _, _ in rows]),
+                [document for (document, _), _, _ in rows],
+                [metadata for _, _, metadata in rows]
+            )
+        logger.debug(f"Promoted {len(promotions)} duplicate chunks in vector store")
+    
     def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+        return self.search_batch([query], top_k)[0]
+    
+    def search_batch(self, queries: List[str], top_k: int = None) -> List[List[Dict[str, Any]]]:
         top_k = top_k or settings.top_k_retrieval
+        if not queries:
+            return []
         
-        query_embedding = self.embedding_model.encode(
-            [query],
+        # One model call for every query, then one nearest-neighbour call per slice of them;
+        # slices bound the query-by-rows score blocks exact backends hold in memory
+        query_embeddings = self.embedding_model.encode(
+            queries,
+            batch_size=settings.embedding_batch_size,
             show_progress_bar=False,
             convert_to_numpy=True
-        ).tolist()[0]
-        
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k,
-            include=["documents", "metadatas", "distances"]
         )
         
-        retrieved = []
-        if results['ids'] and len(results['ids'][0]) > 0:
-            for i in range(len(results['ids'][0])):
-                retrieved.append({
-                    'content': results['documents'][0][i],
-                    'metadata': results['metadatas'][0][i],
-                    'score': 1 - results['distances'][0][i],
-                    'chunk_id': results['ids'][0][i]
-                })
+        results = []
+        for start in range(0, len(queries), settings.search_batch_size):
+            results.extend(self.backend.query(query_embeddings[start:start + settings.search_batch_size], top_k))
+        
+        if self.duplicates is not None:
+            # Chunks stored once on behalf of near-identical passages list those other locations
+            sources = self.duplicates.sources(list({doc['chunk_id'] for retrieved in results for doc in retrieved}))
+            for retrieved in results:
+                for doc in retrieved:
+                    if doc['chunk_id'] in sources:
+                        doc['duplicate_sources'] = sources[doc['chunk_id']]
         
-        logger.debug(f"Vector search returned {len(retrieved)} results")
-        return retrieved
+        logger.debug(f"Vector search returned {sum(map(len, results))} results for {len(queries)} queries")
+        return results
+    
+    def delete_by_file(self, file_path: str, keep: Iterable[str] = ()):
+        # keep spares chunk ids that were just written, e.g. a new version of the file
+        self.backend.delete_by_file(file_path, keep)
+        logger.debug(f"Deleted chunks of {file_path} from vector store")
+    
+    def texts(self, chunk_ids: List[str]) -> Dict[str, str]:
+        return self.backend.texts(chunk_ids) if chunk_ids else {}
+    
+    def all_documents(self) -> Tuple[List[str], List[str]]:
+        return self.backend.documents()
+    
+    def flush(self):
+        self.backend.flush()
     
     def clear(self):
         try:
-            self.client.delete_collection("documents")
-            self.collection = self.client.create_collection(
-                name="documents",
-                metadata={"hnsw:space": "cosine"}
-            )
+            self.backend.clear()
+            if self.duplicates is not None:
+                self.duplicates.clear()
             logger.info("Cleared vector store")
         except Exception as e:
             logger.error(f"Error clearing vector store: {e}")
     
     def count(self) -> int:
-        return self.collection.count()
\ No newline at end of file
+        return self.backend.count()
@@ -103,21 +103,62 @@ def get_system_status():
     except:
         return None
 
-def index_documents():
-    """Index documents via API"""
+def start_index_job():
+    """Start a background indexing job via API"""
     try:
-        response = requests.post(f"{API_BASE_URL}/index", timeout=60)
+        response = requests.post(f"{API_BASE_URL}/index", timeout=10)
         if response.status_code == 200:
             return response.json()
         return {"error": f"API returned status {response.status_code}"}
     except Exception as e:
         return {"error": str(e)}
 
-def upload_file(file):
-    """Upload a file via API"""
+def get_job(job_id):
+    """Get indexing job progress via API"""
     try:
-        files = {"file": (file.name, file.getvalue(), file.type)}
-        response = requests.post(f"{API_BASE_URL}/upload", files=files, timeout=30)
+        response = requests.get(f"{API_BASE_URL}/jobs/{job_id}", timeout=10)
+        if response.status_code == 200:
+            return response.json()
+        return {"error": f"API returned status {response.status_code}"}
+    except Exception as e:
+        return {"error": str(e)}
+
+def index_documents(poll_interval=1.0):
+    """Index documents via API, polling the job until it finishes"""
+    job = start_index_job()
+    if "error" in job:
+        return job
+
+    progress = st.progress(0.0, text="Indexing documents...")
+    while True:
+        status = get_job(job["job_id"])
+        if "error" in status and status.get("status") is None:
+            progress.empty()
+            return status
+
+        done = status.get("files_done", 0)
+        total = done + status.get("files_remaining", 0)
+        eta = status.get("eta_seconds")
+        text = f"Indexed {done}/{total} files, {status.get('chunks_written', 0)} chunks"
+        if eta is not None:
+            text += f" (about {eta:.0f}s left)"
+        progress.progress(done / total if total else 0.0, text=text)
+
+        if status["status"] in ("completed", "failed", "cancelled"):
+            progress.empty()
+            if status["status"] == "failed":
+                return {"error": status.get("error") or "Indexing job failed"}
+            if status["status"] == "cancelled":
+                return {"error": "Indexing job was cancelled"}
+            stats = status.get("stats", {})
+            return {"files_processed": stats.get("files_written", 0), "total_chunks": status.get("chunks_written", 0)}
+        time.sleep(poll_interval)
+
+def upload_and_index(uploaded_files):
+    """Upload files and index just those files via API"""
+    try:
+        files = [("files", (file.name, file.getvalue(), file.type)) for file in uploaded_files]
+        response = requests.post(f"{API_BASE_URL}/upload/index", files=files, timeout=600)
         if response.status_code == 200:
             return response.json()
         return {"error": f"API returned status {response.status_code}"}
@@ -227,34 +268,37 @@ cd src && streamlit run ui.py
 
         st.markdown("Upload documents to be indexed for use case generation. Supported formats: PDF, TXT, MD, CSV, JSON, images, etc.")
 
-        uploaded_file = st.file_uploader(
-            "Choose a file",
+        uploaded_files = st.file_uploader(
+            "Choose files",
             type=["pdf", "txt", "md", "csv", "json", "yaml", "yml", "png", "jpg", "jpeg", "docx"],
-            help="Select a document file to upload"
+            accept_multiple_files=True,
+            help="Select one or more document files to upload"
         )
 
-        if uploaded_file is not None:
-            st.success(f" Selected: {uploaded_file.name}")
+        if uploaded_files:
+            st.success(f" Selected: {', '.join(file.name for file in uploaded_files)}")
 
             col1, col2 = st.columns([1, 1])
             with col1:
                 if st.button(" Upload & Index", use_container_width=True):
-                    with st.spinner("Uploading file..."):
-                        result = upload_file(uploaded_file)
+                    with st.spinner("Uploading and indexing files..."):
+                        result = upload_and_index(uploaded_files)
                         if result.get("error"):
                             st.error(f"Upload failed: {result.get('error')}")
                         else:
-                            st.success(f"✅ {result['message']}")
-
-                            # Auto-index after upload
-                            with st.spinner("Indexing uploaded file..."):
-                                index_result = index_documents()
-                                if not index_result.get("error"):
-                                    st.success("✅ File indexed successfully!")
-                                    time.sleep(1)
-                                    st.rerun()
+                            for item in result["files"]:
+                                if item["status"] == "indexed":
+                                    st.success(f"✅ {item['file_name']}: {item['chunks']} chunks")
+                                elif item["status"] in ("unchanged", "duplicate"):
+                                    st.info(f"{item['file_name']}: already indexed as {Path(item['indexed_as']).name}")
+                                elif item["status"] == "queued":
+                                    st.info(f"{item['file_name']}: saved, will be indexed after the running job")
                                 else:
-                                    st.warning("File uploaded but indexing may have failed")
+                                    st.warning(f"{item['file_name']}: indexing failed")
+                            st.caption(f"Indexed in {result['index_seconds']:.2f}s")
+                            if result["files_indexed"]:
+                                time.sleep(1)
+                                st.rerun()
 
     with tab2:
         st.markdown('<div class="section-header"> Generate Use Cases</div>', unsafe_allow_html=True)
@@ -458,8 +502,11 @@ cd src && streamlit run ui.py
             st.markdown("###  API Endpoints")
             st.code("""
 GET  /         - Health check
-POST /index    - Index documents
+POST /index    - Start an indexing job
+GET  /jobs/{id} - Indexing job progress
+POST /jobs/{id}/cancel - Cancel an indexing job
 POST /upload   - Upload file
+POST /upload/index - Upload and index files
 POST /generate - Generate use cases
 GET  /status   - System status
             """)
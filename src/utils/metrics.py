@@ -1,4 +1,5 @@
 import time
+import threading
 from typing import Dict, Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -28,9 +29,55 @@ class Metrics:
             "metadata": self.metadata
         }
 
+@dataclass
+class StageMetrics:
+    stage: str
+    workers: int = 1
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_ms: float = 0.0
+    queue_depth: int = 0
+    max_queue_depth: int = 0
+    start_time: float = field(default_factory=time.time)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    
+    def record_in(self, queue_depth: int):
+        with self._lock:
+            self.items_in += 1
+            self.queue_depth = queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+    
+    def record_out(self, busy_ms: float, items: int = 1):
+        with self._lock:
+            self.items_out += items
+            self.busy_ms += busy_ms
+    
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+    
+    def throughput(self) -> float:
+        elapsed = time.time() - self.start_time
+        return self.items_out / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "workers": self.workers,
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "errors": self.errors,
+            "busy_ms": self.busy_ms,
+            "throughput_per_s": self.throughput(),
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth
+        }
+
 class MetricsCollector:
     def __init__(self):
         self.metrics = []
+        self.stages: Dict[str, StageMetrics] = {}
     
     def track(self, operation: str) -> Metrics:
         m = Metrics(operation=operation)
@@ -61,7 +108,16 @@ class MetricsCollector:
         
         return summary
     
+    def stage(self, name: str, workers: int = 1) -> StageMetrics:
+        s = StageMetrics(stage=name, workers=workers)
+        self.stages[name] = s
+        return s
+    
+    def get_stage_summary(self) -> Dict[str, Any]:
+        return {name: s.to_dict() for name, s in self.stages.items()}
+    
     def clear(self):
         self.metrics.clear()
+        self.stages.clear()
 
 metrics_collector = MetricsCollector()
\ No newline at end of file
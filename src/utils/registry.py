@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def current_rss() -> Optional[int]:
+    # Resident set size in bytes, where the platform exposes it
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+class ResourceRegistry:
+    """Process-wide models and clients, each loaded once on first use and shared by every caller"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._resources: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, name: str, loader: Callable[[], Any]) -> Any:
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+
+        # One lock per resource: callers of the same one wait for a single load, while
+        # different resources load concurrently
+        with self._lock:
+            loading = self._loading.setdefault(name, threading.Lock())
+        with loading:
+            resource = self._resources.get(name)
+            if resource is not None:
+                return resource
+
+            rss_before = current_rss()
+            start = time.perf_counter()
+            resource = loader()
+            seconds = time.perf_counter() - start
+            rss_after = current_rss()
+            # Approximate when other threads allocate during the load
+            rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+
+            with self._lock:
+                self._resources[name] = resource
+                self._stats[name] = {
+                    "load_seconds": round(seconds, 3),
+                    "rss_delta_bytes": rss_delta,
+                    "loaded_at": datetime.now().isoformat()
+                }
+            logger.info(
+                f"Loaded {name} in {seconds:.2f}s"
+                + (f" ({rss_delta / 2 ** 20:+.1f} MB resident)" if rss_delta is not None else "")
+            )
+            return resource
+
+    def discard(self, name: str) -> Optional[Any]:
+        # Later callers load a fresh instance; current holders keep theirs. Returns the
+        # discarded instance, if one was loaded
+        with self._lock:
+            self._stats.pop(name, None)
+            return self._resources.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            resources = {name: dict(stats) for name, stats in self._stats.items()}
+        return {"rss_bytes": current_rss(), "resources": resources}
+
+registry = ResourceRegistry()
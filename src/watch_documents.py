@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.indexer import DocumentIndexer
+from ingestion.watcher import DirectoryWatcher
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def main():
+    try:
+        indexer = DocumentIndexer()
+
+        logger.info("Catching up on changes since the last run...")
+        indexer.index_all_documents()
+
+        logger.info("Watching for new, changed and deleted documents (Ctrl+C to stop)")
+        DirectoryWatcher(indexer).run_forever()
+
+    except Exception as e:
+        logger.error(f"Watch mode failed: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import zlib
+import numpy as np
+import pytest
+
+# Settings create their directories on import, so they must point somewhere disposable
+# before any module under src is loaded
+_storage = tempfile.mkdtemp(prefix="usecase-tests-")
+for name, path in {
+    "VECTOR_DB_PATH": "vector_db",
+    "METADATA_DB_PATH": "metadata/metadata.db",
+    "EMBEDDING_CACHE_PATH": "embedding_cache",
+    "LOG_FILE": "logs/app.log",
+}.items():
+    os.environ.setdefault(name, os.path.join(_storage, path))
+
+from config import settings
+from utils.registry import registry
+
+class FakeEmbeddingModel:
+    """Hashed bag-of-words vectors: texts that share words score as similar"""
+
+    max_seq_length = 256
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts, **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        vectors = np.full((len(texts), self.dim), 1e-3, dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, zlib.crc32(word.encode("utf-8")) % self.dim] += 1
+        return vectors
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    # Every test gets its own stores
+    (tmp_path / "vector_db").mkdir()
+    monkeypatch.setattr(settings, "vector_db_type", "numpy")
+    monkeypatch.setattr(settings, "vector_db_path", str(tmp_path / "vector_db"))
+    monkeypatch.setattr(settings, "metadata_db_path", str(tmp_path / "metadata.db"))
+    monkeypatch.setattr(settings, "embedding_cache_path", str(tmp_path / "embedding_cache"))
+    return tmp_path
+
+@pytest.fixture
+def embedding_model():
+    # Stands in for the sentence-transformers model everywhere it is fetched from the registry
+    pytest.importorskip("sentence_transformers")
+    model = FakeEmbeddingModel()
+    name = f"embedding_model:{settings.embedding_model}"
+    registry.discard(name)
+    registry.get(name, lambda: model)
+    yield model
+    registry.discard(name)
+
+@pytest.fixture
+def input_dir(storage):
+    path = storage / "input"
+    path.mkdir()
+    return path
+
+@pytest.fixture
+def indexer(input_dir, embedding_model):
+    from ingestion.indexer import DocumentIndexer
+    return DocumentIndexer(str(input_dir), workers=1)
@@ -0,0 +1,120 @@
+import pytest
+from ingestion.batch_writer import EmbeddingBatchWriter
+from ingestion.chunker import Chunk, ChunkBatch, make_chunk_id
+from ingestion.file_loader import FileMetadata
+from ingestion.manifest import ManifestEntry
+from ingestion.pipeline import FileTask, FilePart
+
+@pytest.fixture
+def vector_store(embedding_model, monkeypatch):
+    from retriever.vector_store import VectorStore
+    store = VectorStore()
+    embed = store.embed
+
+    def failing_embed(texts):
+        # Any batch holding a chunk that mentions "poison" cannot be embedded
+        if any("poison" in text for text in texts):
+            raise RuntimeError("encoder failed")
+        return embed(texts)
+
+    monkeypatch.setattr(store, "embed", failing_embed)
+    return store
+
+def _task(path: str, replaces_existing: bool = False) -> FileTask:
+    meta = FileMetadata(file_path=path, file_name=path.rsplit("/", 1)[-1], file_type="txt", file_size=1)
+    entry = ManifestEntry(file_path=path, file_size=1, mtime=0.0, content_hash=path)
+    return FileTask(file_meta=meta, entry=entry, replaces_existing=replaces_existing)
+
+def _part(task: FileTask, texts, start: int = 0, index: int = 0, final: bool = True) -> FilePart:
+    metadata = {"file_path": task.file_meta.file_path}
+    name = task.file_meta.file_name
+    chunks = ChunkBatch.from_chunks(
+        Chunk(text, make_chunk_id(name, metadata, start + i), name, start + i, metadata)
+        for i, text in enumerate(texts)
+    )
+    return FilePart(task, chunks, index, final=final)
+
+def _writer(vector_store, batch_size: int = 8):
+    committed, failed = [], []
+    writer = EmbeddingBatchWriter(
+        vector_store,
+        on_commit=lambda task: committed.append(task.file_meta.file_path),
+        on_failure=lambda task: failed.append(task.file_meta.file_path),
+        batch_size=batch_size,
+        flush_interval=3600
+    )
+    return writer, committed, failed
+
+def _documents(vector_store):
+    return sorted(vector_store.all_documents()[1])
+
+def test_files_are_committed_once_their_chunks_are_written(vector_store):
+    writer, committed, failed = _writer(vector_store, batch_size=3)
+    first, second = _task("/docs/a.txt"), _task("/docs/b.txt")
+
+    writer.add(_part(first, ["one", "two"], final=False))
+    writer.add(_part(second, ["three", "four"]))
+    assert committed == []
+    writer.add(_part(first, ["five"], start=2, index=1))
+    writer.close()
+
+    assert committed == ["/docs/b.txt", "/docs/a.txt"]
+    assert failed == []
+    assert (first.chunk_count, second.chunk_count) == (3, 2)
+    assert _documents(vector_store) == ["five", "four", "one", "three", "two"]
+
+def test_one_bad_file_does_not_fail_its_batch(vector_store):
+    writer, committed, failed = _writer(vector_store)
+    good, bad = _task("/docs/good.txt"), _task("/docs/bad.txt")
+
+    writer.add(_part(good, ["fine text"]))
+    writer.add(_part(bad, ["poison pill"]))
+    writer.close()
+
+    assert committed == ["/docs/good.txt"]
+    assert failed == ["/docs/bad.txt"]
+    assert _documents(vector_store) == ["fine text"]
+
+def test_failed_file_loses_its_partly_written_chunks(vector_store):
+    writer, committed, failed = _writer(vector_store, batch_size=2)
+    task = _task("/docs/a.txt")
+
+    assert writer.add(_part(task, ["one", "two"], final=False))
+    assert not writer.add(_part(task, ["poison", "four"], start=2, index=1))
+    writer.close()
+
+    assert committed == []
+    assert failed == ["/docs/a.txt"]
+    assert vector_store.count() == 0
+
+def test_replaced_file_keeps_old_chunks_until_the_new_ones_are_written(vector_store):
+    old = _task("/docs/a.txt")
+    writer, _, _ = _writer(vector_store)
+    writer.add(_part(old, ["old one", "old two", "old three"]))
+    writer.close()
+
+    writer, committed, failed = _writer(vector_store)
+    writer.add(_part(_task("/docs/a.txt", replaces_existing=True), ["poison"]))
+    writer.close()
+
+    assert failed == ["/docs/a.txt"]
+    assert _documents(vector_store) == ["old one", "old three", "old two"]
+
+    writer, committed, failed = _writer(vector_store)
+    writer.add(_part(_task("/docs/a.txt", replaces_existing=True), ["new one"]))
+    writer.close()
+
+    assert committed == ["/docs/a.txt"]
+    assert _documents(vector_store) == ["new one"]
+
+def test_replaced_file_without_chunks_is_cleared(vector_store):
+    writer, _, _ = _writer(vector_store)
+    writer.add(_part(_task("/docs/a.txt"), ["old one"]))
+    writer.close()
+
+    writer, committed, _ = _writer(vector_store)
+    writer.add(_part(_task("/docs/a.txt", replaces_existing=True), []))
+    writer.close()
+
+    assert committed == ["/docs/a.txt"]
+    assert vector_store.count() == 0
@@ -0,0 +1,59 @@
+import pickle
+from ingestion.chunker import ChunkBatch, SmartChunker, make_chunk_id
+
+def test_chunk_id_tells_same_named_files_apart():
+    first = make_chunk_id("spec.md", {"file_path": "/docs/a/spec.md"}, 0)
+    second = make_chunk_id("spec.md", {"file_path": "/docs/b/spec.md"}, 0)
+
+    assert first != second
+    assert first.startswith("spec.md_")
+    assert first.endswith("_0")
+
+def test_chunk_id_is_stable():
+    metadata = {"file_path": "/docs/a/spec.md"}
+
+    assert make_chunk_id("spec.md", metadata, 3) == make_chunk_id("spec.md", dict(metadata), 3)
+    assert make_chunk_id("spec.md", metadata, 3) != make_chunk_id("spec.md", metadata, 4)
+
+def test_chunk_id_falls_back_to_the_source_name():
+    assert make_chunk_id("spec.md", {}, 0) == make_chunk_id("spec.md", {"file_path": "spec.md"}, 0)
+
+def test_chunks_are_numbered_in_order():
+    chunker = SmartChunker(chunk_size=40, overlap=0)
+    text = "\n\n".join(f"Paragraph number {i} with some words." for i in range(6))
+
+    chunks = chunker.chunk_text(text, "notes.txt", {"file_path": "/docs/notes.txt"})
+
+    assert [chunk.chunk_index for chunk in chunks] == list(range(len(chunks)))
+    assert len({chunk.chunk_id for chunk in chunks}) == len(chunks) > 1
+    assert all(
+        chunk.chunk_id == make_chunk_id("notes.txt", {"file_path": "/docs/notes.txt"}, chunk.chunk_index)
+        for chunk in chunks
+    )
+
+def test_batch_round_trips_chunks():
+    chunker = SmartChunker(chunk_size=40, overlap=0)
+    text = "\n\n".join(f"Paragraph number {i} with some words." for i in range(4))
+    chunks = chunker.chunk_text(text, "notes.txt", {"file_path": "/docs/notes.txt"})
+
+    batch = pickle.loads(pickle.dumps(ChunkBatch.from_chunks(chunks)))
+
+    assert len(batch) == len(chunks)
+    assert [chunk.to_dict() for chunk in batch] == [chunk.to_dict() for chunk in chunks]
+    assert batch.select([1]).chunk_ids == [chunks[1].chunk_id]
+    assert len(batch.sources) == 1
+
+def test_batch_slices_keep_one_copy_of_file_metadata():
+    first = ChunkBatch.from_chunks(SmartChunker(chunk_size=40, overlap=0).chunk_text(
+        "\n\n".join(f"First file paragraph {i}." for i in range(4)), "a.txt", {"file_path": "/docs/a.txt"}
+    ))
+    second = ChunkBatch.from_chunks(SmartChunker(chunk_size=40, overlap=0).chunk_text(
+        "Second file.", "b.txt", {"file_path": "/docs/b.txt"}
+    ))
+
+    merged = ChunkBatch()
+    merged.extend_batch(first, 1, 3)
+    merged.extend_batch(second)
+
+    assert merged.chunk_ids == first.chunk_ids[1:3] + second.chunk_ids
+    assert [source for source, _ in merged.sources] == ["a.txt", "b.txt"]
@@ -0,0 +1,39 @@
+import pytest
+from ingestion.discovery import FileScanner, Snapshot
+
+@pytest.fixture
+def tree(tmp_path):
+    for path in ["a.txt", "b.md", "skip.log", "docs/c.txt", "docs/deep/d.txt", "build/e.txt"]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(path)
+    return tmp_path
+
+def _relative(root, entries):
+    return sorted(entry.path[len(str(root)) + 1:] for entry in entries)
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_scan_applies_extensions_and_globs(tree, workers):
+    scanner = FileScanner(str(tree), include=[], exclude=["build"], workers=workers, extensions={".txt", ".md"})
+
+    assert _relative(tree, scanner.scan()) == ["a.txt", "b.md", "docs/c.txt", "docs/deep/d.txt"]
+
+def test_include_globs_match_relative_paths_or_names(tree):
+    scanner = FileScanner(str(tree), include=["docs/*", "b.md"], exclude=[], workers=2)
+
+    assert _relative(tree, scanner.scan()) == ["b.md", "docs/c.txt", "docs/deep/d.txt"]
+
+def test_scan_of_a_missing_directory_is_empty(tmp_path):
+    assert list(FileScanner(str(tmp_path / "missing"), include=[], exclude=[]).scan()) == []
+
+def test_snapshot_diff():
+    previous = Snapshot({"kept": (1, 1.0), "changed": (1, 1.0), "gone": (1, 1.0)})
+    current = Snapshot({"kept": (1, 1.0), "changed": (2, 1.0), "new": (1, 1.0)})
+
+    diff = current.diff(previous)
+
+    assert diff.added == ["new"]
+    assert diff.modified == ["changed"]
+    assert diff.removed == ["gone"]
+    assert set(diff.changed) == {"new", "changed", "gone"}
+    assert not Snapshot(dict(current.entries)).diff(current)
+    assert current.diff(None).added == list(current.entries)
@@ -0,0 +1,82 @@
+import pytest
+from retriever.duplicate_index import DuplicateIndex
+
+TEXT = "Users sign in with their email address and a one time code sent by the login service."
+OTHER = "Payments that fail are retried twice before the invoice is marked as overdue."
+
+@pytest.fixture
+def index(tmp_path):
+    return DuplicateIndex(db_path=str(tmp_path / "lsh.sqlite3"), threshold=0.8, num_perm=64, bands=16, shingle_size=3)
+
+def _stage(index, file_path: str, texts, prefix: str):
+    ids = [f"{prefix}_{i}" for i in range(len(texts))]
+    return index.stage(file_path, ids, list(texts), [{"file_path": file_path, "n": i} for i in range(len(texts))])
+
+def test_duplicate_of_a_committed_chunk_is_dropped(index):
+    assert _stage(index, "/a.txt", [TEXT, OTHER], "a") == [0, 1]
+    index.commit_file("/a.txt")
+
+    keep = _stage(index, "/b.txt", [OTHER.upper(), "Something else entirely about deployments."], "b")
+    index.commit_file("/b.txt")
+
+    assert keep == [1]
+    assert index.sources(["a_1"]) == {"a_1": [{"file_path": "/b.txt", "n": 0}]}
+
+def test_duplicates_inside_one_file_are_dropped(index):
+    assert _stage(index, "/a.txt", [TEXT, TEXT, OTHER], "a") == [0, 2]
+
+def test_uncommitted_chunks_are_not_originals(index):
+    _stage(index, "/a.txt", [TEXT], "a")
+
+    # /a.txt may still fail, so /b.txt keeps its own copy
+    assert _stage(index, "/b.txt", [TEXT], "b") == [0]
+
+def test_discarded_file_registers_nothing(index):
+    _stage(index, "/a.txt", [TEXT], "a")
+    index.discard_file("/a.txt")
+    index.commit_file("/a.txt")
+
+    assert _stage(index, "/b.txt", [TEXT], "b") == [0]
+
+def test_removing_an_original_promotes_its_first_duplicate(index):
+    _stage(index, "/a.txt", [TEXT], "a")
+    index.commit_file("/a.txt")
+    for name in ("b", "c"):
+        _stage(index, f"/{name}.txt", [TEXT], name)
+        index.commit_file(f"/{name}.txt")
+
+    promotions = index.remove_file("/a.txt")
+
+    assert promotions == [("a_0", "b_0", {"file_path": "/b.txt", "n": 0})]
+    assert index.sources(["b_0"]) == {"b_0": [{"file_path": "/c.txt", "n": 0}]}
+    # The promoted chunk is the original from now on
+    assert _stage(index, "/d.txt", [TEXT], "d") == []
+    assert index.remove_file("/c.txt") == []
+    assert index.sources(["b_0"]) == {}
+
+def test_removing_a_file_without_duplicates_frees_its_chunks(index):
+    _stage(index, "/a.txt", [TEXT], "a")
+    index.commit_file("/a.txt")
+
+    assert index.remove_file("/a.txt") == []
+    assert _stage(index, "/b.txt", [TEXT], "b") == [0]
+
+def test_indexer_keeps_a_duplicate_searchable_after_its_original_is_deleted(input_dir, embedding_model, monkeypatch):
+    from config import settings
+    from ingestion.indexer import DocumentIndexer
+    monkeypatch.setattr(settings, "dedup_enabled", True)
+    (input_dir / "a.txt").write_text(TEXT)
+    indexer = DocumentIndexer(str(input_dir), workers=1)
+    indexer.index_all_documents()
+    (input_dir / "b.txt").write_text(TEXT)
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.duplicate_chunks == 1
+    assert indexer.vector_store.count() == 1
+
+    (input_dir / "a.txt").unlink()
+    indexer.index_all_documents()
+
+    _, documents = indexer.vector_store.all_documents()
+    assert documents == [TEXT]
+    assert indexer.manifest.get(str(input_dir / "b.txt")) is not None
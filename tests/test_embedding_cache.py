@@ -0,0 +1,131 @@
+import json
+import numpy as np
+import pytest
+from retriever.embedding_cache import KEY_SIZE, EmbeddingCache
+
+MODEL = "test/model"
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+def _vectors(count: int, dim: int = 8) -> np.ndarray:
+    return np.random.default_rng(0).standard_normal((count, dim)).astype(np.float32)
+
+def test_key_ignores_whitespace_differences():
+    assert EmbeddingCache.key("a  b\n c") == EmbeddingCache.key(" a b c ")
+    assert EmbeddingCache.key("a b") != EmbeddingCache.key("a c")
+    assert len(EmbeddingCache.key("a")) == KEY_SIZE
+
+def test_lookup_returns_stored_vectors(cache_dir):
+    cache = EmbeddingCache(MODEL, cache_dir, "float32")
+    keys = [EmbeddingCache.key(text) for text in ("one", "two", "three")]
+    vectors = _vectors(2)
+    cache.store(keys[:2], vectors)
+
+    hits, missing = cache.lookup([keys[2], keys[1], keys[0]])
+
+    assert missing == [0]
+    assert np.array_equal(hits[1], vectors[1])
+    assert np.array_equal(hits[2], vectors[0])
+    assert len(cache) == 2
+
+def test_store_skips_known_keys(cache_dir):
+    cache = EmbeddingCache(MODEL, cache_dir, "float32")
+    key = EmbeddingCache.key("one")
+    vectors = _vectors(2)
+    cache.store([key], vectors[:1])
+    cache.store([key], vectors[1:])
+
+    hits, _ = cache.lookup([key])
+
+    assert len(cache) == 1
+    assert np.array_equal(hits[0], vectors[0])
+
+def test_float16_rows_survive_a_reopen(cache_dir):
+    keys = [EmbeddingCache.key(str(i)) for i in range(5)]
+    vectors = _vectors(5)
+    EmbeddingCache(MODEL, cache_dir).store(keys, vectors)
+
+    reopened = EmbeddingCache(MODEL, cache_dir)
+    hits, missing = reopened.lookup(keys)
+
+    assert not missing
+    assert len(reopened) == 5
+    assert np.allclose(np.stack([hits[i] for i in range(5)]), vectors, atol=1e-2)
+
+def test_rows_from_another_writer_are_picked_up(cache_dir):
+    first = EmbeddingCache(MODEL, cache_dir, "float32")
+    second = EmbeddingCache(MODEL, cache_dir, "float32")
+    keys = [EmbeddingCache.key(str(i)) for i in range(4)]
+    vectors = _vectors(4)
+    first.store(keys[:2], vectors[:2])
+    # The second writer must append after the first one's rows, not over them
+    second.store(keys[2:], vectors[2:])
+
+    hits, missing = first.lookup(keys)
+
+    assert not missing
+    assert np.array_equal(np.stack([hits[i] for i in range(4)]), vectors)
+
+def test_torn_append_is_cut_off(cache_dir):
+    cache = EmbeddingCache(MODEL, cache_dir, "float32")
+    keys = [EmbeddingCache.key(str(i)) for i in range(3)]
+    vectors = _vectors(3)
+    cache.store(keys[:2], vectors[:2])
+    # A writer that died after appending its vector but before its key
+    with open(cache.vectors_path, "ab") as f:
+        f.write(np.ones(8, dtype=np.float32).tobytes())
+
+    reopened = EmbeddingCache(MODEL, cache_dir, "float32")
+    reopened.store(keys[2:], vectors[2:])
+    hits, missing = EmbeddingCache(MODEL, cache_dir, "float32").lookup(keys)
+
+    assert not missing
+    assert np.array_equal(hits[2], vectors[2])
+    assert cache.vectors_path.stat().st_size == 3 * 8 * 4
+
+def test_mismatched_model_resets_the_cache(cache_dir):
+    cache = EmbeddingCache(MODEL, cache_dir, "float32")
+    key = EmbeddingCache.key("one")
+    cache.store([key], _vectors(1))
+    meta = json.loads(cache.meta_path.read_text())
+    cache.meta_path.write_text(json.dumps({**meta, "dtype": "float16"}))
+
+    reopened = EmbeddingCache(MODEL, cache_dir, "float32")
+
+    assert len(reopened) == 0
+    assert reopened.lookup([key]) == ({}, [0])
+    assert not cache.vectors_path.exists()
+
+def test_keys_are_found_after_merging_into_the_sorted_index(cache_dir, monkeypatch):
+    monkeypatch.setattr("retriever.embedding_cache.MERGE_MIN_KEYS", 3)
+    cache = EmbeddingCache(MODEL, cache_dir, "float32")
+    keys = [EmbeddingCache.key(str(i)) for i in range(20)]
+    vectors = _vectors(20)
+    for start in range(0, 20, 4):
+        cache.store(keys[start:start + 4], vectors[start:start + 4])
+    cache.store(keys[:2], _vectors(2) + 1)
+
+    hits, missing = cache.lookup(keys[::-1] + [EmbeddingCache.key("unknown")])
+
+    assert missing == [20]
+    assert len(cache) == 20
+    assert len(cache._keys) > 0
+    assert np.array_equal(np.stack([hits[i] for i in range(20)]), vectors[::-1])
+    reopened = EmbeddingCache(MODEL, cache_dir, "float32")
+    assert reopened.lookup(keys)[1] == []
+
+def test_fresh_encodes_match_cache_hits(embedding_model, monkeypatch):
+    from config import settings
+    from retriever.vector_store import VectorStore
+    monkeypatch.setattr(settings, "embedding_cache_dtype", "float16")
+    store = VectorStore()
+    texts = ["users log in with email", "payments are retried twice"]
+
+    fresh = store.embed(texts)
+    cached = store.embed(texts)
+
+    assert len(embedding_model.encoded) == 2
+    assert fresh.dtype == cached.dtype == np.float32
+    assert np.array_equal(fresh, cached)
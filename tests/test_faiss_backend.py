@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from config import settings
+
+faiss = pytest.importorskip("faiss")
+from retriever.faiss_backend import FaissBackend
+
+DIM = 32
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _fill(backend: FaissBackend, vectors: np.ndarray, files: int = 4):
+    ids = [f"c{i}" for i in range(len(vectors))]
+    backend.upsert(ids, vectors, ids, [{"file_path": f"f{i % files}"} for i in range(len(vectors))])
+    return ids
+
+def _exact_top_k(vectors, ids, queries, k):
+    return [[ids[i] for i in np.argsort(-row)[:k]] for row in queries @ vectors.T]
+
+def _hit_ids(results):
+    return [[hit["chunk_id"] for hit in hits] for hits in results]
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_query_returns_nearest_chunks(index_type):
+    vectors = _vectors(60)
+    backend = FaissBackend("g", index_type)
+    ids = _fill(backend, vectors)
+    queries = _vectors(4, seed=1)
+
+    results = backend.query(queries, 5)
+
+    assert _hit_ids(results) == _exact_top_k(vectors, ids, queries, 5)
+    assert results[0][0]["content"] == results[0][0]["chunk_id"]
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_deleted_and_replaced_chunks_are_not_returned(index_type):
+    vectors = _vectors(40)
+    backend = FaissBackend("g", index_type)
+    _fill(backend, vectors)
+    backend.delete_by_file("f0")
+    backend.upsert(["c1"], vectors[2:3], ["moved"], [{"file_path": "f1"}])
+
+    found = _hit_ids(backend.query(vectors[2:3], 40))[0]
+
+    assert backend.count() == 30
+    assert len(found) == len(set(found)) == 30
+    assert not any(int(chunk_id[1:]) % 4 == 0 for chunk_id in found)
+    assert backend.get(["c1"])["c1"][0] == "moved"
+
+def test_delete_keeps_the_given_chunks():
+    backend = FaissBackend("g")
+    _fill(backend, _vectors(8))
+
+    backend.delete_by_file("f0", keep=["c4"])
+
+    assert sorted(backend.get(["c0", "c4"])) == ["c4"]
+    assert backend.count() == 7
+
+def test_saved_index_is_memory_mapped_by_a_new_reader(monkeypatch):
+    monkeypatch.setattr(settings, "faiss_mmap", True)
+    vectors = _vectors(20)
+    writer = FaissBackend("g")
+    _fill(writer, vectors)
+    writer.flush()
+
+    reader = FaissBackend("g")
+
+    assert reader._mapped
+    assert _hit_ids(reader.query(vectors[3:4], 1)) == [["c3"]]
+    # The first change reloads the mapped index into memory
+    reader.upsert(["extra"], _vectors(1, seed=5), ["extra"], [{"file_path": "f9"}])
+    assert not reader._mapped
+    assert reader.count() == 21
+
+def test_reader_picks_up_a_newer_saved_index():
+    vectors = _vectors(20)
+    writer = FaissBackend("g")
+    reader = FaissBackend("g")
+    _fill(writer, vectors)
+    writer.flush()
+
+    assert _hit_ids(reader.query(vectors[7:8], 1)) == [["c7"]]
+
+def test_ivf_is_trained_once_there_are_enough_vectors(monkeypatch):
+    monkeypatch.setattr(settings, "faiss_nlist", 2)
+    monkeypatch.setattr(settings, "faiss_nprobe", 2)
+    vectors = _vectors(100)
+    backend = FaissBackend("g", "ivf")
+    ids = _fill(backend, vectors)
+
+    assert isinstance(backend.index, faiss.IndexIVF)
+    assert _hit_ids(backend.query(vectors[:3], 1)) == [[ids[0]], [ids[1]], [ids[2]]]
+    backend.delete_by_file("f0")
+    assert "c0" not in _hit_ids(backend.query(vectors[:1], 5))[0]
+
+def test_hnsw_flush_compacts_deleted_vectors():
+    backend = FaissBackend("g", "hnsw")
+    _fill(backend, _vectors(40))
+    backend.delete_by_file("f0")
+    backend.delete_by_file("f1")
+
+    backend.flush()
+
+    assert backend.index.ntotal == 20
+
+def test_dimension_mismatch_is_rejected():
+    backend = FaissBackend("g")
+    _fill(backend, _vectors(2))
+
+    with pytest.raises(ValueError):
+        backend.upsert(["x"], np.ones((1, DIM + 1), dtype=np.float32), ["x"], [{"file_path": "x"}])
@@ -0,0 +1,83 @@
+import os
+import threading
+import pytest
+from config import settings
+from retriever.generations import LEGACY_GENERATION, IndexGenerations
+
+def test_activate_retires_the_previous_generation(storage):
+    generations = IndexGenerations()
+    first, second = generations.create(), generations.create()
+
+    assert generations.activate(first) == LEGACY_GENERATION
+    assert generations.activate(second) == first
+    assert IndexGenerations().active() == second
+    assert generations.retired() == [LEGACY_GENERATION, first]
+
+    generations.forget(first)
+
+    assert generations.retired() == [LEGACY_GENERATION]
+
+def test_updates_from_separate_instances_are_not_lost(storage):
+    created = [IndexGenerations().create() for _ in range(16)]
+    start = threading.Barrier(len(created))
+
+    def activate(generation):
+        # Each store in a process has its own instance
+        generations = IndexGenerations()
+        start.wait()
+        generations.activate(generation)
+
+    threads = [threading.Thread(target=activate, args=(generation,)) for generation in created]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    generations = IndexGenerations()
+    assert sorted(generations.retired() + [generations.active()]) == sorted(created + [LEGACY_GENERATION])
+
+def _write(path, text: str):
+    path.write_text(text)
+    return str(path)
+
+def test_rebuild_switches_to_a_new_generation(indexer, input_dir):
+    _write(input_dir / "a.txt", "Users log in with email.")
+    indexer.index_all_documents()
+    live = indexer.vector_store.generation
+    _write(input_dir / "b.txt", "Payments are retried twice.")
+
+    indexer.index_all_documents(force=True)
+
+    active = indexer.vector_store.generations.active()
+    assert active != live
+    assert indexer.vector_store.generation == active
+    assert indexer.manifest is indexer.live_manifest
+    assert set(indexer.manifest.all_entries()) == {str(input_dir / "a.txt"), str(input_dir / "b.txt")}
+    assert sorted(indexer.vector_store.all_documents()[1]) == ["Payments are retried twice.", "Users log in with email."]
+    # The replaced generation stays until readers have moved on
+    assert indexer.vector_store.generations.retired() == [live]
+
+def test_cancelled_rebuild_keeps_the_live_generation(indexer, input_dir, monkeypatch):
+    _write(input_dir / "a.txt", "Users log in with email.")
+    indexer.index_all_documents()
+    live = indexer.vector_store.generation
+    built = []
+    run_tasks = indexer._run_tasks
+    cancel = threading.Event()
+
+    def cancel_midway(tasks, stats, cancel_event=None):
+        built.append((indexer.vector_store.generation, indexer.manifest.db_path))
+        cancel.set()
+        return run_tasks(tasks, stats, cancel_event)
+
+    monkeypatch.setattr(indexer, "_run_tasks", cancel_midway)
+    indexer.index_all_documents(force=True, cancel=cancel)
+
+    generation, manifest_path = built[0]
+    assert generation != live
+    assert indexer.vector_store.generations.active() == live
+    assert indexer.vector_store.generation == live
+    assert indexer.manifest is indexer.live_manifest
+    assert indexer.vector_store.generations.retired() == []
+    assert not os.path.exists(manifest_path)
+    assert indexer.vector_store.all_documents()[1] == ["Users log in with email."]
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+BM25Okapi = pytest.importorskip("rank_bm25").BM25Okapi
+pytest.importorskip("sentence_transformers")
+
+from retriever.hybrid_retriever import HybridRetriever, _IndexSnapshot
+
+DOCUMENTS = [
+    "user logs in with email and password",
+    "payment is declined when the card expired",
+    "user resets password by email",
+    "admin exports the payment report",
+    "search returns products by name",
+    "user pays with a saved card and the payment succeeds",
+]
+
+@pytest.fixture
+def snapshot():
+    bm25 = BM25Okapi([document.split() for document in DOCUMENTS])
+    return _IndexSnapshot(None, bm25, [f"c{i}" for i in range(len(DOCUMENTS))])
+
+def test_batch_scores_match_get_scores(snapshot):
+    # The retriever is not built: only the BM25 scoring is under test
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    queries = ["User password email", "payment card", "report", "nothing matches", "payment payment"]
+
+    results = retriever._bm25_search_batch(snapshot, queries, top_k=len(DOCUMENTS))
+
+    for query, hits in zip(queries, results):
+        expected = snapshot.bm25_index.get_scores(query.lower().split())
+        scores = np.zeros(len(DOCUMENTS))
+        for hit in hits:
+            scores[int(hit["chunk_id"][1:])] = hit["score"]
+        assert np.allclose(scores, expected)
+        assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+
+def test_batch_returns_top_k(snapshot):
+    retriever = HybridRetriever.__new__(HybridRetriever)
+
+    hits = retriever._bm25_search_batch(snapshot, ["payment card"], top_k=2)[0]
+
+    assert len(hits) == 2
+    assert {hit["chunk_id"] for hit in hits} <= {"c1", "c3", "c5"}
+    assert all(hit["content"] is None for hit in hits)
@@ -0,0 +1,74 @@
+import pytest
+from PIL import Image
+from config import settings
+from ingestion.image_processor import ImageProcessor
+from ingestion.ocr import OCREngine
+
+class FakeOCREngine(OCREngine):
+    """Reads the image's width as its text; a width of 13 makes tesseract fail"""
+
+    def __init__(self):
+        super().__init__(workers=2)
+        self.cache = None
+        self.calls = 0
+
+    def _run_tesseract(self, image: Image.Image) -> str:
+        self.calls += 1
+        if image.width == 13:
+            raise RuntimeError("tesseract crashed")
+        return f"width {image.width}"
+
+@pytest.fixture
+def engine():
+    engine = FakeOCREngine()
+    yield engine
+    engine.shutdown()
+
+def _image(path, width: int) -> str:
+    Image.new("RGB", (width, 10), "white").save(path)
+    return str(path)
+
+def test_image_text_is_extracted(tmp_path, engine):
+    path = _image(tmp_path / "scan.png", 40)
+
+    text = ImageProcessor(engine).process_image(path)
+
+    assert "Image OCR: scan.png" in text
+    assert "width 40" in text
+    assert "Dimensions: 40x10 pixels" in text
+
+def test_failed_ocr_raises(tmp_path, engine):
+    path = _image(tmp_path / "scan.png", 13)
+
+    with pytest.raises(RuntimeError):
+        ImageProcessor(engine).process_image(path)
+
+def test_unreadable_image_raises(tmp_path, engine):
+    path = tmp_path / "scan.png"
+    path.write_bytes(b"not an image")
+
+    with pytest.raises(Exception):
+        ImageProcessor(engine).process_image(str(path))
+
+def test_placeholder_only_when_enabled(tmp_path, engine, monkeypatch):
+    monkeypatch.setattr(settings, "ocr_failure_placeholder", True)
+    path = _image(tmp_path / "scan.png", 13)
+
+    text = ImageProcessor(engine).process_image(path)
+
+    assert text.endswith("Image: scan.png (processing failed)")
+
+def test_prefetched_result_is_used_only_for_the_same_content(tmp_path, engine):
+    path = _image(tmp_path / "scan.png", 40)
+    processor = ImageProcessor(engine)
+    processor.prefetch([(path, "hash-1")])
+    processor._prefetched[(path, "hash-1")].result()
+
+    assert "width 40" in processor.process_image(path, "hash-1")
+    assert engine.calls == 1
+
+    _image(tmp_path / "scan.png", 50)
+    processor.prefetch([(path, "hash-1")])
+    assert "width 50" in processor.process_image(path, "hash-2")
+    processor.clear_prefetched()
+    assert not processor._prefetched
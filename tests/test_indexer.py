@@ -0,0 +1,107 @@
+import os
+import pytest
+
+def _write(path, text: str):
+    path.write_text(text)
+    return str(path)
+
+def _chunk_files(indexer):
+    _, documents = indexer.vector_store.all_documents()
+    return documents
+
+def test_first_run_indexes_every_file(indexer, input_dir):
+    first = _write(input_dir / "a.txt", "Users log in with email.")
+    second = _write(input_dir / "b.md", "Payments are retried twice.")
+
+    total = indexer.index_all_documents()
+
+    assert total == 2
+    assert indexer.vector_store.count() == 2
+    assert {entry.chunk_count for entry in indexer.manifest.all_entries().values()} == {1}
+    assert set(indexer.manifest.all_entries()) == {first, second}
+
+def test_unchanged_files_are_not_reprocessed(indexer, input_dir, embedding_model):
+    _write(input_dir / "a.txt", "Users log in with email.")
+    indexer.index_all_documents()
+    encoded = len(embedding_model.encoded)
+
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_skipped == 1
+    assert indexer.last_stats.files_written == 0
+    assert len(embedding_model.encoded) == encoded
+
+def test_modified_file_replaces_its_chunks(indexer, input_dir):
+    path = _write(input_dir / "a.txt", "Users log in with email.")
+    indexer.index_all_documents()
+    before = indexer.manifest.get(path).content_hash
+    _write(input_dir / "a.txt", "Users log in with a passkey.\n\n" + "More text. " * 80)
+
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_updated == 1
+    assert indexer.manifest.get(path).content_hash != before
+    assert indexer.vector_store.count() == indexer.manifest.get(path).chunk_count > 1
+    assert not any("email" in text for text in _chunk_files(indexer))
+
+def test_deleted_file_is_removed(indexer, input_dir):
+    path = _write(input_dir / "a.txt", "Users log in with email.")
+    _write(input_dir / "b.txt", "Payments are retried twice.")
+    indexer.index_all_documents()
+    os.remove(path)
+
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_deleted == 1
+    assert indexer.manifest.get(path) is None
+    assert _chunk_files(indexer) == ["Payments are retried twice."]
+
+def test_same_named_files_in_different_directories_are_kept_apart(indexer, input_dir):
+    (input_dir / "one").mkdir()
+    (input_dir / "two").mkdir()
+    _write(input_dir / "one" / "notes.txt", "First notes.")
+    _write(input_dir / "two" / "notes.txt", "Second notes.")
+
+    indexer.index_all_documents()
+
+    assert sorted(_chunk_files(indexer)) == ["First notes.", "Second notes."]
+
+def test_failed_file_is_retried_on_the_next_run(indexer, input_dir, monkeypatch):
+    path = _write(input_dir / "a.txt", "Users log in with email.")
+    _write(input_dir / "b.txt", "Payments are retried twice.")
+    indexer.index_all_documents()
+    _write(input_dir / "a.txt", "Users log in with a passkey.")
+    embed = indexer.vector_store.embed
+
+    def failing_embed(texts):
+        if any("passkey" in text for text in texts):
+            raise RuntimeError("encoder failed")
+        return embed(texts)
+
+    monkeypatch.setattr(indexer.vector_store, "embed", failing_embed)
+    before = indexer.manifest.get(path).content_hash
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_failed == 1
+    assert indexer.manifest.get(path).content_hash == before
+    assert sorted(_chunk_files(indexer)) == ["Payments are retried twice.", "Users log in with email."]
+
+    monkeypatch.setattr(indexer.vector_store, "embed", embed)
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_updated == 1
+    assert sorted(_chunk_files(indexer)) == ["Payments are retried twice.", "Users log in with a passkey."]
+
+def test_worker_pool_indexes_like_a_single_process(input_dir, embedding_model):
+    from ingestion.indexer import DocumentIndexer
+    for i in range(4):
+        _write(input_dir / f"doc{i}.txt", f"Document {i} talks about topic {i}.")
+    broken = _write(input_dir / "broken.docx", "not a zip archive")
+
+    pooled = DocumentIndexer(str(input_dir), workers=2)
+    pooled.index_all_documents()
+
+    assert pooled.last_stats.files_written == 4
+    assert pooled.last_stats.files_failed == 1
+    assert pooled.manifest.get(broken) is None
+    assert sorted(_chunk_files(pooled)) == [f"Document {i} talks about topic {i}." for i in range(4)]
@@ -0,0 +1,89 @@
+import threading
+import pytest
+from ingestion.indexer import IndexStats
+from ingestion.jobs import JobManager
+
+class BlockingIndexer:
+    """Runs until released, then returns or raises"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+        self.error = None
+
+    def index_all_documents(self, force: bool = False, stats: IndexStats = None, cancel: threading.Event = None) -> int:
+        self.runs += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        stats.add(files_written=1, total_chunks=3)
+        return 3
+
+@pytest.fixture
+def indexer():
+    return BlockingIndexer()
+
+@pytest.fixture
+def manager(indexer):
+    finished = []
+    manager = JobManager(indexer, on_finished=finished.append)
+    manager.finished = finished
+    yield manager
+    indexer.release.set()
+    manager.shutdown()
+
+def _wait(manager, job):
+    manager._executor.submit(lambda: None).result(5)
+    return job
+
+def test_job_runs_to_completion(manager, indexer):
+    job = manager.submit_index()
+    indexer.release.set()
+    _wait(manager, job)
+
+    assert job.status == "completed"
+    assert job.to_dict()["chunks_written"] == 3
+    assert manager.finished == [job]
+
+def test_failed_run_is_reported(manager, indexer):
+    indexer.error = RuntimeError("disk full")
+    indexer.release.set()
+    job = _wait(manager, manager.submit_index())
+
+    assert job.status == "failed"
+    assert job.error == "disk full"
+
+def test_queued_job_is_cancelled_without_running(manager, indexer):
+    running = manager.submit_index()
+    indexer.started.wait(5)
+    queued = manager.submit_index()
+
+    assert manager.cancel(queued.job_id).status == "cancelled"
+    indexer.release.set()
+    _wait(manager, running)
+
+    assert running.status == "completed"
+    assert queued.status == "cancelled"
+    assert indexer.runs == 1
+    assert manager.finished == [running]
+
+def test_running_job_finishes_as_cancelled(manager, indexer):
+    job = manager.submit_index()
+    indexer.started.wait(5)
+
+    assert manager.cancel(job.job_id).status == "running"
+    assert job.cancel_event.is_set()
+    indexer.release.set()
+    _wait(manager, job)
+
+    assert job.status == "cancelled"
+    assert job.finished_at is not None
+
+def test_cancelling_a_finished_job_changes_nothing(manager, indexer):
+    indexer.release.set()
+    job = _wait(manager, manager.submit_index())
+
+    assert manager.cancel(job.job_id).status == "completed"
+    assert manager.cancel("missing") is None
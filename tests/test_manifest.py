@@ -0,0 +1,73 @@
+import os
+import pytest
+from ingestion.manifest import IndexManifest, ManifestEntry, hash_file
+
+@pytest.fixture
+def manifest(tmp_path):
+    return IndexManifest(str(tmp_path / "manifest.db"))
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime
+
+def _record(manifest: IndexManifest, path, chunk_count: int = 3) -> ManifestEntry:
+    entry = manifest.check(str(path), *_stat(path))
+    entry.chunk_count = chunk_count
+    manifest.upsert(entry)
+    return entry
+
+def test_new_file_needs_indexing(manifest, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello")
+
+    entry = manifest.check(str(path), *_stat(path))
+
+    assert entry.file_path == str(path)
+    assert entry.content_hash == hash_file(str(path))
+    assert manifest.get(str(path)) is None
+
+def test_unchanged_file_is_skipped(manifest, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello")
+    _record(manifest, path)
+
+    assert manifest.check(str(path), *_stat(path), manifest.get(str(path))) is None
+
+def test_touched_file_is_skipped_and_its_stat_updated(manifest, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello")
+    _record(manifest, path)
+    os.utime(path, (1_000_000_000, 1_000_000_000))
+
+    assert manifest.check(str(path), *_stat(path), manifest.get(str(path))) is None
+    stored = manifest.get(str(path))
+    assert stored.mtime == 1_000_000_000
+    assert stored.chunk_count == 3
+
+def test_modified_file_needs_indexing(manifest, tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("hello")
+    before = _record(manifest, path)
+    path.write_text("hello, world")
+
+    entry = manifest.check(str(path), *_stat(path), manifest.get(str(path)))
+
+    assert entry is not None
+    assert entry.content_hash != before.content_hash
+    assert entry.chunk_count == 0
+
+def test_lookups_by_hash_and_directory(manifest, tmp_path):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs-old").mkdir()
+    inside = tmp_path / "docs" / "a.txt"
+    sibling = tmp_path / "docs-old" / "a.txt"
+    inside.write_text("same")
+    sibling.write_text("same")
+    _record(manifest, inside)
+    _record(manifest, sibling)
+
+    assert manifest.paths_under(str(tmp_path / "docs")) == [str(inside)]
+    assert manifest.get_by_hash(hash_file(str(inside))).file_path in {str(inside), str(sibling)}
+
+    manifest.remove([str(inside)])
+    assert set(manifest.all_entries()) == {str(sibling)}
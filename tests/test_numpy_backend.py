@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from config import settings
+from retriever.numpy_backend import NumpyBackend
+
+DIM = 32
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _fill(backend: NumpyBackend, vectors: np.ndarray, files: int = 4):
+    ids = [f"c{i}" for i in range(len(vectors))]
+    metadatas = [{"file_path": f"f{i % files}"} for i in range(len(vectors))]
+    backend.upsert(ids, vectors, ids, metadatas)
+    return ids
+
+def _exact_top_k(vectors: np.ndarray, ids, queries: np.ndarray, k: int):
+    scores = queries @ vectors.T
+    return [[ids[i] for i in np.argsort(-row)[:k]] for row in scores]
+
+def _hit_ids(results):
+    return [[hit["chunk_id"] for hit in hits] for hits in results]
+
+@pytest.mark.parametrize("block_rows", [65536, 7])
+def test_query_matches_exact_top_k(monkeypatch, block_rows):
+    # A small block size makes every query merge candidates from many blocks
+    monkeypatch.setattr(settings, "numpy_block_rows", block_rows)
+    vectors = _vectors(100)
+    backend = NumpyBackend("g")
+    ids = _fill(backend, vectors)
+    queries = _vectors(5, seed=1)
+
+    results = backend.query(queries, 10)
+
+    assert _hit_ids(results) == _exact_top_k(vectors, ids, queries, 10)
+    for hits, query in zip(results, queries):
+        scores = [hit["score"] for hit in hits]
+        assert scores == sorted(scores, reverse=True)
+        assert scores[0] == pytest.approx(float(np.max(vectors @ query)), abs=1e-5)
+        assert hits[0]["content"] == hits[0]["chunk_id"]
+
+def test_query_skips_deleted_and_replaced_rows():
+    vectors = _vectors(40)
+    backend = NumpyBackend("g")
+    ids = _fill(backend, vectors)
+    backend.delete_by_file("f0")
+    # Re-upserting an id moves it to a new row; the old row must not be returned too
+    backend.upsert(["c1"], vectors[2:3], ["moved"], [{"file_path": "f1"}])
+
+    hits = backend.query(vectors[2:3], 40)[0]
+    found = [hit["chunk_id"] for hit in hits]
+
+    assert backend.count() == 30
+    assert len(found) == len(set(found)) == 30
+    assert not any(int(chunk_id[1:]) % 4 == 0 for chunk_id in found)
+    assert {found[0], found[1]} == {"c1", "c2"}
+    assert backend.get(["c1"])["c1"][0] == "moved"
+    assert "c0" not in backend.get(ids[:1])
+
+def test_flush_compacts_into_a_new_epoch():
+    vectors = _vectors(40)
+    backend = NumpyBackend("g")
+    ids = _fill(backend, vectors)
+    queries = _vectors(3, seed=2)
+    backend.delete_by_file("f0")
+    backend.delete_by_file("f1")
+    before = backend.query(queries, 5)
+
+    backend.flush()
+
+    assert backend.epoch == 1
+    assert backend.rows == 20
+    assert not backend._paths(0)[0].exists()
+    assert _hit_ids(backend.query(queries, 5)) == _hit_ids(before)
+    assert np.allclose(backend.get(["c3"])["c3"][1], vectors[3], atol=1e-6)
+    # A fresh reader loads the compacted epoch
+    assert _hit_ids(NumpyBackend("g").query(queries, 5)) == _hit_ids(before)
+
+def test_flush_keeps_matrix_while_few_rows_are_dead():
+    backend = NumpyBackend("g")
+    _fill(backend, _vectors(40), files=10)
+    backend.delete_by_file("f0")
+
+    backend.flush()
+
+    assert backend.epoch == 0
+    assert backend.rows == 40
+
+def test_other_store_picks_up_appended_rows():
+    vectors = _vectors(20)
+    writer = NumpyBackend("g")
+    reader = NumpyBackend("g")
+    _fill(writer, vectors)
+
+    assert reader.query(vectors[7:8], 1)[0][0]["chunk_id"] == "c7"
+    assert reader.count() == 20
+
+def test_float16_matrix():
+    vectors = _vectors(50)
+    backend = NumpyBackend("g", dtype="float16")
+    ids = _fill(backend, vectors)
+
+    assert _hit_ids(backend.query(vectors[:3], 1)) == [[ids[0]], [ids[1]], [ids[2]]]
+    assert NumpyBackend("g").dtype == np.float16
+
+def test_dimension_mismatch_is_rejected():
+    backend = NumpyBackend("g")
+    _fill(backend, _vectors(2))
+
+    with pytest.raises(ValueError):
+        backend.upsert(["x"], np.ones((1, DIM + 1), dtype=np.float32), ["x"], [{"file_path": "x"}])
@@ -0,0 +1,49 @@
+import pytest
+from ingestion.office_processor import OfficeProcessor
+
+def test_docx_paragraphs_and_tables_are_streamed_in_order(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("Introduction")
+    table = document.add_table(rows=2, cols=2)
+    for r, row in enumerate([("Name", "Role"), ("Ada", "Engineer")]):
+        for c, value in enumerate(row):
+            table.cell(r, c).text = value
+    document.add_paragraph("")
+    document.add_paragraph("Closing words")
+    path = tmp_path / "report.docx"
+    document.save(str(path))
+
+    segments = [text for text, _ in OfficeProcessor.iter_docx(str(path))]
+
+    assert segments == ["Word Document: report.docx", "Introduction", "Name | Role\nAda | Engineer", "Closing words"]
+
+def test_broken_docx_raises(tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_text("not a zip archive")
+
+    with pytest.raises(Exception):
+        list(OfficeProcessor.iter_docx(str(path)))
+
+def test_xlsx_sheets_are_streamed_in_row_groups(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    people = workbook.active
+    people.title = "People"
+    people.append(["name", None])
+    for i in range(1, 6):
+        people.append([f"user {i}", i])
+    people.append([None, None])
+    workbook.create_sheet("Empty")
+    path = tmp_path / "book.xlsx"
+    workbook.save(str(path))
+
+    segments = list(OfficeProcessor.iter_xlsx(str(path), max_chars=10000, max_rows=2))
+
+    assert segments[0] == ("Excel Workbook: book.xlsx\nSheets: People, Empty", None)
+    metadata = [info["metadata"] for _, info in segments[1:]]
+    assert [(m["sheet"], m["row_start"], m["row_end"]) for m in metadata] == [
+        ("People", 1, 2), ("People", 3, 4), ("People", 5, 5)
+    ]
+    assert metadata[0]["columns"] == "name, Column 2"
+    assert "Row 1: name: user 1; Column 2: 1" in segments[1][0]
@@ -0,0 +1,106 @@
+import io
+import fitz
+import pytest
+from concurrent.futures import Future
+from PIL import Image
+from config import settings
+from ingestion.pdf_processor import PDFProcessor
+from utils.registry import registry
+
+class FakeOCREngine:
+    """Answers every job at once and records how many results are still unread"""
+
+    def __init__(self):
+        self.submitted = []
+        self.unread = 0
+        self.max_unread = 0
+
+    def submit(self, data: bytes) -> Future:
+        self.submitted.append(data)
+        self.unread += 1
+        self.max_unread = max(self.max_unread, self.unread)
+        future = Future()
+        future.set_result(f"ocr {len(self.submitted)}")
+        result = future.result
+
+        def read(timeout=None):
+            self.unread -= 1
+            return result(timeout)
+
+        future.result = read
+        return future
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(settings, "pdf_ocr_enabled", True)
+    monkeypatch.setattr(settings, "ocr_workers", 1)
+    engine = FakeOCREngine()
+    registry.discard("ocr_engine")
+    registry.get("ocr_engine", lambda: engine)
+    yield engine
+    registry.discard("ocr_engine")
+
+def _png(size: int = 80) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_only_pages_without_text_are_rasterized(tmp_path, engine):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Typed page")
+    doc.new_page()
+    doc.save(str(tmp_path / "doc.pdf"))
+
+    segments = list(PDFProcessor.iter_pages(str(tmp_path / "doc.pdf")))
+
+    assert len(engine.submitted) == 1
+    assert segments[1][0].strip() == "Typed page"
+    assert segments[2] == ("ocr 1", {"page": 2})
+
+def test_in_flight_ocr_jobs_are_capped(tmp_path, engine):
+    doc = fitz.open()
+    for _ in range(20):
+        doc.new_page()
+    doc.save(str(tmp_path / "scan.pdf"))
+
+    segments = list(PDFProcessor.iter_pages(str(tmp_path / "scan.pdf")))
+
+    assert [location["page"] for _, location in segments[1:]] == list(range(1, 21))
+    assert len(engine.submitted) == 20
+    # One page's jobs may go over the limit of ocr_workers * 2 before the oldest is read
+    assert engine.max_unread <= 3
+
+def test_repeated_image_is_recognised_once(tmp_path, engine):
+    doc = fitz.open()
+    rect = fitz.Rect(72, 100, 152, 180)
+    xref = None
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Letter {i}")
+        if xref is None:
+            xref = page.insert_image(rect, stream=_png())
+        else:
+            page.insert_image(rect, xref=xref)
+    page = doc.new_page()
+    page.insert_text((72, 72), "Small icon")
+    page.insert_image(rect, stream=_png(size=16))
+    doc.save(str(tmp_path / "letters.pdf"))
+
+    segments = list(PDFProcessor.iter_pages(str(tmp_path / "letters.pdf")))
+
+    assert len(engine.submitted) == 1
+    assert "Image OCR:\nocr 1" in segments[1][0]
+    assert "Image OCR" not in segments[2][0]
+
+def test_ranges_are_told_which_images_earlier_ranges_cover(engine):
+    doc = fitz.open()
+    rect = fitz.Rect(72, 100, 152, 180)
+    logo = None
+    for i in range(4):
+        page = doc.new_page()
+        if logo is None:
+            logo = page.insert_image(rect, stream=_png())
+        else:
+            page.insert_image(rect, xref=logo)
+
+    assert PDFProcessor._images_seen_before(doc, [(0, 2), (2, 4)]) == [set(), {logo}]
@@ -0,0 +1,81 @@
+import fitz
+import pytest
+from config import settings
+from ingestion import pdf_processor
+from ingestion.chunker import SmartChunker
+from ingestion.pdf_processor import PDFProcessor, SplitRequired
+
+def _pdf(path, pages):
+    # One page per entry; None leaves the page without a text layer
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        if text is not None:
+            page.insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_pages_are_streamed_with_their_numbers(tmp_path):
+    path = _pdf(tmp_path / "doc.pdf", ["First page", None, "Third page"])
+
+    segments = list(PDFProcessor.iter_pages(path))
+
+    assert segments[0] == ("PDF Document: doc.pdf\nTotal Pages: 3", {"page": 1})
+    assert [(text.strip(), location) for text, location in segments[1:]] == [
+        ("First page", {"page": 1}),
+        ("Third page", {"page": 3}),
+    ]
+
+def test_unreadable_pdf_raises(tmp_path):
+    path = tmp_path / "broken.pdf"
+    path.write_bytes(b"%PDF-1.4 not really")
+
+    with pytest.raises(Exception):
+        list(PDFProcessor.iter_pages(str(path)))
+
+def test_chunks_record_their_page_range():
+    chunker = SmartChunker(chunk_size=200, overlap=0)
+
+    chunks = chunker.chunk_segments([("first page", {"page": 1}), ("second page", {"page": 2})], "doc.pdf")
+
+    assert len(chunks) == 1
+    assert chunks[0].location == {"page_start": 1, "page_end": 2}
+
+@pytest.fixture
+def large_pdf(tmp_path, monkeypatch):
+    # Ten pages count as large; the environment carries the limits into spawned workers
+    for name, value in {"pdf_split_threshold_pages": 5, "pdf_page_range_size": 3, "pdf_extract_workers": 2}.items():
+        monkeypatch.setattr(settings, name, value)
+        monkeypatch.setenv(name.upper(), str(value))
+    return _pdf(tmp_path / "large.pdf", [f"Page number {i + 1}" for i in range(10)])
+
+def test_large_pdf_is_split_into_page_ranges_in_order(large_pdf, monkeypatch):
+    split = list(PDFProcessor.iter_pages(large_pdf))
+    monkeypatch.setattr(settings, "pdf_extract_workers", 1)
+
+    assert split == list(PDFProcessor.iter_pages(large_pdf))
+    assert [location["page"] for _, location in split[1:]] == list(range(1, 11))
+
+def test_only_pool_workers_hand_large_pdfs_back(large_pdf, monkeypatch):
+    monkeypatch.setattr(pdf_processor, "_hand_back_large_pdfs", False)
+    monkeypatch.setattr(settings, "pdf_extract_workers", 1)
+    assert len(list(PDFProcessor.iter_pages(large_pdf))) == 11
+
+    pdf_processor.hand_back_large_pdfs()
+
+    with pytest.raises(SplitRequired) as raised:
+        list(PDFProcessor.iter_pages(large_pdf))
+    assert raised.value.page_count == 10
+
+def test_indexer_pool_fans_large_pdfs_out(large_pdf, tmp_path, embedding_model):
+    from ingestion.indexer import DocumentIndexer
+    (tmp_path / "notes.txt").write_text("Small notes.")
+
+    indexer = DocumentIndexer(str(tmp_path), workers=2)
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_written == 2
+    assert indexer.last_stats.files_failed == 0
+    documents = " ".join(indexer.vector_store.all_documents()[1])
+    assert all(f"Page number {i}" in documents for i in range(1, 11))
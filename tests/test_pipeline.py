@@ -0,0 +1,65 @@
+import pytest
+from config import settings
+
+@pytest.fixture
+def indexer(indexer, monkeypatch):
+    monkeypatch.setattr(settings, "ingestion_mode", "pipeline")
+    # A long flush interval lets files of one run share embedding batches
+    monkeypatch.setattr(settings, "pipeline_flush_interval", 5.0)
+    return indexer
+
+def _write(path, text: str):
+    path.write_text(text)
+    return str(path)
+
+def _documents(indexer):
+    return sorted(indexer.vector_store.all_documents()[1])
+
+def _fail_on(monkeypatch, store, method: str, marker: str):
+    original = getattr(store, method)
+
+    def failing(*args):
+        if any(marker in text for text in (args[0] if method == "embed" else args[0].contents)):
+            raise RuntimeError(f"{method} failed")
+        return original(*args)
+
+    monkeypatch.setattr(store, method, failing)
+
+def test_pipeline_indexes_and_replaces_files(indexer, input_dir):
+    path = _write(input_dir / "a.txt", "Users log in with email.")
+    _write(input_dir / "b.md", "Payments are retried twice.")
+
+    indexer.index_all_documents()
+    _write(input_dir / "a.txt", "Users log in with a passkey.")
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_updated == 1
+    assert indexer.manifest.get(path).chunk_count == 1
+    assert _documents(indexer) == ["Payments are retried twice.", "Users log in with a passkey."]
+
+@pytest.mark.parametrize("method", ["embed", "write"])
+def test_one_bad_file_does_not_fail_its_batch(indexer, input_dir, monkeypatch, method):
+    good = _write(input_dir / "good.txt", "Users log in with email.")
+    bad = _write(input_dir / "bad.txt", "A poison pill.")
+    _fail_on(monkeypatch, indexer.vector_store, method, "poison")
+
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_written == 1
+    assert indexer.last_stats.files_failed == 1
+    assert indexer.manifest.get(good) is not None
+    assert indexer.manifest.get(bad) is None
+    assert _documents(indexer) == ["Users log in with email."]
+
+def test_replaced_file_keeps_old_chunks_when_its_write_fails(indexer, input_dir, monkeypatch):
+    path = _write(input_dir / "a.txt", "Users log in with email.")
+    indexer.index_all_documents()
+    before = indexer.manifest.get(path).content_hash
+    _write(input_dir / "a.txt", "Users log in with a poison passkey.")
+    _fail_on(monkeypatch, indexer.vector_store, "write", "poison")
+
+    indexer.index_all_documents()
+
+    assert indexer.last_stats.files_failed == 1
+    assert indexer.manifest.get(path).content_hash == before
+    assert _documents(indexer) == ["Users log in with email."]
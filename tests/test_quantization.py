@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from config import settings
+from retriever.numpy_backend import NumpyBackend
+from retriever.quantization import ProductQuantizer, ScalarQuantizer, load_quantizer
+
+DIM = 32
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _fill(backend: NumpyBackend, vectors: np.ndarray, files: int = 4):
+    ids = [f"c{i}" for i in range(len(vectors))]
+    metadatas = [{"file_path": f"f{i % files}"} for i in range(len(vectors))]
+    backend.upsert(ids, vectors, ids, metadatas)
+    return ids
+
+def test_scalar_quantizer_round_trip(tmp_path):
+    vectors = _vectors(500)
+    quantizer = ScalarQuantizer()
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+
+    assert codes.dtype == np.int8
+    # Values beyond the 99.9th percentile are clipped; everything else is off by at most half a step
+    inside = np.abs(vectors) <= quantizer.scale * 127
+    error = np.abs(quantizer.decode(codes) - vectors)
+    assert np.all((error <= quantizer.scale / 2 + 1e-6)[inside])
+    assert np.allclose(quantizer.scores(vectors[:4], codes), vectors[:4] @ quantizer.decode(codes).T, atol=1e-4)
+
+    quantizer.save(str(tmp_path / "q.npz"))
+    loaded = load_quantizer(str(tmp_path / "q.npz"))
+    assert isinstance(loaded, ScalarQuantizer)
+    assert np.array_equal(loaded.encode(vectors), codes)
+
+def test_product_quantizer_round_trip(tmp_path):
+    vectors = _vectors(600)
+    quantizer = ProductQuantizer(subvectors=8)
+    quantizer.train(vectors, iterations=5)
+    codes = quantizer.encode(vectors)
+
+    assert codes.shape == (600, 8)
+    assert codes.dtype == np.uint8
+    assert quantizer.centroids.shape == (8, 256, DIM // 8)
+    assert np.allclose(quantizer.scores(vectors[:4], codes), vectors[:4] @ quantizer.decode(codes).T, atol=1e-4)
+
+    quantizer.save(str(tmp_path / "q.npz"))
+    loaded = load_quantizer(str(tmp_path / "q.npz"))
+    assert isinstance(loaded, ProductQuantizer)
+    assert np.array_equal(loaded.encode(vectors), codes)
+
+def test_product_quantizer_uses_a_divisor_of_the_dimension():
+    quantizer = ProductQuantizer(subvectors=12)
+    quantizer.train(_vectors(300), iterations=2)
+
+    assert quantizer.subvectors == 8
+
+@pytest.mark.parametrize("kind", ["int8", "pq"])
+def test_quantized_query_rescores_with_full_precision(monkeypatch, kind):
+    monkeypatch.setattr(settings, "quantization", kind)
+    monkeypatch.setattr(settings, "quantization_train_size", 200)
+    monkeypatch.setattr(settings, "pq_subvectors", 8)
+    vectors = _vectors(300)
+    backend = NumpyBackend("g")
+    ids = _fill(backend, vectors[:100])
+    assert backend.quantizer is None
+
+    ids += [f"c{i}" for i in range(100, 300)]
+    backend.upsert(ids[100:], vectors[100:], ids[100:], [{"file_path": "g"}] * 200)
+
+    assert backend.quantizer.kind == kind
+    assert backend._codes.shape[0] == 300
+    queries = vectors[[5, 150, 299]]
+    hits = backend.query(queries, 3)
+    # The query vectors are stored rows, so re-scoring puts each one first with its exact score
+    assert [row[0]["chunk_id"] for row in hits] == ["c5", "c150", "c299"]
+    assert all(row[0]["score"] == pytest.approx(1.0, abs=1e-5) for row in hits)
+    assert NumpyBackend("g").quantizer.kind == kind
+
+def test_quantizer_trained_by_another_store_is_picked_up(monkeypatch):
+    monkeypatch.setattr(settings, "quantization", "int8")
+    monkeypatch.setattr(settings, "quantization_train_size", 50)
+    vectors = _vectors(80)
+    trainer = NumpyBackend("g")
+    other = NumpyBackend("g")
+    _fill(other, vectors[:10])
+    trainer.upsert([f"c{i}" for i in range(10, 60)], vectors[10:60], ["t"] * 50, [{"file_path": "t"}] * 50)
+    assert trainer.quantizer is not None
+
+    # The other store never trained; its next append must encode with the stored quantizer
+    # rather than train a second one that the trainer's codes no longer match
+    other.upsert([f"c{i}" for i in range(60, 80)], vectors[60:], ["o"] * 20, [{"file_path": "o"}] * 20)
+
+    assert np.array_equal(other.quantizer.scale, trainer.quantizer.scale)
+    assert other._codes.shape[0] == 80
+    assert np.array_equal(other._codes[60:], trainer.quantizer.encode(vectors[60:]))
+    reader = NumpyBackend("g")
+    assert reader._codes.shape[0] == 80
+    assert reader.query(vectors[75:76], 1)[0][0]["chunk_id"] == "c75"
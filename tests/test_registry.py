@@ -0,0 +1,55 @@
+import threading
+import time
+from utils.registry import ResourceRegistry
+
+def test_concurrent_callers_share_a_single_load():
+    registry = ResourceRegistry()
+    loads = []
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("model", loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert len(results) == 8
+    assert all(result is results[0] for result in results)
+    assert set(registry.stats()["resources"]) == {"model"}
+
+def test_different_resources_load_separately():
+    registry = ResourceRegistry()
+
+    first = registry.get("a", lambda: ["a"])
+    second = registry.get("b", lambda: ["b"])
+
+    assert first == ["a"]
+    assert second == ["b"]
+    assert registry.get("a", lambda: ["other"]) is first
+
+def test_discard_hands_back_the_instance_and_forces_a_reload():
+    registry = ResourceRegistry()
+    first = registry.get("model", object)
+
+    assert registry.discard("model") is first
+    assert registry.discard("model") is None
+    assert "model" not in registry.stats()["resources"]
+    assert registry.get("model", object) is not first
+
+def test_failed_load_is_retried():
+    registry = ResourceRegistry()
+
+    def failing():
+        raise RuntimeError("download failed")
+
+    try:
+        registry.get("model", failing)
+    except RuntimeError:
+        pass
+    assert registry.get("model", lambda: "loaded") == "loaded"
@@ -0,0 +1,76 @@
+import io
+import json
+import pytest
+from ingestion.structured_processor import StructuredProcessor, iter_json_events
+
+DOCUMENT = {
+    "name": "Checkout \"service\" ✓",
+    "version": 3,
+    "ratio": -1.5e-3,
+    "enabled": True,
+    "owner": None,
+    "endpoints": [
+        {"path": "/cart", "methods": ["GET", "POST"], "timeout": 30},
+        {"path": "/pay", "methods": [], "nested": {"deep": [[1, 2], {}]}},
+    ],
+}
+
+def _build(events):
+    # Rebuilds the value the events describe
+    stack, keys, result = [], [], None
+
+    def add(value):
+        nonlocal result
+        if not stack:
+            result = value
+        elif isinstance(stack[-1], dict):
+            stack[-1][keys.pop()] = value
+        else:
+            stack[-1].append(value)
+
+    for kind, value in events:
+        if kind in ("start_map", "start_seq"):
+            container = {} if kind == "start_map" else []
+            add(container)
+            stack.append(container)
+        elif kind in ("end_map", "end_seq"):
+            stack.pop()
+        elif kind == "key":
+            keys.append(value)
+        else:
+            add(value)
+    return result
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 1 << 16])
+def test_events_rebuild_the_document(block_size):
+    # Tiny blocks split strings, escapes and literals across reads
+    text = json.dumps(DOCUMENT, indent=2)
+
+    assert _build(iter_json_events(io.StringIO(text), block_size)) == DOCUMENT
+
+def test_keys_and_scalars_are_told_apart():
+    events = list(iter_json_events(io.StringIO('{"a": "b", "c": ["d", {"e": "f"}]}')))
+
+    assert [value for kind, value in events if kind == "key"] == ["a", "c", "e"]
+    assert [value for kind, value in events if kind == "scalar"] == ["b", "d", "f"]
+
+def test_unterminated_document_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_json_events(io.StringIO('{"a": [1, 2'), 4))
+
+def test_invalid_literal_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_json_events(io.StringIO('{"a": nope}')))
+
+def test_large_json_is_split_into_subtrees(tmp_path):
+    path = tmp_path / "api.json"
+    items = [{"id": i, "text": "x" * 50} for i in range(20)]
+    path.write_text(json.dumps({"items": items}))
+
+    segments = list(StructuredProcessor.iter_json(str(path), max_chars=300))
+
+    assert len(segments) > 2
+    assert all(info == {"metadata": {"json_pointer": "/items"}} for _, info in segments)
+    # Every item lands in exactly one segment, in order
+    parts = [json.loads(text.split("Path: /items\n", 1)[1]) for text, _ in segments]
+    assert [item for part in parts for item in part] == items
@@ -0,0 +1,54 @@
+import pytest
+from ingestion.text_processor import TextProcessor
+
+def _csv(path, rows: int) -> str:
+    lines = ["id,name,note"] + [f'{i},user {i},"line one\nline two"' for i in range(1, rows + 1)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+def test_csv_rows_are_grouped_by_the_row_limit(tmp_path):
+    path = _csv(tmp_path / "users.csv", 5)
+
+    segments = list(TextProcessor.iter_csv_segments(path, max_chars=10000, max_rows=2))
+
+    ranges = [(info["metadata"]["row_start"], info["metadata"]["row_end"]) for _, info in segments[:-1]]
+    assert ranges == [(1, 2), (3, 4), (5, 5)]
+    assert segments[0][0].startswith("CSV File: users.csv\nColumns: id, name, note\n")
+    assert "Row 3: id: 3; name: user 3; note: line one\nline two" in segments[1][0]
+
+def test_csv_summary_comes_last_with_the_row_count(tmp_path):
+    path = _csv(tmp_path / "users.csv", 7)
+
+    segments = list(TextProcessor.iter_csv_segments(path, max_chars=10000, max_rows=3))
+
+    assert segments[-1] == ("CSV File: users.csv\nColumns: id, name, note\nTotal Rows: 7", None)
+
+def test_csv_rows_are_grouped_by_the_chunk_budget(tmp_path):
+    path = _csv(tmp_path / "users.csv", 6)
+
+    segments = list(TextProcessor.iter_csv_segments(path, max_chars=150, max_rows=100))
+
+    assert len(segments) > 2
+    assert all(len(text) <= 150 for text, _ in segments[:-2])
+    assert segments[-2][1]["metadata"]["row_end"] == 6
+
+def test_empty_csv_yields_nothing(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+
+    assert list(TextProcessor.iter_csv_segments(str(path))) == []
+
+def test_undecodable_csv_raises(tmp_path):
+    path = tmp_path / "latin.csv"
+    path.write_bytes("id,name\n1,caf\xe9\n".encode("latin-1"))
+
+    with pytest.raises(UnicodeDecodeError):
+        list(TextProcessor.iter_csv_segments(str(path)))
+
+def test_csv_summary_counts_every_row(tmp_path):
+    path = _csv(tmp_path / "users.csv", 8)
+
+    content = TextProcessor.process_csv(path)
+
+    assert "Total Rows: 8" in content
+    assert "Row 5:" in content and "Row 6:" not in content
@@ -0,0 +1,73 @@
+import re
+from ingestion.token_chunker import TokenChunker
+
+class WordTokenizer:
+    """One token per word or punctuation mark"""
+
+    name = "words"
+    max_tokens = None
+
+    def spans(self, text: str):
+        return [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]
+
+def _chunker(size: int = 20, overlap: int = 4) -> TokenChunker:
+    return TokenChunker(chunk_size=size, overlap=overlap, tokenizer=WordTokenizer())
+
+def _pages(count: int, sentences: int = 6):
+    return [
+        (" ".join(f"Page {page} sentence {i} has a few words." for i in range(sentences)), {"page": page})
+        for page in range(1, count + 1)
+    ]
+
+def test_offsets_point_into_the_joined_document():
+    segments = _pages(4)
+    document = "\n\n".join(text for text, _ in segments)
+
+    chunks = _chunker().chunk_segments(segments, "doc.pdf", {"file_path": "/docs/doc.pdf"})
+
+    assert len(chunks) > 4
+    for chunk in chunks:
+        location = chunk.location
+        assert document[location["char_start"]:location["char_end"]] == chunk.content
+        assert location["token_count"] <= 20
+    assert chunks[-1].location["char_end"] == len(document)
+
+def test_chunks_overlap_and_cover_the_document():
+    segments = _pages(3)
+    document = "\n\n".join(text for text, _ in segments)
+
+    chunks = _chunker().chunk_segments(segments, "doc.pdf")
+
+    assert chunks[0].location["char_start"] == 0
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.location["char_start"] < previous.location["char_end"]
+        assert chunk.location["char_start"] > previous.location["char_start"]
+    assert [chunk.chunk_index for chunk in chunks] == list(range(len(chunks)))
+    assert all(word in " ".join(c.content for c in chunks) for word in set(document.split()))
+
+def test_chunks_prefer_sentence_boundaries():
+    chunks = _chunker(size=30, overlap=0).chunk_text(_pages(1, sentences=10)[0][0], "notes.txt")
+
+    assert all(chunk.content.endswith(".") for chunk in chunks)
+
+def test_chunks_record_their_page_range():
+    segments = _pages(3)
+
+    chunks = _chunker().chunk_segments(segments, "doc.pdf")
+
+    for chunk in chunks:
+        pages = {int(page) for page in re.findall(r"Page (\d+)", chunk.content)}
+        assert (chunk.location["page_start"], chunk.location["page_end"]) == (min(pages), max(pages))
+
+def test_self_contained_segments_are_chunked_alone():
+    segments = [
+        ("Intro text before the table.", None),
+        ("Row 1: id: 1\nRow 2: id: 2", {"metadata": {"row_start": 1, "row_end": 2}}),
+        ("Closing text.", None),
+    ]
+
+    chunks = _chunker().chunk_segments(segments, "data.csv")
+
+    assert [chunk.content for chunk in chunks] == [text for text, _ in segments]
+    assert chunks[1].location["row_start"] == 1
+    assert "row_start" not in chunks[0].location
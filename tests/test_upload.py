@@ -0,0 +1,77 @@
+import threading
+import pytest
+from config import settings
+
+pytest.importorskip("uvicorn")
+pytest.importorskip("groq")
+pytest.importorskip("multipart")
+
+@pytest.fixture
+def app(indexer, monkeypatch):
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(settings, "groq_api_key", settings.groq_api_key or "test-key")
+    import main
+    monkeypatch.setattr(main, "indexer", indexer)
+    monkeypatch.setattr(main.generator.retriever, "refresh_index", lambda: None)
+    return TestClient(main.app)
+
+def _upload(app, *files):
+    response = app.post("/upload/index", files=[("files", (name, data)) for name, data in files])
+    assert response.status_code == 200
+    return {result["file_name"]: result for result in response.json()["files"]}
+
+def test_uploads_are_indexed_and_unchanged_ones_skipped(app, indexer, input_dir):
+    results = _upload(app, ("a.txt", b"Users log in with email."))
+
+    assert results["a.txt"]["status"] == "indexed"
+    assert indexer.manifest.get(str(input_dir / "a.txt")) is not None
+
+    results = _upload(app, ("a.txt", b"Users log in with email."))
+
+    assert results["a.txt"]["status"] == "unchanged"
+
+def test_duplicate_upload_is_not_kept(app, indexer, input_dir):
+    _upload(app, ("a.txt", b"Users log in with email."))
+
+    results = _upload(app, ("copy.txt", b"Users log in with email."), ("again.txt", b"Payments fail."), ("same.txt", b"Payments fail."))
+
+    assert results["copy.txt"]["status"] == "duplicate"
+    assert results["copy.txt"]["indexed_as"] == str(input_dir / "a.txt")
+    assert results["same.txt"]["indexed_as"] == str(input_dir / "again.txt")
+    assert sorted(path.name for path in input_dir.iterdir()) == ["a.txt", "again.txt"]
+    # Nothing is left for the next full run to index a second time
+    indexer.index_all_documents()
+    assert indexer.last_stats.files_written == 0
+
+def test_duplicate_upload_does_not_overwrite_a_same_named_file(app, input_dir):
+    _upload(app, ("a.txt", b"Users log in with email."))
+    (input_dir / "notes.txt").write_text("Notes not indexed yet.")
+
+    results = _upload(app, ("notes.txt", b"Users log in with email."))
+
+    assert results["notes.txt"]["status"] == "duplicate"
+    assert (input_dir / "notes.txt").read_text() == "Notes not indexed yet."
+
+def test_uploads_are_compared_against_the_live_manifest_during_a_rebuild(app, indexer, input_dir, monkeypatch):
+    monkeypatch.setattr(settings, "blue_green_reindex", True)
+    _upload(app, ("a.txt", b"Users log in with email."))
+    building, release = threading.Event(), threading.Event()
+    run_tasks = indexer._run_tasks
+
+    def slow_run_tasks(*args, **kwargs):
+        building.set()
+        release.wait(5)
+        return run_tasks(*args, **kwargs)
+
+    monkeypatch.setattr(indexer, "_run_tasks", slow_run_tasks)
+    rebuild = threading.Thread(target=indexer.index_all_documents, kwargs={"force": True})
+    rebuild.start()
+    try:
+        assert building.wait(5)
+        results = _upload(app, ("copy.txt", b"Users log in with email."), ("b.txt", b"Payments fail."))
+    finally:
+        release.set()
+        rebuild.join(10)
+
+    assert results["copy.txt"]["status"] == "duplicate"
+    assert results["b.txt"]["status"] == "queued"